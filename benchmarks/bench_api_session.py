@@ -0,0 +1,53 @@
+"""Compare per-request latency of the pooled ApiClient session against a
+new connection per request, using a local stub of the SadCaptcha API.
+
+Run from the repository root:
+    python benchmarks/bench_api_session.py [requests]
+
+The stub is plain HTTP on localhost, so the saving shown here is the TCP handshake only.
+Against sadcaptcha.com the TLS handshake is saved as well, which is several round trips more.
+"""
+
+import logging
+import statistics
+import sys
+import time
+
+from temu_captcha_solver.api import ApiClient
+from temu_captcha_solver.models import SwapTwoRequest
+from temu_captcha_solver.stub_api import StubApiServer
+
+
+def time_requests(client: ApiClient, n: int) -> list[float]:
+    request = SwapTwoRequest(image_b64="aGVsbG8=" * 1000)
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.swap_two(request)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    logging.getLogger().setLevel(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with StubApiServer() as stub:
+        with ApiClient("bench", base_url=stub.base_url, keep_alive=False) as client:
+            cold = time_requests(client, n)
+        cold_connections = stub.connection_count
+        with ApiClient("bench", base_url=stub.base_url) as client:
+            pooled = time_requests(client, n)
+        pooled_connections = stub.connection_count - cold_connections
+
+    for name, timings, connections in (
+        ("new connection per request", cold, cold_connections),
+        ("pooled keep-alive session", pooled, pooled_connections),
+    ):
+        print(f"{name:28s} mean={statistics.mean(timings) * 1000:.3f}ms "
+              f"p50={statistics.median(timings) * 1000:.3f}ms connections={connections}")
+    saved = (statistics.mean(cold) - statistics.mean(pooled)) * 1000
+    print(f"saved per request: {saved:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare the memory allocated to go from an image's data url to the request body,
+with base64 strings (url.split(",") and the default or compact encoding) against ImagePayload.
+
+Every image of the shipped request fixtures is turned back into the data url a solver reads from
+the page. Each path is measured with tracemalloc: the peak memory allocated while building the
+body, also as a multiple of the body size, and the best time.
+
+Run from the repository root:
+    python benchmarks/bench_image_payload.py [iterations]
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from temu_captcha_solver.encoding import encode_request_body
+from temu_captcha_solver.image_payload import ImagePayload
+
+from request_fixtures import REQUEST_FIXTURES, load_fixture_json
+
+DATA_URL_PREFIX = "data:image/png;base64,"
+
+
+def as_data_urls(value: Any, name: str = "") -> Any:
+    """The fixture with every image replaced by the data url it was read from"""
+    if isinstance(value, dict):
+        return {key: as_data_urls(item, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_data_urls(item, name) for item in value]
+    if isinstance(value, str) and "image" in name:
+        return DATA_URL_PREFIX + value
+    return value
+
+
+def read_images(value: Any, read: Callable[[str], Any], name: str = "") -> Any:
+    """Extract every image from its data url the way a solver does"""
+    if isinstance(value, dict):
+        return {key: read_images(item, read, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [read_images(item, read, name) for item in value]
+    if isinstance(value, str) and "image" in name:
+        return read(value)
+    return value
+
+
+def split_default(model: type[BaseModel], page: dict) -> bytes:
+    request = model(**read_images(page, lambda url: url.split(",")[1]))
+    return json.dumps(request.model_dump()).encode("utf-8")
+
+
+def split_compact(model: type[BaseModel], page: dict) -> bytes:
+    request = model(**read_images(page, lambda url: url.split(",")[1]))
+    return encode_request_body(request)
+
+
+def payload_compact(model: type[BaseModel], page: dict) -> bytes:
+    request = model(**read_images(page, ImagePayload.from_data_url))
+    return encode_request_body(request)
+
+
+PATHS = {"split + default": split_default, "split + compact": split_compact, "payload + compact": payload_compact}
+
+
+def peak_allocated(path: Callable[[type[BaseModel], dict], bytes], model: type[BaseModel], page: dict) -> int:
+    """Peak bytes allocated while building one body, including the body itself"""
+    tracemalloc.start()
+    path(model, page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def best_time(path: Callable[[type[BaseModel], dict], bytes], model: type[BaseModel], page: dict, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        path(model, page)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{'fixture':30s} {'path':18s} {'body KB':>8s} {'peak KB':>8s} {'peak/body':>9s} {'ms':>7s}")
+    for filename, model in REQUEST_FIXTURES.items():
+        page = as_data_urls(load_fixture_json(filename))
+        body_size = len(payload_compact(model, page))
+        for label, path in PATHS.items():
+            peak = peak_allocated(path, model, page)
+            print(f"{filename:30s} {label:18s} {body_size / 1024:8.1f} {peak / 1024:8.1f} "
+                  f"{peak / body_size:9.2f} {best_time(path, model, page, iterations) * 1000:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
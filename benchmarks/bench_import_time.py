@@ -0,0 +1,65 @@
+"""Compare the time a fresh process takes to import what each kind of worker uses,
+against importing every backend as the package used to do on `import temu_captcha_solver`.
+
+Every import runs in a new interpreter, so nothing is cached in sys.modules. The median
+of several runs is shown, with the browser automation packages the import pulled in.
+
+Run from the repository root:
+    python benchmarks/bench_import_time.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# what the package imported before public names were loaded lazily,
+# including undetected_chromedriver, which launcher.py used to import at the top
+EAGER = "import undetected_chromedriver\n" + "\n".join(f"import temu_captcha_solver.{module}" for module in [
+    "seleniumsolver", "playwrightsolver", "asyncplaywrightsolver", "api", "async_api", "solver_pool", "fleet",
+    "context_pool", "instrumentation", "result_cache", "resilience", "image_payload", "recorder", "launcher",
+])
+
+CASES = {
+    "every backend (eager)": EAGER,
+    "import temu_captcha_solver": "import temu_captcha_solver",
+    "ApiClient": "from temu_captcha_solver import ApiClient",
+    "AsyncPlaywrightSolver": "from temu_captcha_solver import AsyncPlaywrightSolver",
+    "SolverPool": "from temu_captcha_solver import SolverPool",
+    "PlaywrightSolver": "from temu_captcha_solver import PlaywrightSolver",
+    "SeleniumSolver": "from temu_captcha_solver import SeleniumSolver",
+}
+
+BACKENDS = ["playwright", "selenium", "undetected_chromedriver", "aiohttp"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in {backends!r} if name in sys.modules]]))
+"""
+
+
+def time_import(code: str) -> tuple[float, list[str]]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(["src", os.environ.get("PYTHONPATH", "")]))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code, backends=BACKENDS)],
+        capture_output=True, check=True, text=True, env=env
+    ).stdout
+    seconds, loaded = json.loads(output.splitlines()[-1])
+    return seconds, loaded
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'import':28s} {'median ms':>10s} {'min ms':>8s}  backends loaded")
+    for label, code in CASES.items():
+        results = [time_import(code) for _ in range(runs)]
+        timings = [seconds for seconds, _ in results]
+        print(f"{label:28s} {statistics.median(timings) * 1000:10.1f} {min(timings) * 1000:8.1f}  {', '.join(results[0][1])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure the cost of the solvers' log calls when their level is disabled, as in production,
+and of sampled TRACE logging when it is enabled.
+
+Logs one message per point of the shipped arced slide trajectory, and one message per API
+response, in the style the solvers used before (f-strings and concatenation, formatted on every
+call) and in the current style (%-style arguments, formatted only when emitted).
+
+Run from the repository root:
+    python benchmarks/bench_logging.py [repeats]
+"""
+
+import logging
+import sys
+import timeit
+from typing import Any, Callable
+
+from temu_captcha_solver.logs import TRACE, SampledTrace, set_log_levels, set_trace_every
+from temu_captcha_solver.models import ArcedSlideCaptchaRequest
+
+from request_fixtures import load_fixture_json
+
+LOGGER = logging.getLogger("temu_captcha_solver.bench")
+SAMPLED = SampledTrace(LOGGER)
+
+TRAJECTORY = ArcedSlideCaptchaRequest(**load_fixture_json("arced_slide_request.json")).slide_piece_trajectory
+RESPONSE: dict[str, Any] = {"proportionalPoints": [{"proportionX": 0.1 * i, "proportionY": 0.5} for i in range(4)]}
+
+
+def eager_trajectory() -> None:
+    for element in TRAJECTORY:
+        LOGGER.debug(f"trajectory element {element}")
+
+
+def lazy_trajectory() -> None:
+    for element in TRAJECTORY:
+        LOGGER.debug("trajectory element %s", element)
+
+
+def sampled_trajectory() -> None:
+    for element in TRAJECTORY:
+        SAMPLED("trajectory element %s", element)
+
+
+def eager_response() -> None:
+    LOGGER.debug("Got API response: " + str(RESPONSE))
+
+
+def lazy_response() -> None:
+    LOGGER.debug("Got API response: %s", RESPONSE)
+
+
+def per_call_us(fn: Callable[[], None], calls: int, repeats: int) -> float:
+    number = max(1, 20000 // calls)
+    return min(timeit.repeat(fn, number=number, repeat=repeats)) / number / calls * 1e6
+
+
+class FormattingHandler(logging.Handler):
+    """Formats every record it receives, and discards it"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    LOGGER.propagate = False
+    LOGGER.addHandler(FormattingHandler())
+    print(f"{len(TRAJECTORY)} trajectory points\n")
+    print(f"{'log call':40s} {'us/call':>8s}")
+
+    set_log_levels({"": "WARNING"})
+    for label, fn, calls in [
+        ("trajectory f-string, DEBUG disabled", eager_trajectory, len(TRAJECTORY)),
+        ("trajectory %-style, DEBUG disabled", lazy_trajectory, len(TRAJECTORY)),
+        ("trajectory sampled, TRACE disabled", sampled_trajectory, len(TRAJECTORY)),
+        ("API response concat, DEBUG disabled", eager_response, 1),
+        ("API response %-style, DEBUG disabled", lazy_response, 1),
+    ]:
+        print(f"{label:40s} {per_call_us(fn, calls, repeats):8.3f}")
+
+    set_log_levels({"": TRACE})
+    for every in (1, 10, 100):
+        set_trace_every(every)
+        us = per_call_us(sampled_trajectory, len(TRAJECTORY), repeats)
+        print(f"{f'trajectory sampled, TRACE 1 in {every}':40s} {us:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
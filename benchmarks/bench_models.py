@@ -0,0 +1,103 @@
+"""Compare parsing with a pydantic model validated per point against parsing without one.
+
+Requests: each shipped request fixture is parsed with model(**data), and with
+request_from_json, which reads the arced slide trajectory straight into a TrajectoryArray.
+Responses: a points response from the API is parsed with a ProportionalPoint validated per
+point, as ApiClient did before, with multi_point_response_from_json, which validates the
+whole response in one call, and into slotted dataclasses, which skip pydantic entirely.
+
+Reports the best parse time, and the memory blocks allocated by one parse and still held by
+its result, counted with sys.getallocatedblocks().
+
+Run from the repository root:
+    python benchmarks/bench_models.py [iterations]
+"""
+
+import gc
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from temu_captcha_solver.api import multi_point_response_from_json
+from temu_captcha_solver.models import MultiPointResponse, ProportionalPoint, request_from_json
+
+from request_fixtures import REQUEST_FIXTURES, load_fixture_json
+
+
+def validated_points(result: dict[str, Any]) -> MultiPointResponse:
+    """multi_point_response_from_json as it was before, with a model validated per point"""
+    return MultiPointResponse(
+        proportional_points=[
+            ProportionalPoint(proportion_x=point["proportionX"], proportion_y=point["proportionY"])
+            for point in result["proportionalPoints"]
+        ]
+    )
+
+
+@dataclass(slots=True, frozen=True)
+class Point:
+    proportion_x: float
+    proportion_y: float
+
+
+def slotted_points(result: dict[str, Any]) -> list[Point]:
+    """The floor for parsing points in Python, without a pydantic model"""
+    return [Point(point["proportionX"], point["proportionY"]) for point in result["proportionalPoints"]]
+
+
+def points_response(count: int) -> dict[str, Any]:
+    return {"proportionalPoints": [{"proportionX": i / count, "proportionY": 0.5} for i in range(count)]}
+
+
+def best_us(fn: Callable[[], Any], iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e6
+
+
+def held_blocks(fn: Callable[[], Any]) -> int:
+    """Memory blocks allocated by fn and still held by its result"""
+    gc.collect()
+    before = sys.getallocatedblocks()
+    result = fn()
+    gc.collect()
+    blocks = sys.getallocatedblocks() - before
+    del result
+    return blocks
+
+
+def compare(label: str, paths: list[tuple[str, Callable[[], Any]]], iterations: int) -> None:
+    timings = [best_us(fn, iterations) for _, fn in paths]
+    for (name, fn), us in zip(paths, timings):
+        print(f"{label:32s} {name:22s} {us:10.1f} {held_blocks(fn):8d} {timings[0] / us:7.1f}x")
+        label = ""
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'input':32s} {'path':22s} {'us':>10s} {'blocks':>8s} {'speedup':>8s}")
+
+    for filename, model in REQUEST_FIXTURES.items():
+        data = load_fixture_json(filename)
+        assert request_from_json(model, data).model_dump() == model(**data).model_dump()
+        compare(filename, [
+            ("pydantic", lambda: model(**data)),
+            ("request_from_json", lambda: request_from_json(model, data)),
+        ], iterations)
+
+    for count in (4, 100):
+        result = points_response(count)
+        assert multi_point_response_from_json(result) == validated_points(result)
+        compare(f"response with {count} points", [
+            ("pydantic", lambda: validated_points(result)),
+            ("one validation", lambda: multi_point_response_from_json(result)),
+            ("slotted dataclasses", lambda: slotted_points(result)),
+        ], iterations * 10)
+
+
+if __name__ == "__main__":
+    main()
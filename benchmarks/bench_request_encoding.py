@@ -0,0 +1,65 @@
+"""Compare the default request encoding (model_dump() + json.dumps()) against
+encode_request_body, on the shipped request fixtures and against a local stub API.
+
+Run from the repository root:
+    python benchmarks/bench_request_encoding.py [iterations]
+"""
+
+import json
+import logging
+import statistics
+import sys
+import time
+
+from temu_captcha_solver.api import ApiClient
+from temu_captcha_solver.encoding import encode_request_body
+from temu_captcha_solver.stub_api import StubApiServer
+
+from request_fixtures import load_fixtures
+
+
+def default_encoding(request) -> bytes:
+    """What requests does with json=request.model_dump()"""
+    return json.dumps(request.model_dump(), allow_nan=False).encode("utf-8")
+
+
+def best_time(fn, request, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(request)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_api_calls(client: ApiClient, request, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        client.post("semantic-shapes", request)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    logging.getLogger().setLevel(logging.WARNING)
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    fixtures = load_fixtures()
+
+    print(f"{'fixture':32s} {'default':>10s} {'compact':>10s} {'default ms':>11s} {'compact ms':>11s}")
+    for name, request in fixtures.items():
+        print(f"{name:32s} {len(default_encoding(request)):10d} {len(encode_request_body(request)):10d} "
+              f"{best_time(default_encoding, request, iterations) * 1000:11.3f} "
+              f"{best_time(encode_request_body, request, iterations) * 1000:11.3f}")
+
+    print("\nmedian round trip to local stub API")
+    with StubApiServer() as stub:
+        for compact in (False, True):
+            with ApiClient("bench", base_url=stub.base_url, compact_requests=compact) as client:
+                for name, request in fixtures.items():
+                    median = time_api_calls(client, request, iterations)
+                    print(f"{'compact' if compact else 'default':8s} {name:32s} {median * 1000:8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Time solve_captcha_if_present end to end for every captcha type and solver backend,
+against local mock captcha pages and a local stub of the SadCaptcha API. No network is used.
+
+Run from the repository root:
+    python benchmarks/bench_solvers.py [--runs N] [--backend NAME ...] [--captcha NAME ...] [--pipelined] [--api-latency S]
+
+Needs Chromium for Playwright (`playwright install chromium`), and Chrome with a matching
+chromedriver for Selenium. Reports p50/p95 latency per solve, the number of browser round
+trips per solve (Playwright protocol messages, or WebDriver commands for Selenium), and the
+number of API requests per solve.
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import statistics
+import time
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Generator
+
+from playwright._impl._connection import Connection
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from temu_captcha_solver.captchatype import CaptchaType
+from temu_captcha_solver.stub_api import StubApiServer
+
+from mock_site import MOCK_PAGES, MockCaptchaSite
+
+BACKENDS = ["selenium", "playwright", "async_playwright"]
+
+
+@dataclass
+class SolveResults:
+    backend: str
+    captcha_type: CaptchaType
+    seconds: list[float] = field(default_factory=list)
+    browser_round_trips: list[int] = field(default_factory=list)
+    api_requests: list[int] = field(default_factory=list)
+    solved: int = 0
+
+
+class RoundTripCounter:
+    """Counts the messages the solver sends to the browser while active"""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    @contextmanager
+    def patch(self, cls: type, method_name: str) -> Generator[None, None, None]:
+        original = getattr(cls, method_name)
+
+        def counting(*args, **kwargs):
+            self.count += 1
+            return original(*args, **kwargs)
+
+        setattr(cls, method_name, counting)
+        try:
+            yield
+        finally:
+            setattr(cls, method_name, original)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def measure(
+        results: SolveResults,
+        counter: RoundTripCounter,
+        stub: StubApiServer
+    ) -> Generator[None, None, None]:
+    round_trips = counter.count
+    api_requests = stub.request_count
+    start = time.perf_counter()
+    yield
+    results.seconds.append(time.perf_counter() - start)
+    results.browser_round_trips.append(counter.count - round_trips)
+    results.api_requests.append(stub.request_count - api_requests)
+
+
+def bench_selenium(
+        site: MockCaptchaSite,
+        stub: StubApiServer,
+        types: list[CaptchaType],
+        runs: int,
+        pipelined: bool
+    ) -> list[SolveResults]:
+    from selenium.webdriver import Chrome, ChromeOptions
+    from selenium.webdriver.common.by import By
+    from temu_captcha_solver.api import ApiClient
+    from temu_captcha_solver.seleniumsolver import SeleniumSolver
+
+    options = ChromeOptions()
+    options.add_argument("--headless=new")
+    driver = Chrome(options=options)
+    counter = RoundTripCounter()
+    all_results = []
+    try:
+        solver = SeleniumSolver(driver, "bench", min_dwell=0, pipelined=pipelined)
+        solver.client = ApiClient("bench", base_url=stub.base_url)
+        for captcha_type in types:
+            results = SolveResults("selenium", captcha_type)
+            for _ in range(runs):
+                driver.get(site.url(captcha_type))
+                with counter.patch(WebDriver, "execute"), measure(results, counter, stub):
+                    solver.solve_captcha_if_present(captcha_detect_timeout=5, retries=3)
+                if not driver.find_elements(By.ID, "mock-captcha"):
+                    results.solved += 1
+            all_results.append(results)
+    finally:
+        driver.quit()
+    return all_results
+
+
+def bench_playwright(
+        site: MockCaptchaSite,
+        stub: StubApiServer,
+        types: list[CaptchaType],
+        runs: int,
+        pipelined: bool
+    ) -> list[SolveResults]:
+    from playwright.sync_api import sync_playwright
+    from temu_captcha_solver.api import ApiClient
+    from temu_captcha_solver.playwrightsolver import PlaywrightSolver
+
+    counter = RoundTripCounter()
+    all_results = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        solver = PlaywrightSolver(page, "bench", min_dwell=0, pipelined=pipelined)
+        solver.client = ApiClient("bench", base_url=stub.base_url)
+        for captcha_type in types:
+            results = SolveResults("playwright", captcha_type)
+            for _ in range(runs):
+                page.goto(site.url(captcha_type))
+                with counter.patch(Connection, "_send_message_to_server"), measure(results, counter, stub):
+                    solver.solve_captcha_if_present(captcha_detect_timeout=5, retries=3)
+                if page.locator("#mock-captcha").count() == 0:
+                    results.solved += 1
+            all_results.append(results)
+        browser.close()
+    return all_results
+
+
+def bench_async_playwright(
+        site: MockCaptchaSite,
+        stub: StubApiServer,
+        types: list[CaptchaType],
+        runs: int,
+        pipelined: bool
+    ) -> list[SolveResults]:
+    from playwright.async_api import async_playwright
+    from temu_captcha_solver.async_api import AsyncApiClient
+    from temu_captcha_solver.asyncplaywrightsolver import AsyncPlaywrightSolver
+
+    async def run() -> list[SolveResults]:
+        counter = RoundTripCounter()
+        all_results = []
+        async with async_playwright() as p, AsyncApiClient("bench", base_url=stub.base_url) as client:
+            browser = await p.chromium.launch(headless=True)
+            page = await browser.new_page()
+            solver = AsyncPlaywrightSolver(page, "bench", min_dwell=0, client=client, pipelined=pipelined)
+            for captcha_type in types:
+                results = SolveResults("async_playwright", captcha_type)
+                for _ in range(runs):
+                    await page.goto(site.url(captcha_type))
+                    with counter.patch(Connection, "_send_message_to_server"), measure(results, counter, stub):
+                        await solver.solve_captcha_if_present(captcha_detect_timeout=5, retries=3)
+                    if await page.locator("#mock-captcha").count() == 0:
+                        results.solved += 1
+                all_results.append(results)
+            await browser.close()
+        return all_results
+
+    return asyncio.run(run())
+
+
+BENCHMARKS: dict[str, Callable[[MockCaptchaSite, StubApiServer, list[CaptchaType], int, bool], list[SolveResults]]] = {
+    "selenium": bench_selenium,
+    "playwright": bench_playwright,
+    "async_playwright": bench_async_playwright,
+}
+
+
+def report(results: list[SolveResults]) -> None:
+    print(f"{'backend':18s} {'captcha':16s} {'solved':>8s} {'p50':>9s} {'p95':>9s} {'browser rt':>11s} {'api req':>8s}")
+    for r in results:
+        print(f"{r.backend:18s} {r.captcha_type.name.lower():16s} "
+              f"{r.solved:>3d}/{len(r.seconds):<4d} "
+              f"{percentile(r.seconds, 50) * 1000:>7.0f}ms {percentile(r.seconds, 95) * 1000:>7.0f}ms "
+              f"{statistics.mean(r.browser_round_trips):>11.1f} {statistics.mean(r.api_requests):>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="solves per captcha type and backend")
+    parser.add_argument("--backend", action="append", choices=BACKENDS, help="backend to run, may be repeated")
+    parser.add_argument("--captcha", action="append", choices=[t.name.lower() for t in MOCK_PAGES],
+                        help="captcha type to run, may be repeated")
+    parser.add_argument("--pipelined", action="store_true", help="run the solvers in pipelined mode")
+    parser.add_argument("--api-latency", type=float, default=0, help="seconds the stub API waits before answering")
+    args = parser.parse_args()
+    backends = args.backend or BACKENDS
+    types = [CaptchaType[name.upper()] for name in args.captcha] if args.captcha else list(MOCK_PAGES)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    warnings.simplefilter("ignore")
+    results: list[SolveResults] = []
+    with MockCaptchaSite() as site, StubApiServer(latency=args.api_latency) as stub:
+        for backend in backends:
+            results.extend(BENCHMARKS[backend](site, stub, types, args.runs, args.pipelined))
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
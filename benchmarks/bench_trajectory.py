@@ -0,0 +1,166 @@
+"""Compare turning in-page samples into the arced slide request trajectory with a pydantic
+ArcedSlideTrajectoryElement per sample, as the solvers used to, against TrajectoryArray.
+
+The trajectory of the shipped arced_slide_request.json is turned back into the samples the
+sampler script returns: a bounding rect and a style attribute per step, with the piece resting
+at its last position for the rest of the bar. Each path converts the samples, finds where the
+piece came to rest, simplifies the trajectory and encodes the request body. The request uses
+placeholder images, so that encoding the images, which is the same for both paths, does not
+hide the cost of the trajectory.
+
+Run from the repository root:
+    python benchmarks/bench_trajectory.py [iterations]
+"""
+
+import re
+import sys
+import time
+from typing import Any, Callable
+
+from temu_captcha_solver.encoding import encode_request_body
+from temu_captcha_solver.geometry import get_center, piece_is_not_moving, xy_to_proportional_point
+from temu_captcha_solver.models import ArcedSlideCaptchaRequest, ArcedSlideTrajectoryElement
+from temu_captcha_solver.trajectory_sampler import (
+    MIN_SWEEP_PIXELS,
+    SIMPLIFY_ANGLE_TOLERANCE,
+    SIMPLIFY_TOLERANCE,
+    STILL_ANGLE_TOLERANCE,
+    STILL_PIXELS,
+    STILL_TOLERANCE_PX,
+    simplify_trajectory,
+    trajectory_from_samples
+)
+
+from request_fixtures import load_fixture_json
+
+CONTAINER = {"x": 40.0, "y": 120.0, "width": 414.0, "height": 230.0}
+PIECE_SIZE = 62.0
+BAR_PIXELS = 300
+IMAGE = "aGVsbG8="
+
+
+def as_sampler_result(fixture: dict[str, Any]) -> dict[str, Any]:
+    """The sampler result the fixture's trajectory was built from, continued to the end of the bar"""
+    samples = []
+    points = fixture["slide_piece_trajectory"]
+    step = points[1]["pixels_from_slider_origin"] - points[0]["pixels_from_slider_origin"]
+    for pixel in range(0, BAR_PIXELS, step):
+        point = points[min(pixel // step, len(points) - 1)]
+        center_x = point["piece_center"]["proportion_x"] * CONTAINER["width"] + CONTAINER["x"]
+        center_y = point["piece_center"]["proportion_y"] * CONTAINER["height"] + CONTAINER["y"]
+        style = f"width: 62px; left: {center_x:.1f}px; transform: rotate({point['piece_rotation_angle']}deg);"
+        samples.append([pixel, center_x - PIECE_SIZE / 2, center_y - PIECE_SIZE / 2, PIECE_SIZE, PIECE_SIZE, style])
+    return {"samples": samples, "container": CONTAINER}
+
+
+def rotate_angle_from_style(style: str) -> float:
+    """The style parser the solvers used before TrajectoryArray"""
+    if not "rotate" in style:
+        return 0
+    return float(re.sub(r".*rotate\(|deg.*", "", style))
+
+
+def elements_from_samples(result: dict[str, Any], mouse_step_size: int) -> list[ArcedSlideTrajectoryElement]:
+    """trajectory_from_samples as it was before TrajectoryArray: a model per point"""
+    container = result["container"]
+    tolerance = STILL_TOLERANCE_PX / max(container["width"], container["height"])
+    by_pixel: dict[int, list[Any]] = {}
+    for sample in result["samples"]:
+        pixel = int(round(sample[0] / mouse_step_size)) * mouse_step_size
+        if pixel >= 0:
+            by_pixel[pixel] = sample
+    trajectory: list[ArcedSlideTrajectoryElement] = []
+    still_since: int | None = None
+    for pixel in sorted(by_pixel):
+        _, left, top, width, height, style = by_pixel[pixel]
+        piece_center_x, piece_center_y = get_center(left, top, width, height)
+        trajectory.append(ArcedSlideTrajectoryElement(
+            pixels_from_slider_origin=pixel,
+            piece_rotation_angle=rotate_angle_from_style(style),
+            piece_center=xy_to_proportional_point(
+                piece_center_x - container["x"],
+                piece_center_y - container["y"],
+                container["width"],
+                container["height"]
+            )
+        ))
+        if pixel < MIN_SWEEP_PIXELS:
+            continue
+        if not piece_is_not_moving(trajectory, tolerance, STILL_ANGLE_TOLERANCE):
+            still_since = None
+            continue
+        if still_since is None:
+            still_since = trajectory[-2].pixels_from_slider_origin
+        if pixel - still_since >= STILL_PIXELS:
+            break
+    return trajectory
+
+
+def _deviates(start: ArcedSlideTrajectoryElement, end: ArcedSlideTrajectoryElement, point: ArcedSlideTrajectoryElement) -> bool:
+    span = end.pixels_from_slider_origin - start.pixels_from_slider_origin
+    t = (point.pixels_from_slider_origin - start.pixels_from_slider_origin) / span
+    x = start.piece_center.proportion_x + t * (end.piece_center.proportion_x - start.piece_center.proportion_x)
+    y = start.piece_center.proportion_y + t * (end.piece_center.proportion_y - start.piece_center.proportion_y)
+    angle = start.piece_rotation_angle + t * (end.piece_rotation_angle - start.piece_rotation_angle)
+    return abs(point.piece_center.proportion_x - x) > SIMPLIFY_TOLERANCE \
+        or abs(point.piece_center.proportion_y - y) > SIMPLIFY_TOLERANCE \
+        or abs(point.piece_rotation_angle - angle) > SIMPLIFY_ANGLE_TOLERANCE
+
+
+def simplify_elements(trajectory: list[ArcedSlideTrajectoryElement]) -> list[ArcedSlideTrajectoryElement]:
+    """simplify_trajectory as it was before TrajectoryArray"""
+    if len(trajectory) <= 2:
+        return list(trajectory)
+    simplified = [trajectory[0]]
+    anchor = 0
+    for end in range(2, len(trajectory)):
+        start = trajectory[anchor]
+        if any(_deviates(start, trajectory[end], trajectory[i]) for i in range(anchor + 1, end)):
+            anchor = end - 1
+            simplified.append(trajectory[anchor])
+    simplified.append(trajectory[-1])
+    return simplified
+
+
+def request_body(trajectory: Any) -> bytes:
+    request = ArcedSlideCaptchaRequest(puzzle_image_b64=IMAGE, piece_image_b64=IMAGE, slide_piece_trajectory=trajectory)
+    return encode_request_body(request)
+
+
+def best_ms(fn: Callable[[], Any], iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    fixture = load_fixture_json("arced_slide_request.json")
+    result = as_sampler_result(fixture)
+    step = fixture["slide_piece_trajectory"][1]["pixels_from_slider_origin"]
+
+    elements = elements_from_samples(result, step)
+    array = trajectory_from_samples(result, step)
+    assert [e.pixels_from_slider_origin for e in elements] == list(array.pixels)
+    assert request_body(simplify_elements(elements)) == request_body(simplify_trajectory(array))
+    print(f"{len(result['samples'])} samples, {len(array)} trajectory points, {len(simplify_trajectory(array))} sent\n")
+
+    print(f"{'stage':32s} {'elements ms':>12s} {'array ms':>9s} {'speedup':>8s}")
+    stages: list[tuple[str, Callable[[], Any], Callable[[], Any]]] = [
+        ("samples to trajectory", lambda: elements_from_samples(result, step), lambda: trajectory_from_samples(result, step)),
+        ("simplify", lambda: simplify_elements(elements), lambda: simplify_trajectory(array)),
+        ("request model and body", lambda: request_body(elements), lambda: request_body(array)),
+        ("all", lambda: request_body(simplify_elements(elements_from_samples(result, step))),
+            lambda: request_body(simplify_trajectory(trajectory_from_samples(result, step)))),
+    ]
+    for label, with_elements, with_array in stages:
+        before = best_ms(with_elements, iterations)
+        after = best_ms(with_array, iterations)
+        print(f"{label:32s} {before:12.3f} {after:9.3f} {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
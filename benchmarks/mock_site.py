@@ -0,0 +1,269 @@
+"""Local mock captcha pages for the offline solver benchmarks.
+
+Each page renders one captcha type with the selectors the solvers look for, using the
+captured Temu markup in materials/html.html and the images from the dumped *_request.json
+files. A small script makes the page react like the real captcha: the slider moves the
+piece, clicks leave red dots, and the captcha is removed once the solver finishes its
+interaction. The pages accept any answer, so the canned answers from the stub API solve them.
+"""
+
+import html
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from temu_captcha_solver.captchatype import CaptchaType
+from temu_captcha_solver.stub_api import STUB_RESPONSES
+
+from request_fixtures import REPO_ROOT, load_fixture_json
+
+CAPTURED_PAGE = os.path.join(REPO_ROOT, "materials", "html.html")
+
+# The page is served in standards mode. The captured page has no doctype, and in quirks
+# mode id selectors are case insensitive, which would make #Slider match the arced slide.
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ margin: 0; font-family: sans-serif; }}
+#mock-captcha {{ position: absolute; top: 20px; left: 20px; }}
+#slider {{ position: relative; width: 414px; }}
+#slider > img {{ display: block; width: 100%; }}
+#img-button {{ position: absolute; left: 0; }}
+#img-button > img {{ display: block; width: 60px; }}
+#slide-track {{ position: relative; width: 414px; height: 40px; background: #eee; }}
+#slide-button {{ position: absolute; top: 0; width: 40px; height: 40px; background: #999; }}
+#Picture {{ position: relative; width: 400px; }}
+#Picture img {{ display: block; width: 100%; }}
+.red-point {{ position: absolute; width: 10px; height: 10px; background: red; }}
+#imageSemantics img {{ width: 120px; height: 120px; }}
+</style>
+</head>
+<body>
+<div id="mock-captcha">{markup}</div>
+<script>
+const captchaRoot = document.getElementById("mock-captcha");
+const markSolved = () => setTimeout(() => captchaRoot.remove(), {solve_delay_ms});
+{script}
+</script>
+</body>
+</html>
+"""
+
+# Moves the slide button with the pointer, and the piece along a curve. Releasing solves.
+SLIDE_SCRIPT = """
+const button = document.getElementById("slide-button");
+const piece = document.getElementById("img-button");
+const maxOffset = document.querySelector("#slider > img").getBoundingClientRect().width - 40;
+let dragStart = null;
+button.addEventListener("mousedown", (e) => { dragStart = e.clientX; });
+document.addEventListener("mousemove", (e) => {
+    if (dragStart === null) return;
+    const offset = Math.max(0, Math.min(maxOffset, e.clientX - dragStart));
+    const progress = offset / maxOffset;
+    button.style.left = offset + "px";
+    piece.style.left = (offset * ARC_X_SCALE) + "px";
+    piece.style.top = (ARC_TOP - ARC_HEIGHT * Math.sin(progress * Math.PI)) + "px";
+    if (ARC_ROTATES) piece.style.transform = "rotate(" + (progress * 90).toFixed(2) + "deg)";
+});
+document.addEventListener("mouseup", () => {
+    if (dragStart === null) return;
+    dragStart = null;
+    markSolved();
+});
+"""
+
+SEMANTIC_SHAPES_SCRIPT = """
+const picture = document.getElementById("Picture");
+const image = document.getElementById("captchaImg");
+const dotsToSolve = DOTS_TO_SOLVE;
+image.addEventListener("click", (e) => {
+    const rect = picture.getBoundingClientRect();
+    const dot = document.createElement("div");
+    dot.className = "red-point";
+    dot.style.left = (e.clientX - rect.x) + "px";
+    dot.style.top = (e.clientY - rect.y) + "px";
+    picture.appendChild(dot);
+    if (picture.querySelectorAll(".red-point").length >= dotsToSolve) markSolved();
+});
+"""
+
+THREE_BY_THREE_SCRIPT = """
+const selected = new Set();
+for (const image of document.querySelectorAll("#imageSemantics img")) {
+    image.addEventListener("click", () => selected.add(image));
+}
+document.getElementById("confirm-button").addEventListener("click", () => {
+    if (selected.size > 0) markSolved();
+});
+"""
+
+SWAP_TWO_SCRIPT = """
+const image = document.querySelector("img[class^=pizzle-box]");
+let pressed = false;
+image.addEventListener("mousedown", () => { pressed = true; });
+document.addEventListener("mouseup", () => {
+    if (!pressed) return;
+    pressed = false;
+    markSolved();
+});
+"""
+
+
+def _data_url(b64: str) -> str:
+    return "data:image/png;base64," + b64
+
+
+def _captured_slide_markup() -> str:
+    """The arced slide dialog from the captured Temu page"""
+    with open(CAPTURED_PAGE, encoding="utf-8") as f:
+        page = f.read()
+    start = page.index('<div class="_2an7OPVF">')
+    end = page.index("</body>", start)
+    markup = page[start:end]
+    # the captured dialog is followed by the closing tag of its wrapper
+    markup = markup[:markup.rindex("</div>")]
+    # give the slide bar a fixed layout, since Temu's stylesheets are not loaded
+    return markup.replace('class="vT4I57cQ"', 'class="vT4I57cQ" id="slide-track"', 1)
+
+
+def _captured_slide_images() -> tuple[str, str]:
+    """The puzzle and piece images of the captured Temu page, as data urls"""
+    markup = _captured_slide_markup()
+    images = re.findall(r'<img src="(data:image/[^"]+)"', markup)
+    return images[0], images[1]
+
+
+def _slide_script(x_scale: float, top: float, height: float, rotates: bool) -> str:
+    return SLIDE_SCRIPT \
+        .replace("ARC_X_SCALE", str(x_scale)) \
+        .replace("ARC_TOP", str(top)) \
+        .replace("ARC_HEIGHT", str(height)) \
+        .replace("ARC_ROTATES", "true" if rotates else "false")
+
+
+def _arced_slide_page() -> tuple[str, str]:
+    return _captured_slide_markup(), _slide_script(0.8, 115, 60, rotates=True)
+
+
+def _puzzle_page() -> tuple[str, str]:
+    puzzle_src, piece_src = _captured_slide_images()
+    markup = f"""
+<div id="Slider">
+    <div id="slider"><img src="{puzzle_src}"><div id="img-button" style="top: 80px;"><img src="{piece_src}"></div></div>
+    <div id="slide-track"><div id="slide-button" style="left: 0px;"></div></div>
+</div>"""
+    return markup, _slide_script(1, 80, 0, rotates=False)
+
+
+def _semantic_shapes_page() -> tuple[str, str]:
+    request = load_fixture_json("semantic_shapes_request.json")
+    markup = f"""
+<div class="picture-text-mock">{html.escape(request["challenge"])}</div>
+<div id="Picture"><img id="captchaImg" src="{_data_url(request["image_b64"])}"></div>
+<div class="refresh-27d6x" role="button">refresh</div>"""
+    dots_to_solve = len(STUB_RESPONSES["/semantic-shapes"]["proportionalPoints"])
+    return markup, SEMANTIC_SHAPES_SCRIPT.replace("DOTS_TO_SOLVE", str(dots_to_solve))
+
+
+def _three_by_three_page() -> tuple[str, str]:
+    request = load_fixture_json("three_by_three_request.json")
+    objects = ",".join(f"'{name}'" for name in request["objects_of_interest"])
+    images = "".join(f'<img class="loaded" src="{_data_url(b64)}">' for b64 in request["images"])
+    markup = f"""
+<div class="verifyDialog">
+    <div role="dialog">Click on the corresponding images in the following order: {html.escape(objects)}</div>
+    <div id="imageSemantics">{images}</div>
+    <div role="button" id="confirm-button"><span>Confirm</span></div>
+</div>"""
+    return markup, THREE_BY_THREE_SCRIPT
+
+
+def _swap_two_page() -> tuple[str, str]:
+    request = load_fixture_json("semantic_shapes_request.json")
+    markup = f'<img class="pizzle-box-mock" src="{_data_url(request["image_b64"])}" style="width: 400px;">'
+    return markup, SWAP_TWO_SCRIPT
+
+
+# The captcha types that identify_captcha can detect
+MOCK_PAGES = {
+    CaptchaType.ARCED_SLIDE: _arced_slide_page,
+    CaptchaType.PUZZLE: _puzzle_page,
+    CaptchaType.SEMANTIC_SHAPES: _semantic_shapes_page,
+    CaptchaType.THREE_BY_THREE: _three_by_three_page,
+    CaptchaType.SWAP_TWO: _swap_two_page,
+}
+
+
+def render_mock_page(captcha_type: CaptchaType, solve_delay: float = 0.1) -> str:
+    """HTML of the mock page for a captcha type
+
+    Args:
+        captcha_type: the captcha to render
+        solve_delay: seconds between the final interaction and the captcha being removed
+    """
+    markup, script = MOCK_PAGES[captcha_type]()
+    return PAGE_TEMPLATE.format(
+        title=captcha_type.name,
+        markup=markup,
+        script=script,
+        solve_delay_ms=int(solve_delay * 1000),
+    )
+
+
+class MockCaptchaSite:
+    """Serves a mock page for every captcha type on localhost, at /<captcha type name>.
+
+    Args:
+        solve_delay: seconds between the final interaction and the captcha being removed
+    """
+
+    def __init__(self, solve_delay: float = 0.1) -> None:
+        self.pages = {
+            "/" + captcha_type.name.lower(): render_mock_page(captcha_type, solve_delay).encode()
+            for captcha_type in MOCK_PAGES
+        }
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, captcha_type: CaptchaType) -> str:
+        return self.base_url + "/" + captcha_type.name.lower()
+
+    def __enter__(self) -> "MockCaptchaSite":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                page = pages.get(self.path)
+                status = 200 if page is not None else 404
+                body = page if page is not None else b"not found"
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,30 @@
+"""Loads the request JSON files dumped by the solvers with dump_requests=True"""
+
+import json
+import os
+
+from pydantic import BaseModel
+
+from temu_captcha_solver.models import ArcedSlideCaptchaRequest, SemanticShapesRequest, ThreeByThreeCaptchaRequest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_FIXTURES: dict[str, type[BaseModel]] = {
+    "arced_slide_request.json": ArcedSlideCaptchaRequest,
+    "semantic_shapes_request.json": SemanticShapesRequest,
+    "semantic_items_request.json": SemanticShapesRequest,
+    "three_by_three_request.json": ThreeByThreeCaptchaRequest,
+}
+
+
+def load_fixture_json(filename: str) -> dict:
+    with open(os.path.join(REPO_ROOT, filename)) as f:
+        return json.load(f)
+
+
+def load_fixtures() -> dict[str, BaseModel]:
+    """Every shipped request fixture, parsed into its model"""
+    return {
+        filename: model(**load_fixture_json(filename))
+        for filename, model in REQUEST_FIXTURES.items()
+    }
@@ -1,10 +1,75 @@
-from .seleniumsolver import SeleniumSolver
-from .playwrightsolver import PlaywrightSolver
-from .asyncplaywrightsolver import AsyncPlaywrightSolver
-from .api import ApiClient
-
-from .launcher import (
-    make_playwright_solver_context,
-    make_undetected_chromedriver_solver,
-    make_async_playwright_solver_context
-)
+"""SadCaptcha solvers for Temu captchas.
+
+The public names are imported on first access, so a worker that only uses async Playwright
+does not import Selenium or undetected_chromedriver. See benchmarks/bench_import_time.py.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .seleniumsolver import SeleniumSolver
+    from .playwrightsolver import PlaywrightSolver
+    from .asyncplaywrightsolver import AsyncPlaywrightSolver
+    from .api import ApiClient
+    from .async_api import AsyncApiClient
+    from .solver_pool import SolverPool
+    from .fleet import Fleet
+    from .context_pool import AsyncContextPool, ContextPool
+    from .instrumentation import HistogramCollector, SolveObserver, SolveRecord
+    from .result_cache import LruResultCache, ResultCache, SqliteResultCache
+    from .resilience import CircuitBreaker, Resilience
+    from .image_payload import ImagePayload
+    from .geometry import TrajectoryArray
+    from .recorder import ApiRecorder
+    from .logs import set_log_levels
+
+    from .launcher import (
+        make_playwright_solver_context,
+        make_undetected_chromedriver_solver,
+        make_async_playwright_solver_context
+    )
+
+# public name -> module it is imported from
+_EXPORTS = {
+    "SeleniumSolver": ".seleniumsolver",
+    "PlaywrightSolver": ".playwrightsolver",
+    "AsyncPlaywrightSolver": ".asyncplaywrightsolver",
+    "ApiClient": ".api",
+    "AsyncApiClient": ".async_api",
+    "SolverPool": ".solver_pool",
+    "Fleet": ".fleet",
+    "AsyncContextPool": ".context_pool",
+    "ContextPool": ".context_pool",
+    "HistogramCollector": ".instrumentation",
+    "SolveObserver": ".instrumentation",
+    "SolveRecord": ".instrumentation",
+    "LruResultCache": ".result_cache",
+    "ResultCache": ".result_cache",
+    "SqliteResultCache": ".result_cache",
+    "CircuitBreaker": ".resilience",
+    "Resilience": ".resilience",
+    "ImagePayload": ".image_payload",
+    "TrajectoryArray": ".geometry",
+    "ApiRecorder": ".recorder",
+    "set_log_levels": ".logs",
+    "make_playwright_solver_context": ".launcher",
+    "make_undetected_chromedriver_solver": ".launcher",
+    "make_async_playwright_solver_context": ".launcher",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    # later lookups find the name directly, without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,78 +1,135 @@
-from typing import Any
+from typing import TYPE_CHECKING, Any
 import pydantic
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+import time
 
-from .models import ArcedSlideCaptchaRequest, ArcedSlideCaptchaResponse, ProportionalPoint, PuzzleCaptchaResponse, SemanticShapesRequest, MultiPointResponse, SwapTwoRequest, ThreeByThreeCaptchaRequest, ThreeByThreeCaptchaResponse, TwoImageCaptchaRequest
+from . import logs  # applies TEMU_CAPTCHA_SOLVER_LOG
+from .encoding import JSON_HEADERS, encode_request_body
+from .image_payload import ImagePayload
+from .recorder import ApiRecorder
+from .result_cache import ResultCache, result_cache_key
+from .models import ArcedSlideCaptchaRequest, ArcedSlideCaptchaResponse, PuzzleCaptchaResponse, SemanticShapesRequest, MultiPointResponse, SwapTwoRequest, ThreeByThreeCaptchaRequest, ThreeByThreeCaptchaResponse, TwoImageCaptchaRequest
+
+if TYPE_CHECKING:
+    from .resilience import Resilience
 
 LOGGER = logging.getLogger(__name__)
 
+SADCAPTCHA_BASE_URL = "https://www.sadcaptcha.com/api/v1"
+
+ENDPOINTS = {
+    "puzzle": "puzzle",
+    "arced_slide": "temu-arced-slide",
+    "semantic_shapes": "semantic-shapes",
+    "semantic_items": "semantic-items",
+    "three_by_three": "temu-three-by-three",
+    "swap_two": "temu-swap-two",
+    "two_image": "temu-two-image",
+}
+"""The API endpoint each client method calls, by method name"""
+
 class ApiException(Exception):
     pass
 
 class BadRequest(ApiException):
     pass
 
+class ServerError(ApiException):
+    """The API answered with a server error (5xx). Usually temporary."""
+    pass
+
+class CircuitOpenError(ApiException):
+    """The API was not called because it has been failing. See resilience.py."""
+    pass
+
 class ApiClient:
 
-    def __init__(self, api_key: str) -> None:
-        self._PUZZLE_URL = "https://www.sadcaptcha.com/api/v1/puzzle?licenseKey=" + api_key
-        self._ARCED_SLIDE_URL = "https://www.sadcaptcha.com/api/v1/temu-arced-slide?licenseKey=" + api_key
-        self._SEMANTIC_SHAPES_URL = "https://www.sadcaptcha.com/api/v1/semantic-shapes?licenseKey=" + api_key
-        self._SEMANTIC_ITEMS_URL = "https://www.sadcaptcha.com/api/v1/semantic-items?licenseKey=" + api_key
-        self._THREE_BY_THREE_URL = "https://www.sadcaptcha.com/api/v1/temu-three-by-three?licenseKey=" + api_key
-        self._SWAP_TWO_URL = "https://www.sadcaptcha.com/api/v1/temu-swap-two?licenseKey=" + api_key
-        self._TWO_IMAGE_URL = "https://www.sadcaptcha.com/api/v1/temu-two-image?licenseKey=" + api_key
+    def __init__(
+            self,
+            api_key: str,
+            base_url: str = SADCAPTCHA_BASE_URL,
+            pool_size: int = 10,
+            keep_alive: bool = True,
+            connect_timeout: float = 10,
+            read_timeout: float = 60,
+            compact_requests: bool = False,
+            result_cache: ResultCache | None = None,
+            resilience: "Resilience | None" = None,
+            recorder: ApiRecorder | None = None
+        ) -> None:
+        """Client for the SadCaptcha API.
+
+        Requests are made through a single pooled requests.Session, so repeated
+        solves reuse the same TCP/TLS connection instead of paying a new handshake.
+
+        Args:
+            api_key: SadCaptcha API key
+            base_url: base URL of the SadCaptcha API
+            pool_size: maximum number of connections kept open to the API host
+            keep_alive: reuse connections between requests. If False, every request opens a new connection
+            connect_timeout: seconds to wait for a connection to the API
+            read_timeout: seconds to wait for the API to respond
+            compact_requests: encode request bodies directly from the models with encode_request_body,
+                instead of model_dump() and json.dumps(). Several times faster for large images, and slightly smaller.
+            result_cache: answer repeated challenges from this cache instead of calling the API.
+                See result_cache.py for the captcha types that are cached.
+            resilience: retry server and connection errors, fail fast while the API is down,
+                and optionally hedge slow requests. See resilience.py.
+            recorder: append every API call, with its response, latency and outcome, to this recorder.
+                See recorder.py and replay.py.
+        """
+        self.endpoint_urls = make_endpoint_urls(base_url, api_key)
+        """The url of each API endpoint, by endpoint name, e.g. temu-two-image"""
+        self._timeout = (connect_timeout, read_timeout)
+        self._compact_requests = compact_requests
+        self._result_cache = result_cache
+        self._resilience = resilience
+        self._recorder = recorder
+        self._session = _make_session(pool_size, keep_alive)
 
-    def puzzle(self, puzzle_b64: str, piece_b64: str) -> PuzzleCaptchaResponse:
+    def close(self) -> None:
+        """Close the pooled connections to the API"""
+        self._session.close()
+
+    def __enter__(self) -> "ApiClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def puzzle(self, puzzle_b64: str | ImagePayload, piece_b64: str | ImagePayload) -> PuzzleCaptchaResponse:
         """Slide the puzzle piece"""
         data = {
             "puzzleImageB64": puzzle_b64,
             "pieceImageB64": piece_b64
         }        
-        resp = self._make_post_request(self._PUZZLE_URL, data)
+        resp = self._make_post_request(self.endpoint_urls["puzzle"], data)
         result = resp.json()
-        LOGGER.debug("Got API response: " + str(result))
+        LOGGER.debug("Got API response: %s", result)
         return PuzzleCaptchaResponse(slide_x_proportion=result.get("slideXProportion"))
 
     def arced_slide(self, request: ArcedSlideCaptchaRequest | dict[str, Any]) -> ArcedSlideCaptchaResponse:
         """This is the Temu captcha where it's a puzzle slide, 
         but the piece travels in an unpredicatble trajectory and the 
         slide button is not correlated with the trajectory."""
-        resp = self._make_post_request(self._ARCED_SLIDE_URL, request)
+        resp = self._make_post_request(self.endpoint_urls["temu-arced-slide"], request)
         result = resp.json()
-        LOGGER.debug("Got API response: " + str(result))
+        LOGGER.debug("Got API response: %s", result)
         return ArcedSlideCaptchaResponse(pixels_from_slider_origin=result["pixelsFromSliderOrigin"])
 
     def semantic_shapes(self, request: SemanticShapesRequest | dict[str, Any]) -> MultiPointResponse:
         """Get the correct place to click to answer the challenge"""
-        resp = self._make_post_request(self._SEMANTIC_SHAPES_URL, request)
-        result = resp.json()
-        LOGGER.debug("Got API response: " + str(result))
-        return MultiPointResponse(
-            proportional_points=[
-                ProportionalPoint(
-                    proportion_x=point["proportionX"],
-                    proportion_y=point["proportionY"]
-                )
-                for point in result["proportionalPoints"]
-            ]
-        )
+        result = self._make_cached_post_request(self.endpoint_urls["semantic-shapes"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
 
     def semantic_items(self, request: SemanticShapesRequest | dict[str, Any]) -> MultiPointResponse:
         """Get the correct place to click to answer the challenge"""
-        resp = self._make_post_request(self._SEMANTIC_ITEMS_URL, request)
-        result = resp.json()
-        LOGGER.debug("Got API response: " + str(result))
-        return MultiPointResponse(
-            proportional_points=[
-                ProportionalPoint(
-                    proportion_x=point["proportionX"],
-                    proportion_y=point["proportionY"]
-                )
-                for point in result["proportionalPoints"]
-            ]
-        )
+        result = self._make_cached_post_request(self.endpoint_urls["semantic-items"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
 
     def three_by_three(self, request: ThreeByThreeCaptchaRequest | dict[str, Any]) -> ThreeByThreeCaptchaResponse:
         """Get the indices of correct inages to click, in the order they must be clicked.
@@ -80,55 +137,126 @@ class ApiClient:
             0 1 2
             3 4 5
             6 7 8"""
-        resp = self._make_post_request(self._THREE_BY_THREE_URL, request)
-        result = resp.json()
-        LOGGER.debug("Got API response: " + str(result))
+        result = self._make_cached_post_request(self.endpoint_urls["temu-three-by-three"], request)
+        LOGGER.debug("Got API response: %s", result)
         return ThreeByThreeCaptchaResponse(solution_indices=result["solutionIndices"])
 
     def swap_two(self, request: SwapTwoRequest | dict[str, Any]) -> MultiPointResponse:
         """Get the two sets of coordinates on the image to click and drag to.
         First point is the place to start the click, second point is the place to 
         drag to and release"""
-        resp = self._make_post_request(self._SWAP_TWO_URL, request)
-        result = resp.json()
-        LOGGER.debug("Got API response: " + str(result))
-        return MultiPointResponse(
-            proportional_points=[
-                ProportionalPoint(
-                    proportion_x=point["proportionX"],
-                    proportion_y=point["proportionY"]
-                )
-                for point in result["proportionalPoints"]
-            ]
-        )
+        result = self._make_cached_post_request(self.endpoint_urls["temu-swap-two"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
 
     def two_image(self, request: TwoImageCaptchaRequest | dict[str, Any]) -> MultiPointResponse:
         """Get the correct place to click to answer the challenge"""
-        resp = self._make_post_request(self._TWO_IMAGE_URL, request)
-        result = resp.json()
-        LOGGER.debug("Got API response: " + str(result))
-        return MultiPointResponse(
-            proportional_points=[
-                ProportionalPoint(
-                    proportion_x=point["proportionX"],
-                    proportion_y=point["proportionY"]
-                )
-                for point in result["proportionalPoints"]
-            ]
-        )
+        result = self._make_cached_post_request(self.endpoint_urls["temu-two-image"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
+
+    def post(self, endpoint: str, data: pydantic.BaseModel | dict[str, Any]) -> dict[str, Any]:
+        """Send data to endpoint, e.g. temu-two-image, and return the JSON result as is.
+        Skips the result cache, but retries and records like every other call."""
+        return self._make_post_request(self.endpoint_urls[endpoint], data).json()
+
+    def forget_result(self, endpoint: str, data: pydantic.BaseModel | dict[str, Any]) -> None:
+        """Remove the cached result of a request to endpoint, e.g. because its answer did not solve the captcha"""
+        if self._result_cache is not None:
+            self._result_cache.delete(result_cache_key(self.endpoint_urls[endpoint], data))
+
+    def _make_cached_post_request(self, url: str, data: pydantic.BaseModel | dict[str, Any]) -> dict[str, Any]:
+        """Answer from the result cache if this challenge was solved before, otherwise ask the API and cache the result"""
+        if self._result_cache is None:
+            return self._make_post_request(url, data).json()
+        key = result_cache_key(url, data)
+        result = self._result_cache.get(key)
+        if result is not None:
+            LOGGER.debug("answered request from result cache")
+            return result
+        result = self._make_post_request(url, data).json()
+        self._result_cache.set(key, result)
+        return result
 
     def _make_post_request(self, url: str, data: pydantic.BaseModel | dict[str, Any]) -> requests.Response:
-        if isinstance(data, pydantic.BaseModel):
-            resp = requests.post(url, json=data.model_dump())
+        if self._compact_requests:
+            body: dict[str, Any] = {"data": encode_request_body(data), "headers": JSON_HEADERS}
         else:
-            resp = requests.post(url, json=data)
-        if resp.status_code == 400:
-            raise BadRequest(f"status code {resp.status_code}. bad request or could not find answer")     
-        if resp.status_code == 401:
-            raise ApiException(f"status code {resp.status_code}. either bad API key or out of credits")     
-        if resp.status_code == 502:
-            raise ApiException("The SadCaptcha server is currently under maintenance, and will be back within 5 minutes.")
-        if resp.status_code not in (200, 201):
-            raise ApiException(f"status code {resp.status_code}. Probably a server issue. Please set log level to DEBUG and send the output to the SadCaptcha team to investigate")     
-        LOGGER.debug(f"made successful request on {url}")
+            body = {"json": request_json(data)}
+
+        def post() -> requests.Response:
+            resp = self._session.post(url, timeout=self._timeout, **body)
+            raise_for_status_code(resp.status_code)
+            return resp
+
+        start = time.perf_counter()
+        try:
+            resp = post() if self._resilience is None else self._resilience.call(url, post)
+        except Exception as e:
+            if self._recorder is not None:
+                self._recorder.record(url, data, None, time.perf_counter() - start, e)
+            raise
+        if self._recorder is not None:
+            self._recorder.record(url, data, resp.json(), time.perf_counter() - start)
+        LOGGER.debug("made successful request on %s", url)
         return resp
+
+
+def make_endpoint_urls(base_url: str, api_key: str) -> dict[str, str]:
+    """The url of each API endpoint, by endpoint name"""
+    return {endpoint: base_url + "/" + endpoint + "?licenseKey=" + api_key for endpoint in ENDPOINTS.values()}
+
+
+def raise_for_status_code(status_code: int) -> None:
+    """Raise the appropriate ApiException if the API did not answer with success"""
+    if status_code == 400:
+        raise BadRequest(f"status code {status_code}. bad request or could not find answer")     
+    if status_code == 401:
+        raise ApiException(f"status code {status_code}. either bad API key or out of credits")     
+    if status_code == 502:
+        raise ServerError("The SadCaptcha server is currently under maintenance, and will be back within 5 minutes.")
+    if 500 <= status_code < 600:
+        raise ServerError(f"status code {status_code}. Probably a server issue. Please set log level to DEBUG and send the output to the SadCaptcha team to investigate")
+    if status_code not in (200, 201):
+        raise ApiException(f"status code {status_code}. Probably a server issue. Please set log level to DEBUG and send the output to the SadCaptcha team to investigate")     
+
+
+def request_json(data: pydantic.BaseModel | dict[str, Any]) -> dict[str, Any]:
+    """Get the JSON body of an API request"""
+    if isinstance(data, pydantic.BaseModel):
+        return data.model_dump()
+    return {key: _plain_json(value) for key, value in data.items()}
+
+
+def _plain_json(value: Any) -> Any:
+    """value with any ImagePayload turned into its base64 str"""
+    if isinstance(value, ImagePayload):
+        return str(value)
+    if isinstance(value, list):
+        return [_plain_json(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain_json(item) for key, item in value.items()}
+    return value
+
+
+def multi_point_response_from_json(result: dict[str, Any]) -> MultiPointResponse:
+    """Parse the proportional points returned by the API.
+    The whole response is validated in one call, rather than a ProportionalPoint per point."""
+    return MultiPointResponse(
+        proportional_points=[
+            {"proportion_x": point["proportionX"], "proportion_y": point["proportionY"]}
+            for point in result["proportionalPoints"]
+        ]
+    )
+
+
+def _make_session(pool_size: int, keep_alive: bool) -> requests.Session:
+    """Make a session whose connection pool is sized for pool_size concurrent requests"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    LOGGER.debug("made api session with pool size %s, keep alive %s", pool_size, keep_alive)
+    return session
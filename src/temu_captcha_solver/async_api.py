@@ -0,0 +1,194 @@
+from typing import TYPE_CHECKING, Any
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+import pydantic
+
+from .api import SADCAPTCHA_BASE_URL, make_endpoint_urls, multi_point_response_from_json, raise_for_status_code, request_json
+from .encoding import JSON_HEADERS, encode_request_body
+from .image_payload import ImagePayload
+from .recorder import ApiRecorder
+from .result_cache import ResultCache, result_cache_key
+from .models import ArcedSlideCaptchaRequest, ArcedSlideCaptchaResponse, PuzzleCaptchaResponse, SemanticShapesRequest, MultiPointResponse, SwapTwoRequest, ThreeByThreeCaptchaRequest, ThreeByThreeCaptchaResponse, TwoImageCaptchaRequest
+
+if TYPE_CHECKING:
+    from .resilience import Resilience
+
+LOGGER = logging.getLogger(__name__)
+
+class AsyncApiClient:
+
+    def __init__(
+            self,
+            api_key: str,
+            base_url: str = SADCAPTCHA_BASE_URL,
+            pool_size: int = 100,
+            keep_alive: bool = True,
+            connect_timeout: float = 10,
+            read_timeout: float = 60,
+            compact_requests: bool = False,
+            result_cache: ResultCache | None = None,
+            resilience: "Resilience | None" = None,
+            recorder: ApiRecorder | None = None
+        ) -> None:
+        """Non-blocking client for the SadCaptcha API, for use with asyncio.
+
+        Requests are made through a single pooled aiohttp session, so awaiting a
+        solve does not block the event loop and many pages can solve at the same time.
+        The session is created on first use, inside the running event loop.
+
+        Args:
+            api_key: SadCaptcha API key
+            base_url: base URL of the SadCaptcha API
+            pool_size: maximum number of concurrent connections to the API host
+            keep_alive: reuse connections between requests. If False, every request opens a new connection
+            connect_timeout: seconds to wait for a connection to the API
+            read_timeout: seconds to wait for the API to respond
+            compact_requests: encode request bodies directly from the models with encode_request_body,
+                instead of model_dump() and json.dumps(). Several times faster for large images, and slightly smaller.
+            result_cache: answer repeated challenges from this cache instead of calling the API.
+                See result_cache.py for the captcha types that are cached.
+            resilience: retry server and connection errors, fail fast while the API is down,
+                and optionally hedge slow requests. See resilience.py.
+            recorder: append every API call, with its response, latency and outcome, to this recorder.
+                See recorder.py and replay.py.
+        """
+        self.endpoint_urls = make_endpoint_urls(base_url, api_key)
+        """The url of each API endpoint, by endpoint name, e.g. temu-two-image"""
+        self._pool_size = pool_size
+        self._keep_alive = keep_alive
+        self._compact_requests = compact_requests
+        self._result_cache = result_cache
+        self._resilience = resilience
+        self._recorder = recorder
+        self._timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self._session: aiohttp.ClientSession | None = None
+
+    async def close(self) -> None:
+        """Close the pooled connections to the API"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncApiClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def puzzle(self, puzzle_b64: str | ImagePayload, piece_b64: str | ImagePayload) -> PuzzleCaptchaResponse:
+        """Slide the puzzle piece"""
+        data = {
+            "puzzleImageB64": puzzle_b64,
+            "pieceImageB64": piece_b64
+        }
+        result = await self._make_post_request(self.endpoint_urls["puzzle"], data)
+        LOGGER.debug("Got API response: %s", result)
+        return PuzzleCaptchaResponse(slide_x_proportion=result.get("slideXProportion"))
+
+    async def arced_slide(self, request: ArcedSlideCaptchaRequest | dict[str, Any]) -> ArcedSlideCaptchaResponse:
+        """This is the Temu captcha where it's a puzzle slide,
+        but the piece travels in an unpredicatble trajectory and the
+        slide button is not correlated with the trajectory."""
+        result = await self._make_post_request(self.endpoint_urls["temu-arced-slide"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return ArcedSlideCaptchaResponse(pixels_from_slider_origin=result["pixelsFromSliderOrigin"])
+
+    async def semantic_shapes(self, request: SemanticShapesRequest | dict[str, Any]) -> MultiPointResponse:
+        """Get the correct place to click to answer the challenge"""
+        result = await self._make_cached_post_request(self.endpoint_urls["semantic-shapes"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
+
+    async def semantic_items(self, request: SemanticShapesRequest | dict[str, Any]) -> MultiPointResponse:
+        """Get the correct place to click to answer the challenge"""
+        result = await self._make_cached_post_request(self.endpoint_urls["semantic-items"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
+
+    async def three_by_three(self, request: ThreeByThreeCaptchaRequest | dict[str, Any]) -> ThreeByThreeCaptchaResponse:
+        """Get the indices of correct inages to click, in the order they must be clicked.
+        Where the indeces correspond to the following panels:
+            0 1 2
+            3 4 5
+            6 7 8"""
+        result = await self._make_cached_post_request(self.endpoint_urls["temu-three-by-three"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return ThreeByThreeCaptchaResponse(solution_indices=result["solutionIndices"])
+
+    async def swap_two(self, request: SwapTwoRequest | dict[str, Any]) -> MultiPointResponse:
+        """Get the two sets of coordinates on the image to click and drag to.
+        First point is the place to start the click, second point is the place to
+        drag to and release"""
+        result = await self._make_cached_post_request(self.endpoint_urls["temu-swap-two"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
+
+    async def two_image(self, request: TwoImageCaptchaRequest | dict[str, Any]) -> MultiPointResponse:
+        """Get the correct place to click to answer the challenge"""
+        result = await self._make_cached_post_request(self.endpoint_urls["temu-two-image"], request)
+        LOGGER.debug("Got API response: %s", result)
+        return multi_point_response_from_json(result)
+
+    async def post(self, endpoint: str, data: pydantic.BaseModel | dict[str, Any]) -> dict[str, Any]:
+        """Send data to endpoint, e.g. temu-two-image, and return the JSON result as is.
+        Skips the result cache, but retries and records like every other call."""
+        return await self._make_post_request(self.endpoint_urls[endpoint], data)
+
+    async def forget_result(self, endpoint: str, data: pydantic.BaseModel | dict[str, Any]) -> None:
+        """Remove the cached result of a request to endpoint, e.g. because its answer did not solve the captcha"""
+        if self._result_cache is not None:
+            await asyncio.to_thread(self._result_cache.delete, result_cache_key(self.endpoint_urls[endpoint], data))
+
+    async def _make_cached_post_request(self, url: str, data: pydantic.BaseModel | dict[str, Any]) -> dict[str, Any]:
+        """Answer from the result cache if this challenge was solved before, otherwise ask the API and cache the result.
+        The cache is called in a thread, as SqliteResultCache would block the event loop on disk."""
+        if self._result_cache is None:
+            return await self._make_post_request(url, data)
+        key = result_cache_key(url, data)
+        result = await asyncio.to_thread(self._result_cache.get, key)
+        if result is not None:
+            LOGGER.debug("answered request from result cache")
+            return result
+        result = await self._make_post_request(url, data)
+        await asyncio.to_thread(self._result_cache.set, key, result)
+        return result
+
+    async def _make_post_request(self, url: str, data: pydantic.BaseModel | dict[str, Any]) -> dict[str, Any]:
+        if self._compact_requests:
+            body: dict[str, Any] = {"data": encode_request_body(data), "headers": JSON_HEADERS}
+        else:
+            body = {"json": request_json(data)}
+
+        async def post() -> dict[str, Any]:
+            async with self._get_session().post(url, **body) as resp:
+                raise_for_status_code(resp.status)
+                return json.loads(await resp.read())
+
+        start = time.perf_counter()
+        try:
+            result = await post() if self._resilience is None else await self._resilience.call_async(url, post)
+        except Exception as e:
+            if self._recorder is not None:
+                # encoded and written in a thread, so the gzip writes and rotations do not block the event loop
+                await asyncio.to_thread(self._recorder.record, url, data, None, time.perf_counter() - start, e)
+            raise
+        if self._recorder is not None:
+            await asyncio.to_thread(self._recorder.record, url, data, result, time.perf_counter() - start)
+        LOGGER.debug("made successful request on %s", url)
+        return result
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the pooled session, creating it in the running event loop if needed"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_size,
+                limit_per_host=self._pool_size,
+                force_close=not self._keep_alive
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+            LOGGER.debug("made async api session with pool size %s, keep alive %s", self._pool_size, self._keep_alive)
+        return self._session
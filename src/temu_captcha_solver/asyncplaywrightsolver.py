@@ -5,11 +5,11 @@ import math
 import random
 from typing import Any
 import warnings
-from playwright.async_api import FloatRect, Locator, Page, expect
+from playwright.async_api import Error, FloatRect, Frame, Locator, Page, expect
 from playwright.async_api import TimeoutError
 import asyncio
+import time
 
-from temu_captcha_solver.async_plawright_util import wait_for_locator_to_be_stable
 from temu_captcha_solver.parsers import get_list_of_objects_of_interest
 
 from .selectors import (
@@ -17,7 +17,6 @@ from .selectors import (
     ARCED_SLIDE_PIECE_CONTAINER_SELECTOR,
     ARCED_SLIDE_PIECE_IMAGE_SELECTOR,
     ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR,
-    CAPTCHA_PRESENCE_INDICATORS,
     PUZZLE_BUTTON_SELECTOR,
     PUZZLE_PIECE_IMAGE_SELECTOR,
     PUZZLE_PUZZLE_IMAGE_SELECTOR,
@@ -32,16 +31,13 @@ from .selectors import (
 ) 
 
 from .geometry import (
+    TrajectoryArray,
     get_box_center,
     get_center,
-    piece_is_not_moving,
-    rotate_angle_from_style,
-    xy_to_proportional_point
 ) 
 
 from .models import (
     ArcedSlideCaptchaRequest,
-    ArcedSlideTrajectoryElement,
     MultiPointResponse,
     SemanticShapesRequest,
     SwapTwoRequest,
@@ -50,14 +46,31 @@ from .models import (
 ) 
 
 from .asyncsolver import AsyncSolver
-from .api import ApiClient, BadRequest
+from .captchatype import CaptchaType
+from .instrumentation import API, EXTRACTION, INTERACTION, VALIDATION, SolveObserver
+from .detection import DETECT_CAPTCHA_TYPE_JS, captcha_type_from_index, detection_args
+from .presence import WATCH_CAPTCHA_PRESENCE_JS, presence_args
+from .trajectory_sampler import (
+    SIMPLIFY_MAX_GAP_STEPS,
+    START_TRAJECTORY_SAMPLER_JS,
+    STOP_TRAJECTORY_SAMPLER_JS,
+    TRAJECTORY_SAMPLER_IS_STILL_JS,
+    sampler_args,
+    simplify_trajectory,
+    sweep_chunks,
+    trajectory_from_samples
+)
+from .solver_commons.three_by_three import TILE_SOURCES_JS, image_payloads_from_sources
+from .image_payload import ImagePayload
+from .api import BadRequest
+from .async_api import AsyncApiClient
 
 
 LOGGER = logging.getLogger(__name__)
 
 class AsyncPlaywrightSolver(AsyncSolver):
 
-    client: ApiClient
+    client: AsyncApiClient
     page: Page
 
     def __init__(
@@ -67,63 +80,113 @@ class AsyncPlaywrightSolver(AsyncSolver):
             headers: dict[str, Any] | None = None, 
             proxy: str | None = None,
             dump_requests: bool = False,
-            mouse_step_size: int = 5
+            mouse_step_size: int = 5,
+            min_dwell: float = 0.5,
+            observer: SolveObserver | None = None,
+            client: AsyncApiClient | None = None,
+            pipelined: bool = False
         ) -> None:
         warnings.warn(
             "AsyncPlaywrightSolver is deprecated. Please use 'make_async_playwright_solver_context()' instead for a more reliable experience.")
         self.page = page
-        self.client = ApiClient(sadcaptcha_api_key)
+        # A shared client lets many solvers reuse one connection pool
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncApiClient(sadcaptcha_api_key)
         self.headers = headers
         self.proxy = proxy
         self.mouse_step_size = mouse_step_size
-        super().__init__(dump_requests)
+        super().__init__(dump_requests, min_dwell, observer, pipelined)
+
+    async def close(self) -> None:
+        """Close the API client, if this solver made it. A client passed in is left open for its owner."""
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self) -> "AsyncPlaywrightSolver":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
 
     
     async def captcha_is_present(self, timeout: int = 15) -> bool:
-        try:
-            captcha_locator = self.page.locator(CAPTCHA_PRESENCE_INDICATORS[0])
-            for selector in CAPTCHA_PRESENCE_INDICATORS:
-                captcha_locator = captcha_locator.or_(self.page.locator(selector))
-            await expect(captcha_locator.first).to_have_count(1, timeout=timeout * 1000)
+        if await self._watch_presence(present=True, timeout=timeout):
+            LOGGER.debug("captcha is present")
             return True
-        except (TimeoutError, AssertionError):
-            return False
+        LOGGER.debug("captcha is not present")
+        return False
 
-    
     async def captcha_is_not_present(self, timeout: int = 15) -> bool:
-        try:
-            captcha_locator = self.page.locator(CAPTCHA_PRESENCE_INDICATORS[0])
-            for selector in CAPTCHA_PRESENCE_INDICATORS:
-                captcha_locator = captcha_locator.or_(self.page.locator(selector))
-            await expect(captcha_locator.first).to_have_count(0, timeout=timeout * 1000)
+        if await self._watch_presence(present=False, timeout=timeout):
+            LOGGER.debug("captcha is not present")
             return True
-        except (TimeoutError, AssertionError):
-            return False
+        LOGGER.debug("captcha is present")
+        return False
+
+    async def _watch_presence(self, present: bool, timeout: float) -> bool:
+        """Watch the page in-page until the captcha presence equals present, or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if await self.page.evaluate(WATCH_CAPTCHA_PRESENCE_JS, presence_args(present, max(remaining, 0))):
+                    return True
+            except Error as e:
+                # the page navigated or closed during the watch
+                LOGGER.debug("could not watch captcha presence: %s", e)
+                await asyncio.sleep(0.1)
+            if deadline - time.monotonic() <= 0:
+                return False
+
+    async def detect_captcha_type(self, timeout: float = 30) -> CaptchaType:
+        """Probe every frame once, then watch the main frame in-page until a captcha appears.
+        Child frames are probed separately because cross-origin frames cannot be searched from the page."""
+        deadline = time.monotonic() + timeout
+        while True:
+            found = [i for i in await asyncio.gather(*[self._run_detection(frame) for frame in self.page.frames]) if i >= 0]
+            if found:
+                return captcha_type_from_index(min(found))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return CaptchaType.NONE
+            index = await self._run_detection(self.page.main_frame, timeout=min(remaining, 1))
+            if index >= 0:
+                return captcha_type_from_index(index)
+
+    async def _run_detection(self, frame: Frame, timeout: float = 0) -> int:
+        try:
+            return await frame.evaluate(DETECT_CAPTCHA_TYPE_JS, detection_args(timeout))
+        except Error as e:
+            LOGGER.debug("could not run captcha detection in frame: %s", e)
+            return -1
 
-    
     async def solve_puzzle(self, retries: int = 3) -> None:
         """Temu puzzle is special because the pieces shift when pressing the slider button.
         Therefore we must send the pictures after pressing the button. """
-        iframe_selector = "iframe" if await self.iframe_present() else None
-        button_bbox = await self._get_element_bounding_box(PUZZLE_BUTTON_SELECTOR, iframe_selector=iframe_selector)
-        start_x, start_y = get_box_center(button_bbox)
-        await self.page.mouse.move(start_x, start_y)
-        await self.page.mouse.down()
-        start_distance = 10
-        for pixel in range(start_distance):
-            await self.page.mouse.move(start_x + start_distance, start_y + math.log(1 + pixel))
-            await asyncio.sleep(0.05)
-        LOGGER.debug("dragged 10 pixels")
-        puzzle_image = await self.get_b64_img_from_src(PUZZLE_PUZZLE_IMAGE_SELECTOR, iframe_selector=iframe_selector)
-        piece_image = await self.get_b64_img_from_src(PUZZLE_PIECE_IMAGE_SELECTOR, iframe_selector=iframe_selector)
-        resp = self.client.puzzle(puzzle_image, piece_image)
-        slide_bar_width = await self._get_puzzle_slide_bar_width(iframe_selector=iframe_selector)
-        pixel_distance = int(resp.slide_x_proportion * slide_bar_width)
-        LOGGER.debug(f"will continue to drag {pixel_distance} more pixels")
-        for pixel in range(start_distance, pixel_distance):
-            await self.page.mouse.move(start_x + pixel, start_y + math.log(1 + pixel))
-            await asyncio.sleep(0.02)
-        await self.page.mouse.up()
+        with self._phase(INTERACTION):
+            iframe_selector = "iframe" if await self.iframe_present() else None
+            button_bbox = await self._get_element_bounding_box(PUZZLE_BUTTON_SELECTOR, iframe_selector=iframe_selector)
+            start_x, start_y = get_box_center(button_bbox)
+            await self.page.mouse.move(start_x, start_y)
+            await self.page.mouse.down()
+            start_distance = 10
+            for pixel in range(start_distance):
+                await self.page.mouse.move(start_x + start_distance, start_y + math.log(1 + pixel))
+                await asyncio.sleep(0.05)
+            LOGGER.debug("dragged 10 pixels")
+        with self._phase(EXTRACTION):
+            puzzle_image = await self.get_image_payload_from_src(PUZZLE_PUZZLE_IMAGE_SELECTOR, iframe_selector=iframe_selector)
+            piece_image = await self.get_image_payload_from_src(PUZZLE_PIECE_IMAGE_SELECTOR, iframe_selector=iframe_selector)
+        with self._phase(API):
+            resp = await self.client.puzzle(puzzle_image, piece_image)
+        with self._phase(INTERACTION):
+            slide_bar_width = await self._get_puzzle_slide_bar_width(iframe_selector=iframe_selector)
+            pixel_distance = int(resp.slide_x_proportion * slide_bar_width)
+            LOGGER.debug("will continue to drag %s more pixels", pixel_distance)
+            for pixel in range(start_distance, pixel_distance):
+                await self.page.mouse.move(start_x + pixel, start_y + math.log(1 + pixel))
+                await asyncio.sleep(0.02)
+            await self.page.mouse.up()
         LOGGER.debug("done")
 
     
@@ -139,44 +202,63 @@ class AsyncPlaywrightSolver(AsyncSolver):
         
         Determines slider trajectory by dragging the slider element across the entire box,
         and computing the ArcedSlideTrajectoryElement at each location."""
-        slide_button_locator = self.page.locator(ARCED_SLIDE_BUTTON_SELECTOR)
-        await self._move_mouse_to_element_center(slide_button_locator)
-        await self.page.mouse.down()
-        slide_button_box = await self._get_element_bounding_box(ARCED_SLIDE_BUTTON_SELECTOR)
-        start_x = slide_button_box["x"]
-        start_y = slide_button_box["y"]
-        request = await self._gather_arced_slide_request_data(start_x, start_y)
-        solution = self.client.arced_slide(request)
-        await self._drag_mouse_horizontal_with_overshoot(solution.pixels_from_slider_origin, start_x, start_y)
-        await self.page.mouse.up()
+        with self._phase(EXTRACTION):
+            slide_button_locator = self.page.locator(ARCED_SLIDE_BUTTON_SELECTOR)
+            await self._move_mouse_to_element_center(slide_button_locator)
+            await self.page.mouse.down()
+            slide_button_box = await self._get_element_bounding_box(ARCED_SLIDE_BUTTON_SELECTOR)
+            start_x = slide_button_box["x"]
+            start_y = slide_button_box["y"]
+            request = await self._gather_arced_slide_request_data(start_x, start_y)
+        with self._phase(API):
+            solution = await self.client.arced_slide(request)
+        with self._phase(INTERACTION):
+            await self._drag_mouse_horizontal_with_overshoot(solution.pixels_from_slider_origin, start_x, start_y)
+            await self.page.mouse.up()
     
 
     async def solve_three_by_three(self) -> None:
-        image_locators = await self.page.locator(THREE_BY_THREE_IMAGE).all()
-        images_b64: list[str] = []
-        for image_locator in image_locators:
-            images_b64.append(await self.get_b64_img_from_src(image_locator))
-        challenge_text = await self._get_element_text(THREE_BY_THREE_TEXT)
+        with self._phase(EXTRACTION):
+            image_sources = await self.page.locator(THREE_BY_THREE_IMAGE).evaluate_all(TILE_SOURCES_JS)
+            images_b64 = image_payloads_from_sources(image_sources)
+            challenge_text = await self._get_element_text(THREE_BY_THREE_TEXT)
         objects = get_list_of_objects_of_interest(challenge_text)
         request = ThreeByThreeCaptchaRequest(objects_of_interest=objects, images=images_b64)
         if self.dump_requests:
             dump_to_json(request, "three_by_three_request.json")
-        resp = self.client.three_by_three(request)
-        for i in resp.solution_indices:
-            image_locator = self.page.locator(f"img[src*=\"{images_b64[i]}\"]") # Where src matches the desired image
-            await image_locator.click()
-            await asyncio.sleep(1.337)
-        await self._click_proportional(THREE_BY_THREE_CONFIRM_BUTTON, 0.5, 0.5)
+        pending = await self._start_api_call(self.client.three_by_three, request)
+        if self.pipelined:
+            with self._phase(EXTRACTION):
+                challenge_current = await self._get_element_text(THREE_BY_THREE_TEXT)
+            if challenge_current != challenge_text:
+                LOGGER.debug("challenge text has changed since making the initial request. skipping the outdated answer")
+                self._discard_api_call(pending)
+                return
+        resp = await self._api_result(pending)
+        with self._phase(INTERACTION):
+            for i in resp.solution_indices:
+                await self.page.locator(THREE_BY_THREE_IMAGE).nth(i).click()
+                await asyncio.sleep(1.337)
+            await self._click_proportional(THREE_BY_THREE_CONFIRM_BUTTON, 0.5, 0.5)
 
     async def solve_swap_two(self) -> None:
         """Click and drag, swap two to restore the image"""
-        iframe_selector = "iframe" if await self.iframe_present() else None
-        image_b64 = await self.get_b64_img_from_src(SWAP_TWO_IMAGE, iframe_selector=iframe_selector)
+        with self._phase(EXTRACTION):
+            iframe_selector = "iframe" if await self.iframe_present() else None
+            image_b64 = await self.get_image_payload_from_src(SWAP_TWO_IMAGE, iframe_selector=iframe_selector)
         request = SwapTwoRequest(image_b64=image_b64)
         if self.dump_requests:
             dump_to_json(request, "swap_two_request.json")
-        resp = self.client.swap_two(request)
-        await self._drag_proportional(SWAP_TWO_IMAGE, resp, iframe_selector=iframe_selector)
+        pending = await self._start_api_call(self.client.swap_two, request)
+        if self.pipelined:
+            with self._phase(EXTRACTION):
+                await self._wait_for_image_loaded(SWAP_TWO_IMAGE, iframe_selector=iframe_selector)
+        resp = await self._api_result(pending)
+        with self._phase(INTERACTION):
+            await self._drag_proportional(SWAP_TWO_IMAGE, resp, iframe_selector=iframe_selector)
+
+    async def solve_two_image(self) -> None:
+        return await super().solve_two_image()
 
     async def solve_semantic_shapes(self) -> None:
         """Solves the shapes challenge where an image and some text are presented.
@@ -185,59 +267,67 @@ class AsyncPlaywrightSolver(AsyncSolver):
         for _ in range(3):
             iframe_selector = "iframe" if await self.iframe_present() else None
             try:
-                for i in range(-3, 0):
-                    LOGGER.debug(f"solving shapes in in {-1 * i}")
-                    await asyncio.sleep(1)
-
-                image_b64 = await self.get_b64_img_from_src(SEMANTIC_SHAPES_IMAGE, iframe_selector=iframe_selector)
-                challenge = await self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT, iframe_selector=iframe_selector)
+                with self._phase(EXTRACTION):
+                    if not self.pipelined:
+                        await self._wait_for_image_loaded(SEMANTIC_SHAPES_IMAGE, iframe_selector=iframe_selector)
+                    image_b64 = await self.get_image_payload_from_src(SEMANTIC_SHAPES_IMAGE, iframe_selector=iframe_selector)
+                    challenge = await self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT, iframe_selector=iframe_selector)
                 request = SemanticShapesRequest(image_b64=image_b64, challenge=challenge)
                 
                 if self.dump_requests:
                     dump_to_json(request, "semantic_shapes_request.json")
                 
-                resp = self.client.semantic_shapes(request)
-                challenge_current = await self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT, iframe_selector=iframe_selector)
+                pending = await self._start_api_call(self.client.semantic_shapes, request)
+                with self._phase(EXTRACTION):
+                    if self.pipelined:
+                        # the image finishes loading while the api call is in flight
+                        await self._wait_for_image_loaded(SEMANTIC_SHAPES_IMAGE, iframe_selector=iframe_selector)
+                    challenge_current = await self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT, iframe_selector=iframe_selector)
                 
                 if challenge != challenge_current:
                     LOGGER.debug("challenge text has changed since making the initial request. refreshing to avoid clicking incorrect location")
-                    await self._get_locator(SEMANTIC_SHAPES_REFRESH_BUTTON, iframe_selector=iframe_selector).click(force=True)
+                    self._discard_api_call(pending)
+                    with self._phase(INTERACTION):
+                        await self._refresh_semantic_shapes(iframe_selector=iframe_selector)
                     continue
 
-                for point in resp.proportional_points:
-                    red_dot_count = await self._count_red_dots(iframe_selector=iframe_selector)
-                    for i in range(3):
-                        await self._click_proportional(
-                            SEMANTIC_SHAPES_IMAGE,
-                            point.proportion_x,
-                            point.proportion_y,
-                            iframe_selector=iframe_selector 
-                        )                
-                        if red_dot_count == await self._count_red_dots(iframe_selector=iframe_selector):
-                            LOGGER.debug("A new red dot did not appear. trying to click again in a slightly different location")
-                            continue
-                        else:
-                            LOGGER.debug("A new red dot appeared")
-                            break
-                    await asyncio.sleep(1)
-                    LOGGER.debug("clicked answer...")
+                resp = await self._api_result(pending)
+
+                with self._phase(INTERACTION):
+                    for point in resp.proportional_points:
+                        await self._dwell()
+                        red_dot_count = await self._count_red_dots(iframe_selector=iframe_selector)
+                        for i in range(3):
+                            await self._click_proportional(
+                                SEMANTIC_SHAPES_IMAGE,
+                                point.proportion_x,
+                                point.proportion_y,
+                                iframe_selector=iframe_selector 
+                            )                
+                            if await self._wait_for_red_dot_count_change(red_dot_count, iframe_selector=iframe_selector):
+                                LOGGER.debug("A new red dot appeared")
+                                break
+                            else:
+                                LOGGER.debug("A new red dot did not appear. trying to click again in a slightly different location")
+                                continue
+                        LOGGER.debug("clicked answer...")
                 
-                for i in range(-5, 0):
-                    LOGGER.debug(f"validating answer in {-1 * i}")
-                    await asyncio.sleep(1)
-
-                if await self.captcha_is_present(1):
+                LOGGER.debug("validating answer")
+                with self._phase(VALIDATION):
+                    solved = await self.captcha_is_not_present(5)
+                if not solved:
                     LOGGER.debug("captcha was still present after solving. This is normally because it's impossible to click in the region over the solution, and the click was not registered")
-                    await self._get_locator(SEMANTIC_SHAPES_REFRESH_BUTTON, iframe_selector=iframe_selector).click(force=True)
+                    with self._phase(INTERACTION):
+                        await self._refresh_semantic_shapes(iframe_selector=iframe_selector)
                     continue
                 
                 LOGGER.debug("solved semantic shapes")
                 return
 
             except BadRequest as e:
-                LOGGER.debug("API was unable to solve, retrying. error message: " + str(e))
-                await self._get_locator(SEMANTIC_SHAPES_REFRESH_BUTTON, iframe_selector=iframe_selector).click(force=True)
-                await asyncio.sleep(3)
+                LOGGER.debug("API was unable to solve, retrying. error message: %s", e)
+                with self._phase(INTERACTION):
+                    await self._refresh_semantic_shapes(iframe_selector=iframe_selector)
 
     
     async def any_selector_in_list_present(self, selectors: list[str], iframe_locator: str | None = None) -> bool:
@@ -245,16 +335,16 @@ class AsyncPlaywrightSolver(AsyncSolver):
             e = self._get_locator(selector, iframe_selector=iframe_locator)
             for ele in await e.all():
                 if await ele.is_visible():
-                    LOGGER.debug("Detected selector: " + selector + " from list " + ", ".join(selectors))
+                    LOGGER.debug("Detected selector: %s from list %s", selector, selectors)
                     return True
-        LOGGER.debug("No selector in list found: " + ", ".join(selectors))
+        LOGGER.debug("No selector in list found: %s", selectors)
         return False
 
     
     async def _gather_arced_slide_request_data(self, slide_button_center_x: float, slide_button_center_y: float) -> ArcedSlideCaptchaRequest:
         """Get the images and trajectory for arced slide request"""
-        puzzle = await self.get_b64_img_from_src(ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
-        piece = await self.get_b64_img_from_src(ARCED_SLIDE_PIECE_IMAGE_SELECTOR)
+        puzzle = await self.get_image_payload_from_src(ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
+        piece = await self.get_image_payload_from_src(ARCED_SLIDE_PIECE_IMAGE_SELECTOR)
         trajectory = await self._get_slide_piece_trajectory(slide_button_center_x, slide_button_center_y)
         return ArcedSlideCaptchaRequest(
             puzzle_image_b64=puzzle,
@@ -263,33 +353,33 @@ class AsyncPlaywrightSolver(AsyncSolver):
         )
 
 
-    async def _get_slide_piece_trajectory(self, slide_button_center_x: float, slide_button_center_y: float) -> list[ArcedSlideTrajectoryElement]:
+    async def _get_slide_piece_trajectory(self, slide_button_center_x: float, slide_button_center_y: float) -> TrajectoryArray:
         """Sweep the button across the bar to determine the trajectory of the slide piece.
+        The piece is sampled in-page during the drag, which ends early once the piece comes to rest,
+        and the samples are collected in a single call.
         Clicks and drags box, but does not release. Must pass the coordinates of the slide button."""
-        slider_piece_locator = self.page.locator(ARCED_SLIDE_PIECE_CONTAINER_SELECTOR)
         slide_bar_width = await self._get_arced_slide_bar_width()
-        puzzle_img_bounding_box = await self._get_element_bounding_box(ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
-        trajectory: list[ArcedSlideTrajectoryElement] = []
-
-        times_piece_did_not_move = 0
-        for pixel in range(0, int(slide_bar_width), self.mouse_step_size):
-            await self.page.mouse.move(slide_button_center_x + pixel, slide_button_center_y - pixel)  # - pixel is to drag it diagonally
-            await wait_for_locator_to_be_stable(slider_piece_locator)
-            trajectory_element = await self._get_arced_slide_trajectory_element(
-                pixel,
-                puzzle_img_bounding_box,
-                slider_piece_locator
+        await self.page.evaluate(
+            START_TRAJECTORY_SAMPLER_JS,
+            sampler_args(ARCED_SLIDE_PIECE_CONTAINER_SELECTOR, ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR, slide_button_center_x)
+        )
+        chunks = sweep_chunks(max(1, int(slide_bar_width / self.mouse_step_size)))
+        total_steps = sum(chunks)
+        steps_taken = 0
+        for steps in chunks:
+            steps_taken += steps
+            distance = slide_bar_width * steps_taken / total_steps
+            await self.page.mouse.move(
+                slide_button_center_x + distance,
+                slide_button_center_y - distance, # - distance is to drag it diagonally
+                steps=steps
             )
-            trajectory.append(trajectory_element)
-            if not len(trajectory) > 100 / self.mouse_step_size:
-                continue
-            if piece_is_not_moving(trajectory):
-                times_piece_did_not_move += 1
-            else:
-                times_piece_did_not_move = 0
-            if times_piece_did_not_move >= 10:
+            if steps_taken < total_steps and await self.page.evaluate(TRAJECTORY_SAMPLER_IS_STILL_JS):
+                LOGGER.debug("slide piece came to rest after %s of %s pixels", distance, slide_bar_width)
                 break
-        return trajectory
+        result = await self.page.evaluate(STOP_TRAJECTORY_SAMPLER_JS)
+        trajectory = trajectory_from_samples(result, self.mouse_step_size)
+        return simplify_trajectory(trajectory, max_gap=SIMPLIFY_MAX_GAP_STEPS * self.mouse_step_size)
 
     async def _get_puzzle_slide_bar_width(self, iframe_selector: str | None = None) -> float:
         """Gets the width of the puzzle slide bar from the width of the image. 
@@ -328,7 +418,7 @@ class AsyncPlaywrightSolver(AsyncSolver):
         x_offset = (proportion_x * bounding_box["width"])
         y_offset = (proportion_y * bounding_box["height"]) 
         await self._get_locator(selector, iframe_selector=iframe_selector).click(position={"x": x_offset, "y": y_offset}, force=True)
-        LOGGER.debug(f"clicked {selector} at offset {x_offset}, {y_offset}")
+        LOGGER.debug("clicked %s at offset %s, %s", selector, x_offset, y_offset)
     
 
     async def _drag_mouse_horizontal_with_overshoot(self, x_distance: int, start_x_coord: float, start_y_coord: float) -> None:
@@ -339,40 +429,6 @@ class AsyncPlaywrightSolver(AsyncSolver):
         await asyncio.sleep(0.2)
         await self.page.mouse.up()
 
-    async def _get_arced_slide_trajectory_element(
-            self,
-            current_slider_pixel: int,
-            large_img_bounding_box: FloatRect,
-            slider_piece_locator: Locator, 
-        ) -> ArcedSlideTrajectoryElement:
-        """Compute current slider trajectory element by extracting information on the 
-        slide button location, the piece rotation, and the piece location"""
-        slider_piece_bounding_box = await slider_piece_locator.bounding_box()
-        if not slider_piece_bounding_box:
-            raise ValueError("Bouding box for slider image was None")
-        slider_piece_style = await slider_piece_locator.get_attribute("style")
-        if not slider_piece_style:
-            raise ValueError("Slider piece style was None")
-        rotate_angle = rotate_angle_from_style(slider_piece_style)
-        piece_top = slider_piece_bounding_box["y"]
-        piece_left = slider_piece_bounding_box["x"]
-        width = slider_piece_bounding_box["width"]
-        height = slider_piece_bounding_box["height"]
-        piece_center_x, piece_center_y = get_center(piece_left, piece_top, width, height)
-        container_x = large_img_bounding_box["x"]
-        container_y = large_img_bounding_box["y"]
-        container_width = large_img_bounding_box["width"]
-        container_height = large_img_bounding_box["height"]
-        x_in_container = piece_center_x - container_x
-        y_in_container = piece_center_y - container_y
-        piece_center = xy_to_proportional_point(x_in_container, y_in_container, container_width, container_height)
-        LOGGER.debug(f"top_corner={piece_left}, {piece_top}, center={piece_center_x}, {piece_center_y}, ctr_in_container={x_in_container}, {y_in_container}  prop_center={piece_center.proportion_x}, {piece_center.proportion_y}, container_size={container_width}, {container_height}")
-        return ArcedSlideTrajectoryElement(
-            pixels_from_slider_origin=current_slider_pixel,
-            piece_rotation_angle=rotate_angle,
-            piece_center=piece_center
-        )
-
     async def _get_element_bounding_box(self, selector: str, iframe_selector: str | None = None) -> FloatRect:
         box = await self._get_locator(selector, iframe_selector).bounding_box()
         if box is None:
@@ -386,6 +442,18 @@ class AsyncPlaywrightSolver(AsyncSolver):
         x, y = get_center(box["x"], box["y"], box["width"], box["height"])
         await self.page.mouse.move(x + x_offset, y + y_offset)
 
+    async def get_image_payload_from_src(self, element: str | Locator, iframe_selector: str | None = None) -> ImagePayload:
+        """Get the source of b64 image element as an ImagePayload, without copying the base64 portion"""
+        if isinstance(element, str):
+            e = self._get_locator(element, iframe_selector=iframe_selector)
+        else:
+            e = element
+        url = await e.get_attribute("src")
+        if not url:
+            raise ValueError("element had no url")
+        LOGGER.debug("got image payload from data url")
+        return ImagePayload.from_data_url(url)
+
     async def get_b64_img_from_src(self, element: str | Locator, iframe_selector: str | None = None) -> str:
         """Get the source of b64 image element and return the portion after the data:image/png;base64,"""
         if isinstance(element, str):
@@ -414,7 +482,7 @@ class AsyncPlaywrightSolver(AsyncSolver):
         text_content = await e.text_content()
         if not text_content:
             raise ValueError("element " + selector + " had no text content")
-        LOGGER.debug(f"{selector} has text: {text_content}")
+        LOGGER.debug("%s has text: %s", selector, text_content)
         return text_content
 
     async def _drag_proportional(
@@ -442,7 +510,7 @@ class AsyncPlaywrightSolver(AsyncSolver):
         await self.page.mouse.down()
         await self.page.mouse.move(end_x, end_y, steps=100)
         await self.page.mouse.up()
-        LOGGER.debug(f"dragged from ({start_x}, {start_y}) to ({end_x}, {end_y})")
+        LOGGER.debug("dragged from (%s, %s) to (%s, %s)", start_x, start_y, end_x, end_y)
 
     async def iframe_present(self) -> bool:
         try:
@@ -453,9 +521,43 @@ class AsyncPlaywrightSolver(AsyncSolver):
             LOGGER.debug("iframe is not present")
             return False
 
+    async def _wait_for_image_loaded(self, selector: str, iframe_selector: str | None = None, timeout: float = 10) -> None:
+        """Wait until an image has finished loading, instead of sleeping a fixed time.
+        Gives up quietly after timeout seconds, like the sleep it replaces."""
+        image = self._get_locator(selector, iframe_selector=iframe_selector).first
+        try:
+            await expect(image).to_have_js_property("complete", True, timeout=timeout * 1000)
+            await expect(image).not_to_have_js_property("naturalWidth", 0, timeout=timeout * 1000)
+        except AssertionError:
+            LOGGER.debug("image %s did not load in %s seconds", selector, timeout)
+
+    async def _wait_for_red_dot_count_change(self, count: int, iframe_selector: str | None = None, timeout: float = 1) -> bool:
+        """Wait for the number of red dots to differ from count, which means a click was registered"""
+        loc = self._get_locator(SEMANTIC_SHAPES_ELEMENTS_INSIDE_CHALLENGE, iframe_selector=iframe_selector)
+        try:
+            await expect(loc).not_to_have_count(count, timeout=timeout * 1000)
+            return True
+        except AssertionError:
+            return False
+
+    async def _refresh_semantic_shapes(self, iframe_selector: str | None = None, timeout: float = 3) -> None:
+        """Click the refresh button and wait for the challenge image to be replaced"""
+        image = self._get_locator(SEMANTIC_SHAPES_IMAGE, iframe_selector=iframe_selector).first
+        try:
+            src = await image.get_attribute("src", timeout=timeout * 1000)
+        except TimeoutError:
+            src = None
+        await self._get_locator(SEMANTIC_SHAPES_REFRESH_BUTTON, iframe_selector=iframe_selector).click(force=True)
+        if src is None:
+            return
+        try:
+            await expect(image).not_to_have_attribute("src", src, timeout=timeout * 1000)
+        except AssertionError:
+            LOGGER.debug("challenge image was not replaced within %s seconds of refreshing", timeout)
+
     async def _count_red_dots(self, iframe_selector: str | None = None) -> int:
         """Cound the red dots that appear when solving a shapes captcha"""
         loc = self._get_locator(SEMANTIC_SHAPES_ELEMENTS_INSIDE_CHALLENGE, iframe_selector=iframe_selector)
         count = await loc.count()
-        LOGGER.debug(f"{count} red dots are present")
+        LOGGER.debug("%s red dots are present", count)
         return count
@@ -2,23 +2,90 @@
 
 import logging
 import asyncio
+import random
+import time
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Generator, TypeVar
 
 from playwright.async_api import Locator, Page, TimeoutError
 from playwright._impl._errors import TargetClosedError
 
 
+from temu_captcha_solver.api import ENDPOINTS
 from temu_captcha_solver.captchatype import CaptchaType
-from temu_captcha_solver.selectors import ARCED_SLIDE_UNIQUE_IDENTIFIERS, PUZZLE_UNIQUE_IDENTIFIERS, SEMANTIC_SHAPES_UNIQUE_IDENTIFIERS, SWAP_TWO_UNIQUE_IDENTIFIERS, THREE_BY_THREE_UNIQUE_IDENTIFIERS
+from temu_captcha_solver.instrumentation import (
+    API,
+    DETECTION,
+    ERROR,
+    FAILED,
+    NOT_PRESENT,
+    POPUP,
+    PRESENCE,
+    SOLVED,
+    VALIDATION,
+    SolveObserver,
+    SolveRecord,
+    report_solve,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+Request = TypeVar("Request")
+Response = TypeVar("Response")
+
 class AsyncSolver(ABC):
 
-    def __init__(self, dump_requests: bool = False):
+    def __init__(
+            self,
+            dump_requests: bool = False,
+            min_dwell: float = 0.5,
+            observer: SolveObserver | None = None,
+            pipelined: bool = False
+        ):
         self.dump_requests = dump_requests
+        self.min_dwell = min_dwell
+        self.observer = observer
+        self.pipelined = pipelined
+        self._record: SolveRecord | None = None
+        self._last_api_call: tuple[Callable[..., Any], Any] | None = None
         self.page: Page
 
+    async def _dwell(self) -> None:
+        """Pause for a human-like moment between interactions, at least min_dwell seconds"""
+        if self.min_dwell > 0:
+            await asyncio.sleep(random.uniform(self.min_dwell, self.min_dwell * 1.5))
+
+    async def _start_api_call(
+            self,
+            call: Callable[[Request], Awaitable[Response]],
+            request: Request
+        ) -> "asyncio.Future[Response]":
+        """Start an API call. When pipelined, the call runs as a task while the solver
+        keeps reading the page, otherwise it has finished when this returns."""
+        self._last_api_call = (call, request)
+        if self.pipelined:
+            return asyncio.ensure_future(call(request))
+        pending: asyncio.Future[Response] = asyncio.get_running_loop().create_future()
+        with self._phase(API):
+            pending.set_result(await call(request))
+        return pending
+
+    async def _api_result(self, pending: "asyncio.Future[Response]") -> Response:
+        """Wait for an API call started with _start_api_call"""
+        with self._phase(API):
+            return await pending
+
+    def _discard_api_call(self, pending: "asyncio.Future[Response]") -> None:
+        """Drop an API call whose challenge changed while it was in flight"""
+        self._last_api_call = None
+        if pending.cancel():
+            LOGGER.debug("cancelled api call for outdated challenge")
+        else:
+            LOGGER.debug("discarding api result for outdated challenge")
+            # retrieve the error, so asyncio does not log it as never retrieved
+            pending.exception()
+
     async def solve_captcha_if_present(self, captcha_detect_timeout: int = 5, retries: int = 3) -> None:
         """Solves any captcha that is present, if one is detected
 
@@ -26,31 +93,76 @@ class AsyncSolver(ABC):
             captcha_detect_timeout: return if no captcha is detected in this many seconds
             retries: number of times to retry captcha
         """
-        await self.switch_to_popup_if_present()
-        for _ in range(retries):
-            if not await self.captcha_is_present(captcha_detect_timeout):
+        record = SolveRecord()
+        self._record = record
+        start = time.perf_counter()
+        try:
+            record.outcome = await self._solve_captcha_if_present(record, captcha_detect_timeout, retries)
+        except Exception:
+            record.outcome = ERROR
+            raise
+        finally:
+            record.total_seconds = time.perf_counter() - start
+            self._record = None
+            report_solve(self.observer, record)
+
+    async def _solve_captcha_if_present(self, record: SolveRecord, captcha_detect_timeout: int, retries: int) -> str:
+        """Run the solve, recording its phases, and return the outcome"""
+        with self._phase(POPUP):
+            await self.switch_to_popup_if_present()
+        for attempt in range(retries):
+            record.retries = attempt
+            self._last_api_call = None
+            with self._phase(PRESENCE):
+                present = await self.captcha_is_present(captcha_detect_timeout)
+            if not present:
                 LOGGER.debug("Captcha is not present")
-                return
-            else:
-                match await self.identify_captcha():
-                    case CaptchaType.ARCED_SLIDE: 
-                        await self.solve_arced_slide()
-                    case CaptchaType.PUZZLE: 
-                        await self.solve_puzzle()
-                    case CaptchaType.SEMANTIC_SHAPES: 
-                        await self.solve_semantic_shapes()
-                    case CaptchaType.THREE_BY_THREE:
-                        await self.solve_three_by_three()
-                    case CaptchaType.SWAP_TWO:
-                        await self.solve_swap_two()
-                    case CaptchaType.TWO_IMAGE:
-                        await self.solve_two_image()
-                    case CaptchaType.NONE:
-                        LOGGER.warning("captcha was present (i think), but could not identify")
-            if await self.captcha_is_not_present(timeout=5):
-                return
-            else:
-                continue
+                return SOLVED if attempt else NOT_PRESENT
+            with self._phase(DETECTION):
+                captcha_type = await self.identify_captcha()
+            record.captcha_type = captcha_type
+            match captcha_type:
+                case CaptchaType.ARCED_SLIDE:
+                    await self.solve_arced_slide()
+                case CaptchaType.PUZZLE:
+                    await self.solve_puzzle()
+                case CaptchaType.SEMANTIC_SHAPES:
+                    await self.solve_semantic_shapes()
+                case CaptchaType.THREE_BY_THREE:
+                    await self.solve_three_by_three()
+                case CaptchaType.SWAP_TWO:
+                    await self.solve_swap_two()
+                case CaptchaType.TWO_IMAGE:
+                    await self.solve_two_image()
+                case CaptchaType.NONE:
+                    LOGGER.warning("captcha was present (i think), but could not identify")
+            with self._phase(VALIDATION):
+                gone = await self.captcha_is_not_present(timeout=5)
+            if gone:
+                return SOLVED
+            await self._forget_last_answer()
+        return FAILED
+
+    async def _forget_last_answer(self) -> None:
+        """Remove the cached result of the last API call, as its answer did not solve the captcha,
+        so the retry asks the API instead of applying the same answer again"""
+        if self._last_api_call is None:
+            return
+        call, request = self._last_api_call
+        self._last_api_call = None
+        client = getattr(call, "__self__", None)
+        endpoint = ENDPOINTS.get(getattr(call, "__name__", ""))
+        if endpoint is not None and hasattr(client, "forget_result"):
+            await client.forget_result(endpoint, request)
+
+    @contextmanager
+    def _phase(self, name: str) -> Generator[None, None, None]:
+        """Time the block as a phase of the current solve. Does nothing outside solve_captcha_if_present."""
+        if self._record is None:
+            yield
+        else:
+            with self._record.phase(name):
+                yield
 
     async def switch_to_popup_if_present(self):
         try:
@@ -67,32 +179,18 @@ class AsyncSolver(ABC):
         except Exception as e:
             LOGGER.debug("detected a new tab, but could not switch to it")
 
-    async def identify_captcha(self) -> CaptchaType:
-        for _ in range(30):
-            iframe_selector = "iframe" if await self.iframe_present() else None
-            if await self.any_selector_in_list_present(PUZZLE_UNIQUE_IDENTIFIERS,
-                                                       iframe_locator=iframe_selector):
-                LOGGER.debug("detected puzzle")
-                return CaptchaType.PUZZLE
-            elif await self.any_selector_in_list_present(ARCED_SLIDE_UNIQUE_IDENTIFIERS,
-                                                         iframe_locator=iframe_selector):
-                LOGGER.debug("detected arced slide")
-                return CaptchaType.ARCED_SLIDE
-            elif await self.any_selector_in_list_present(SEMANTIC_SHAPES_UNIQUE_IDENTIFIERS,
-                                                         iframe_locator=iframe_selector):
-                LOGGER.debug("detected semantic shapes")
-                return CaptchaType.SEMANTIC_SHAPES
-            elif await self.any_selector_in_list_present(THREE_BY_THREE_UNIQUE_IDENTIFIERS,
-                                                         iframe_locator=iframe_selector):
-                LOGGER.debug("detected three by three")
-                return CaptchaType.THREE_BY_THREE
-            elif await self.any_selector_in_list_present(SWAP_TWO_UNIQUE_IDENTIFIERS,
-                                                         iframe_locator=iframe_selector):
-                LOGGER.debug("detected swap two")
-                return CaptchaType.THREE_BY_THREE
-            else:
-                await asyncio.sleep(1)
-        return CaptchaType.NONE
+    async def identify_captcha(self, timeout: float = 30) -> CaptchaType:
+        """Identify the captcha on the page, waiting up to timeout seconds for it to appear"""
+        captcha_type = await self.detect_captcha_type(timeout)
+        if captcha_type != CaptchaType.NONE:
+            LOGGER.debug("detected %s", captcha_type.name.lower().replace("_", " "))
+        return captcha_type
+
+    @abstractmethod
+    async def detect_captcha_type(self, timeout: float) -> CaptchaType:
+        """Watch the page, including its iframes, for up to timeout seconds and
+        return the type of the first captcha that appears"""
+        pass
 
     @abstractmethod
     async def captcha_is_present(self, timeout: int = 15) -> bool:
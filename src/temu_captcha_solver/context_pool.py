@@ -0,0 +1,412 @@
+"""Warm pools of SadCaptcha patched Playwright contexts.
+
+Launching a persistent context takes seconds. A pool launches its contexts ahead of time
+and hands them out on acquire. A context is recycled, meaning closed and replaced by a new
+one, once it has done max_solves solves, is older than max_age seconds, or its browser
+processes use more than max_memory_mb. Every context gets its own user data directory,
+made with mkdtemp and removed with rmtree as soon as the context is closed.
+
+ContextPool is for the sync Playwright API, and launches replacements when a context is
+released. AsyncContextPool launches replacements in the background, so acquire only waits
+when every context is in use. A replacement that still fails to launch after its retries
+is handed to the next acquire as its error, and launched again in the background.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+
+from playwright import async_api, sync_api
+
+from .extension_cache import get_patched_extension_dir
+from .launcher import make_async_playwright_solver_context, make_playwright_solver_context
+
+LOGGER = logging.getLogger(__name__)
+
+USER_DATA_DIR_PREFIX = "temu-captcha-solver-"
+
+SyncContextFactory = Callable[..., sync_api.BrowserContext]
+AsyncContextFactory = Callable[..., Awaitable[async_api.BrowserContext]]
+
+
+@dataclass
+class _LaunchFailure:
+    """Queued in place of a context that could not be launched"""
+    error: Exception
+
+
+@dataclass(eq=False)
+class PooledContext:
+    """A context handed out by a pool. Call record_solve after each solve made with it."""
+    context: Any
+    user_data_dir: str
+    created_at: float = field(default_factory=time.monotonic)
+    solves: int = 0
+
+    def record_solve(self) -> None:
+        self.solves += 1
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+@dataclass
+class RecyclePolicy:
+    """When a context is replaced by a fresh one. None disables a limit."""
+    max_solves: int | None = 50
+    max_age: float | None = 30 * 60
+    max_memory_mb: float | None = None
+
+    def recycle_reason(self, pooled: PooledContext) -> str | None:
+        """Why the context should be recycled, or None if it can be reused"""
+        if self.max_solves is not None and pooled.solves >= self.max_solves:
+            return f"{pooled.solves} solves"
+        if self.max_age is not None and pooled.age >= self.max_age:
+            return f"{pooled.age:.0f} seconds old"
+        if self.max_memory_mb is not None:
+            memory = context_memory_mb(pooled.user_data_dir)
+            if memory is not None and memory >= self.max_memory_mb:
+                return f"{memory:.0f}MB of memory"
+        return None
+
+
+def context_memory_mb(user_data_dir: str) -> float | None:
+    """Resident memory of the browser using user_data_dir and its child processes, in MB.
+    Read from /proc, so None on systems without it."""
+    if not os.path.isdir("/proc"):
+        return None
+    children: dict[int, list[int]] = {}
+    roots = []
+    needle = f"--user-data-dir={user_data_dir}".encode()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                # the command name in parentheses may contain spaces
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+        if needle in cmdline:
+            roots.append(pid)
+    if not roots:
+        return None
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    seen: set[int] = set()
+    total = 0
+    stack = list(roots)
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm", "rb") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / (1024 * 1024)
+
+
+def _remove_user_data_dir(user_data_dir: str) -> None:
+    shutil.rmtree(user_data_dir, ignore_errors=True)
+    LOGGER.debug("removed user data dir %s", user_data_dir)
+
+
+class ContextPool:
+
+    def __init__(
+            self,
+            playwright: sync_api.Playwright,
+            api_key: str,
+            size: int = 2,
+            max_solves: int | None = 50,
+            max_age: float | None = 30 * 60,
+            max_memory_mb: float | None = None,
+            context_factory: SyncContextFactory | None = None,
+            **playwright_context_kwargs
+        ) -> None:
+        """Keep size patched contexts launched, and hand them out without waiting for a launch.
+
+        Args:
+            playwright: sync Playwright instance
+            api_key: SadCaptcha API key
+            size: number of contexts kept launched
+            max_solves: recycle a context after this many recorded solves
+            max_age: recycle a context after this many seconds
+            max_memory_mb: recycle a context whose browser processes use more memory than this.
+                Only measured on systems with /proc.
+            context_factory: called like make_playwright_solver_context, which it defaults to
+            **playwright_context_kwargs: keyword args passed to the context factory for every context
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.playwright = playwright
+        self.api_key = api_key
+        self.size = size
+        self.policy = RecyclePolicy(max_solves, max_age, max_memory_mb)
+        self.playwright_context_kwargs = playwright_context_kwargs
+        self._context_factory = context_factory or make_playwright_solver_context
+        self._idle: list[PooledContext] = []
+        self._leased: list[PooledContext] = []
+        self.launches = 0
+
+    def start(self) -> None:
+        """Launch the contexts"""
+        if self._idle or self._leased:
+            return
+        if "extension_dir" not in self.playwright_context_kwargs and self._context_factory is make_playwright_solver_context:
+            # unpack once instead of once per launch
+            self.playwright_context_kwargs["extension_dir"] = get_patched_extension_dir(self.api_key)
+        for _ in range(self.size):
+            self._idle.append(self._launch())
+        LOGGER.debug("started context pool with %s contexts", self.size)
+
+    def acquire(self) -> PooledContext:
+        """Take a launched context. If every context is in use, one more is launched."""
+        while self._idle:
+            pooled = self._idle.pop(0)
+            reason = self.policy.recycle_reason(pooled)
+            if reason is None:
+                self._leased.append(pooled)
+                return pooled
+            self._discard(pooled, reason)
+        pooled = self._launch()
+        self._leased.append(pooled)
+        return pooled
+
+    def release(self, pooled: PooledContext) -> None:
+        """Return a context to the pool, replacing it if it is due for recycling"""
+        self._leased.remove(pooled)
+        reason = self.policy.recycle_reason(pooled)
+        if reason is None and len(self._idle) + len(self._leased) >= self.size:
+            # launched by acquire while every context was in use
+            reason = "pool is full"
+        if reason is None:
+            self._idle.append(pooled)
+            return
+        self._discard(pooled, reason)
+        if len(self._idle) + len(self._leased) < self.size:
+            self._idle.append(self._launch())
+
+    @contextmanager
+    def context(self) -> Iterator[PooledContext]:
+        """Acquire a context, and release it on exit"""
+        pooled = self.acquire()
+        try:
+            yield pooled
+        finally:
+            self.release(pooled)
+
+    def close(self) -> None:
+        """Close every context and remove its user data directory"""
+        pooled_contexts, self._idle, self._leased = self._idle + self._leased, [], []
+        for pooled in pooled_contexts:
+            self._discard(pooled, "pool closed")
+        LOGGER.debug("closed context pool")
+
+    def __enter__(self) -> "ContextPool":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _launch(self) -> PooledContext:
+        user_data_dir = tempfile.mkdtemp(prefix=USER_DATA_DIR_PREFIX)
+        try:
+            context = self._context_factory(
+                self.playwright, self.api_key, user_data_dir=user_data_dir, **self.playwright_context_kwargs)
+        except Exception:
+            _remove_user_data_dir(user_data_dir)
+            raise
+        self.launches += 1
+        return PooledContext(context, user_data_dir)
+
+    def _discard(self, pooled: PooledContext, reason: str) -> None:
+        LOGGER.debug("recycling context: %s", reason)
+        try:
+            pooled.context.close()
+        except Exception as e:
+            LOGGER.debug("could not close pooled context: %s", e)
+        _remove_user_data_dir(pooled.user_data_dir)
+
+
+class AsyncContextPool:
+
+    def __init__(
+            self,
+            playwright: async_api.Playwright,
+            api_key: str,
+            size: int = 2,
+            max_solves: int | None = 50,
+            max_age: float | None = 30 * 60,
+            max_memory_mb: float | None = None,
+            context_factory: AsyncContextFactory | None = None,
+            launch_retries: int = 3,
+            launch_backoff: float = 1.0,
+            **playwright_context_kwargs
+        ) -> None:
+        """Keep size patched contexts launched, and hand them out without waiting for a launch.
+        Recycled contexts are replaced in the background.
+
+        Args:
+            playwright: async Playwright instance
+            api_key: SadCaptcha API key
+            size: number of contexts kept launched
+            max_solves: recycle a context after this many recorded solves
+            max_age: recycle a context after this many seconds
+            max_memory_mb: recycle a context whose browser processes use more memory than this.
+                Only measured on systems with /proc.
+            context_factory: coroutine function called like make_async_playwright_solver_context, which it defaults to
+            launch_retries: times a failed replacement launch is retried before acquire raises its error
+            launch_backoff: seconds before the first retry of a launch, doubled on every retry
+            **playwright_context_kwargs: keyword args passed to the context factory for every context
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.playwright = playwright
+        self.api_key = api_key
+        self.size = size
+        self.policy = RecyclePolicy(max_solves, max_age, max_memory_mb)
+        self.playwright_context_kwargs = playwright_context_kwargs
+        self._context_factory = context_factory or make_async_playwright_solver_context
+        self.launch_retries = launch_retries
+        self.launch_backoff = launch_backoff
+        self._idle: asyncio.Queue[PooledContext | _LaunchFailure] = asyncio.Queue()
+        self._leased: set[int] = set()
+        self._contexts: dict[int, PooledContext] = {}
+        self._launching: set[asyncio.Task[None]] = set()
+        self.launches = 0
+
+    async def start(self) -> None:
+        """Launch the contexts"""
+        if self._contexts:
+            return
+        if "extension_dir" not in self.playwright_context_kwargs and self._context_factory is make_async_playwright_solver_context:
+            # unpack once instead of once per launch
+            self.playwright_context_kwargs["extension_dir"] = await asyncio.to_thread(get_patched_extension_dir, self.api_key)
+        for pooled in await asyncio.gather(*(self._launch() for _ in range(self.size))):
+            self._idle.put_nowait(pooled)
+        LOGGER.debug("started async context pool with %s contexts", self.size)
+
+    async def acquire(self) -> PooledContext:
+        """Take a launched context, waiting for one if every context is in use.
+
+        Raises:
+            Exception: the error of the context factory, if a replacement context could not be launched
+        """
+        if not self._contexts and not self._launching and self._idle.empty():
+            raise RuntimeError("AsyncContextPool is not started")
+        while True:
+            pooled = await self._idle.get()
+            if isinstance(pooled, _LaunchFailure):
+                # the pool keeps its size: the next acquire gets the context launched now, or this error again
+                self._start_replacement(None)
+                raise pooled.error
+            # in a thread, as max_memory_mb reads every browser process from /proc
+            reason = await asyncio.to_thread(self.policy.recycle_reason, pooled)
+            if reason is None:
+                self._leased.add(id(pooled))
+                return pooled
+            await self._recycle(pooled, reason)
+
+    async def release(self, pooled: PooledContext) -> None:
+        """Return a context to the pool, replacing it in the background if it is due for recycling"""
+        self._leased.discard(id(pooled))
+        reason = await asyncio.to_thread(self.policy.recycle_reason, pooled)
+        if reason is None:
+            self._idle.put_nowait(pooled)
+        else:
+            await self._recycle(pooled, reason)
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator[PooledContext]:
+        """Acquire a context, and release it on exit"""
+        pooled = await self.acquire()
+        try:
+            yield pooled
+        finally:
+            await self.release(pooled)
+
+    async def close(self) -> None:
+        """Close every context and remove its user data directory"""
+        for task in list(self._launching):
+            task.cancel()
+        await asyncio.gather(*self._launching, return_exceptions=True)
+        pooled_contexts = list(self._contexts.values())
+        self._contexts.clear()
+        self._leased.clear()
+        self._idle = asyncio.Queue()
+        await asyncio.gather(*(self._close(pooled) for pooled in pooled_contexts))
+        LOGGER.debug("closed async context pool")
+
+    async def __aenter__(self) -> "AsyncContextPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _launch(self) -> PooledContext:
+        user_data_dir = tempfile.mkdtemp(prefix=USER_DATA_DIR_PREFIX)
+        try:
+            context = await self._context_factory(
+                self.playwright, self.api_key, user_data_dir=user_data_dir, **self.playwright_context_kwargs)
+        except BaseException:
+            await asyncio.to_thread(_remove_user_data_dir, user_data_dir)
+            raise
+        self.launches += 1
+        pooled = PooledContext(context, user_data_dir)
+        self._contexts[id(pooled)] = pooled
+        return pooled
+
+    async def _recycle(self, pooled: PooledContext, reason: str) -> None:
+        """Close the context and launch its replacement in the background"""
+        LOGGER.debug("recycling context: %s", reason)
+        self._start_replacement(pooled)
+
+    def _start_replacement(self, pooled: PooledContext | None) -> None:
+        task = asyncio.create_task(self._replace(pooled))
+        self._launching.add(task)
+        task.add_done_callback(self._launching.discard)
+
+    async def _replace(self, pooled: PooledContext | None) -> None:
+        """Close pooled, if any, and launch a context in its place, retrying with backoff.
+        If every attempt fails, the last error is queued for acquire to raise."""
+        if pooled is not None:
+            await self._close(pooled)
+        for attempt in range(self.launch_retries + 1):
+            try:
+                replacement = await self._launch()
+            except Exception as e:
+                if attempt == self.launch_retries:
+                    LOGGER.exception("could not launch a replacement context")
+                    self._idle.put_nowait(_LaunchFailure(e))
+                    return
+                delay = self.launch_backoff * 2 ** attempt
+                LOGGER.warning("could not launch a replacement context, retrying in %.1f seconds: %s", delay, e)
+                await asyncio.sleep(delay)
+            else:
+                self._idle.put_nowait(replacement)
+                return
+
+    async def _close(self, pooled: PooledContext) -> None:
+        self._contexts.pop(id(pooled), None)
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            LOGGER.debug("could not close pooled context: %s", e)
+        await asyncio.to_thread(_remove_user_data_dir, pooled.user_data_dir)
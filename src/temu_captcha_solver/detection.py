@@ -0,0 +1,113 @@
+"""In-page captcha detection shared by every solver backend.
+
+Instead of asking the browser about one selector at a time, the detector script checks
+every *_UNIQUE_IDENTIFIERS list in a single evaluation. When a timeout is given it keeps
+watching the DOM with a MutationObserver and resolves as soon as a captcha appears.
+Same-origin iframes are searched by the script itself; cross-origin frames must be
+probed separately by the backend, because their documents are not reachable from the page.
+"""
+
+from typing import Any
+
+from .captchatype import CaptchaType
+from .selectors import (
+    ARCED_SLIDE_UNIQUE_IDENTIFIERS,
+    PUZZLE_UNIQUE_IDENTIFIERS,
+    SEMANTIC_SHAPES_UNIQUE_IDENTIFIERS,
+    SWAP_TWO_UNIQUE_IDENTIFIERS,
+    THREE_BY_THREE_UNIQUE_IDENTIFIERS,
+)
+
+# Checked in order, the first captcha type with a visible identifier wins
+CAPTCHA_TYPE_IDENTIFIERS: list[tuple[CaptchaType, list[str]]] = [
+    (CaptchaType.PUZZLE, PUZZLE_UNIQUE_IDENTIFIERS),
+    (CaptchaType.ARCED_SLIDE, ARCED_SLIDE_UNIQUE_IDENTIFIERS),
+    (CaptchaType.SEMANTIC_SHAPES, SEMANTIC_SHAPES_UNIQUE_IDENTIFIERS),
+    (CaptchaType.THREE_BY_THREE, THREE_BY_THREE_UNIQUE_IDENTIFIERS),
+    (CaptchaType.SWAP_TWO, SWAP_TWO_UNIQUE_IDENTIFIERS),
+]
+
+# Takes {identifiers: string[][], timeout: ms} and resolves to the index of the
+# first identifier list with a visible match, or -1 if none appeared before the timeout.
+DETECT_CAPTCHA_TYPE_JS = """
+(args) => new Promise((resolve) => {
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = el.ownerDocument.defaultView.getComputedStyle(el);
+        return style.visibility !== "hidden" && style.display !== "none";
+    };
+    const documents = () => {
+        const docs = [document];
+        for (const frame of document.querySelectorAll("iframe")) {
+            try {
+                if (frame.contentDocument) docs.push(frame.contentDocument);
+            } catch (e) {}
+        }
+        return docs;
+    };
+    const detect = () => {
+        const docs = documents();
+        for (let i = 0; i < args.identifiers.length; i++) {
+            for (const selector of args.identifiers[i]) {
+                for (const doc of docs) {
+                    for (const el of doc.querySelectorAll(selector)) {
+                        if (isVisible(el)) return i;
+                    }
+                }
+            }
+        }
+        return -1;
+    };
+    const found = detect();
+    if (found !== -1 || !args.timeout) {
+        resolve(found);
+        return;
+    }
+    const observed = new Set();
+    let timer = null;
+    let fallback = null;
+    const observer = new MutationObserver(() => check());
+    const observe = () => {
+        for (const doc of documents()) {
+            if (observed.has(doc) || !doc.documentElement) continue;
+            observed.add(doc);
+            observer.observe(doc.documentElement, {childList: true, subtree: true, attributes: true});
+        }
+    };
+    const finish = (result) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearInterval(fallback);
+        resolve(result);
+    };
+    const check = () => {
+        observe();
+        const result = detect();
+        if (result !== -1) finish(result);
+    };
+    observe();
+    // iframe documents are replaced when they navigate, which no observer sees
+    fallback = setInterval(check, 250);
+    timer = setTimeout(() => finish(-1), args.timeout);
+})
+"""
+
+
+def detection_args(timeout: float = 0) -> dict[str, Any]:
+    """Arguments for DETECT_CAPTCHA_TYPE_JS. A timeout of 0 checks once without waiting.
+
+    Args:
+        timeout: seconds to watch the page for a captcha to appear
+    """
+    return {
+        "identifiers": [identifiers for _, identifiers in CAPTCHA_TYPE_IDENTIFIERS],
+        "timeout": int(timeout * 1000),
+    }
+
+
+def captcha_type_from_index(index: int) -> CaptchaType:
+    """Convert the result of DETECT_CAPTCHA_TYPE_JS to a CaptchaType"""
+    if index < 0:
+        return CaptchaType.NONE
+    return CAPTCHA_TYPE_IDENTIFIERS[index][0]
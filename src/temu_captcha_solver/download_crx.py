@@ -18,17 +18,17 @@ def download_extension_to_unpacked() -> tempfile.TemporaryDirectory:
         temp_dir = tempfile.TemporaryDirectory()
         with zipfile.ZipFile(f.name, "r") as zip_file:
             zip_file.extractall(temp_dir.name)
-            LOGGER.debug("extracted crx to directory: " + temp_dir.name)
+            LOGGER.debug("extracted crx to directory: %s", temp_dir.name)
             return temp_dir
 
 
 @contextmanager
 def download_extension_to_tempfile() -> Generator[BufferedWriter, None, None]:
     r = requests.get(CHROME_EXT_DOWNLOAD_URL)
-    LOGGER.debug("downloaded chrome extension from " + CHROME_EXT_DOWNLOAD_URL)
+    LOGGER.debug("downloaded chrome extension from %s", CHROME_EXT_DOWNLOAD_URL)
     tf = open(os.path.join(tempfile.gettempdir(), os.urandom(24).hex()), "wb")
     _ = tf.write(r.content)
-    LOGGER.debug("wrote chrome extension to temp file at: " + tf.name)
+    LOGGER.debug("wrote chrome extension to temp file at: %s", tf.name)
     try:
         yield tf
     finally:
@@ -13,5 +13,5 @@ def download_image_b64(url: str, headers: dict[str, Any] | None = None, proxy: s
         proxies = None
     r = requests.get(url, headers=headers, proxies=proxies)
     image = base64.b64encode(r.content).decode()
-    LOGGER.debug(f"Got image from {url} as B64: {image[0:20]}...")
+    LOGGER.debug("Got image from %s as B64: %s...", url, image[0:20])
     return image
@@ -0,0 +1,201 @@
+"""On-disk cache of the unpacked SadCaptcha chrome extension.
+
+The extension is downloaded and unpacked once per version, and patched once per API key.
+Entries are written to a temporary directory next to their final location and then renamed
+into place, so concurrent launches never see a half-written extension. When a new version is
+downloaded, the entries of every version but the new one and the one before it are deleted,
+so browsers still running from the previous version keep their files.
+
+Layout of the cache directory:
+    latest.json             version of the newest download, and when it was checked
+    <version>/              unpacked extension as downloaded
+    <version>-<key hash>/   unpacked extension patched with an API key
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from .download_crx import download_extension_to_tempfile
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TEMU_CAPTCHA_SOLVER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "temu-captcha-solver", "extension")
+)
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+_LATEST_FILE = "latest.json"
+_STAGING_PREFIX = ".staging-"
+# staging directories older than this were left by a process that died while writing them
+_STALE_STAGING_SECONDS = 60 * 60
+
+
+def get_patched_extension_dir(
+    api_key: str,
+    cache_dir: str | None = None,
+    ttl: float = DEFAULT_TTL_SECONDS,
+    offline: bool = False
+) -> str:
+    """Get the directory of the unpacked extension patched with the API key,
+    downloading and patching it only if it is not already cached.
+
+    Args:
+        api_key (str): SadCaptcha API key
+        cache_dir (str | None): Directory of the cache. If None, DEFAULT_CACHE_DIR is used.
+        ttl (float): Seconds before checking the extension for a new version
+        offline (bool): Never download. Use the newest cached version, or raise FileNotFoundError if there is none.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    version = _get_unpacked_version(cache_dir, ttl, offline)
+    patched_dir = os.path.join(cache_dir, f"{version}-{_hash_key(api_key)}")
+    if os.path.isdir(patched_dir):
+        LOGGER.debug("using cached patched extension at %s", patched_dir)
+        return patched_dir
+    staging_dir = tempfile.mkdtemp(dir=cache_dir, prefix=_STAGING_PREFIX)
+    try:
+        staged_extension = os.path.join(staging_dir, "extension")
+        shutil.copytree(os.path.join(cache_dir, version), staged_extension)
+        _patch_extension_file_with_key(staged_extension, api_key)
+        _move_into_place(staging_dir, staged_extension, patched_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    LOGGER.debug("cached patched extension at %s", patched_dir)
+    return patched_dir
+
+
+def clear_extension_cache(cache_dir: str | None = None) -> None:
+    """Delete every cached extension"""
+    shutil.rmtree(cache_dir or DEFAULT_CACHE_DIR, ignore_errors=True)
+
+
+def patch_extension_script_with_key(script: str, api_key: str) -> str:
+    script = script.replace("localStorage.getItem(\"sadCaptchaKey\");", f"\"{api_key}\";")
+    LOGGER.debug("patched extension script with api key")
+    return script
+
+
+def _patch_extension_file_with_key(extension_dir: str, api_key: str) -> None:
+    with open(extension_dir + "/script.js") as f:
+        script = f.read()
+    script = patch_extension_script_with_key(script, api_key)
+    with open(extension_dir + "/script.js", "w") as f:
+        _ = f.write(script)
+    LOGGER.debug("patched extension file with api key")
+
+
+def _get_unpacked_version(cache_dir: str, ttl: float, offline: bool) -> str:
+    """Get the version of the newest unpacked extension in the cache,
+    downloading it first if the cached version is older than the TTL."""
+    latest = _read_latest(cache_dir)
+    cached = latest is not None and os.path.isdir(os.path.join(cache_dir, latest["version"]))
+    if offline:
+        if not cached:
+            raise FileNotFoundError("offline mode was requested, but there is no cached extension in " + cache_dir)
+        return latest["version"]
+    if cached and time.time() - latest["checked_at"] < ttl:
+        return latest["version"]
+    try:
+        version = _download_and_unpack(cache_dir)
+    except Exception as e:
+        if not cached:
+            raise
+        LOGGER.warning("could not check for a new extension version, using cached version %s: %s", latest["version"], e)
+        return latest["version"]
+    _write_latest(cache_dir, version)
+    if latest is None or latest["version"] != version:
+        _prune(cache_dir, keep={version} if latest is None else {version, latest["version"]})
+    return version
+
+
+def _download_and_unpack(cache_dir: str) -> str:
+    """Download the extension and unpack it into the cache. Returns the version."""
+    downloaded: str | None = None
+    staging_dir: str | None = None
+    try:
+        with download_extension_to_tempfile() as f:
+            f.flush()
+            downloaded = f.name
+            # made only once the download succeeded, and removed whatever happens next
+            staging_dir = tempfile.mkdtemp(dir=cache_dir, prefix=_STAGING_PREFIX)
+            staged_extension = os.path.join(staging_dir, "extension")
+            with zipfile.ZipFile(f.name, "r") as zip_file:
+                zip_file.extractall(staged_extension)
+        with open(os.path.join(staged_extension, "manifest.json")) as manifest:
+            version = json.load(manifest)["version"]
+        _move_into_place(staging_dir, staged_extension, os.path.join(cache_dir, version))
+    finally:
+        if downloaded is not None and os.path.exists(downloaded):
+            os.remove(downloaded)
+        if staging_dir is not None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    LOGGER.debug("cached extension version %s", version)
+    return version
+
+
+def _prune(cache_dir: str, keep: set[str]) -> None:
+    """Delete the unpacked and patched extensions of every version not in keep,
+    and staging directories left by processes that died while writing them"""
+    now = time.time()
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not os.path.isdir(path):
+            continue
+        if name.startswith(_STAGING_PREFIX):
+            try:
+                stale = now - os.path.getmtime(path) > _STALE_STAGING_SECONDS
+            except OSError:
+                continue
+            if not stale:
+                continue
+        elif name.startswith(".") or _version_of_entry(name) in keep:
+            continue
+        LOGGER.debug("removing old cached extension %s", path)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _version_of_entry(name: str) -> str:
+    """The version of a <version> or <version>-<key hash> cache entry"""
+    version, _, suffix = name.rpartition("-")
+    if version and len(suffix) == 16 and all(c in "0123456789abcdef" for c in suffix):
+        return version
+    return name
+
+
+def _move_into_place(staging_dir: str, staged: str, destination: str) -> None:
+    """Atomically rename staged to destination. If another process got there first, keep theirs."""
+    try:
+        os.rename(staged, destination)
+    except OSError:
+        if not os.path.isdir(destination):
+            raise
+        LOGGER.debug("%s was created by another process", destination)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _read_latest(cache_dir: str) -> dict | None:
+    try:
+        with open(os.path.join(cache_dir, _LATEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_latest(cache_dir: str, version: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".latest-")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"version": version, "checked_at": time.time()}, f)
+    os.replace(tmp_path, os.path.join(cache_dir, _LATEST_FILE))
+
+
+def _hash_key(api_key: str) -> str:
+    """The API key is hashed so it does not end up in directory names"""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
@@ -0,0 +1,495 @@
+"""Fleet of worker processes that visit URLs and solve the captchas on them.
+
+The supervisor unpacks the patched extension once, then spawns one process per worker.
+Each worker launches its own context with launcher.py, sync or async, and takes URLs from
+a bounded queue shared by all workers, so submitting blocks once the workers fall behind.
+After every URL the worker sends a FleetResult back on a metrics queue, which the
+supervisor aggregates in a HistogramCollector. A worker whose browser closed under it
+(TargetClosedError) exits, and the supervisor starts a new one in its place. Workers tell the
+supervisor which URLs they took, so the URLs a worker held when it died get an error result.
+
+Run from the command line with:
+    temu-captcha-fleet API_KEY --processes 8 < urls.txt
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from multiprocessing.context import SpawnProcess
+from typing import Any, Callable
+
+from playwright._impl._errors import TargetClosedError
+
+from .extension_cache import get_patched_extension_dir
+from .instrumentation import ERROR, HistogramCollector, SolveObserver, SolveRecord
+
+LOGGER = logging.getLogger(__name__)
+
+SYNC = "sync"
+ASYNC = "async"
+
+# Exit code of a worker whose browser closed, asking the supervisor for a replacement
+RESTART_EXIT_CODE = 75
+
+# Put on the metrics queue by the supervisor to stop its collector thread
+_STOP_COLLECTING = "stop"
+
+# Seconds an async lane waits before looking at the URL queue again when it is empty
+URL_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class WorkerConfig:
+    """Everything a worker process needs to launch its context. Sent to the worker when it is spawned."""
+    api_key: str
+    extension_dir: str | None
+    mode: str = SYNC
+    pages: int = 1
+    captcha_detect_timeout: int = 5
+    retries: int = 3
+    solver_kwargs: dict[str, Any] = field(default_factory=dict)
+    playwright_context_kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class FleetResult:
+    """Outcome of one URL, sent from a worker to the supervisor"""
+    worker_id: int
+    url: str
+    record: SolveRecord | None
+    seconds: float
+    error: str | None = None
+
+
+@dataclass
+class _Claim:
+    """Sent by a worker when it takes a URL, before it visits it"""
+    worker_id: int
+    url: str
+
+
+@dataclass
+class _WorkerExited:
+    """Put on the metrics queue by the supervisor when a worker exits with an error"""
+    worker_id: int
+    exitcode: int | None
+
+
+WorkerTarget = Callable[[int, WorkerConfig, Any, Any], None]
+
+
+class Fleet:
+
+    def __init__(
+            self,
+            api_key: str,
+            processes: int | None = None,
+            queue_size: int | None = None,
+            mode: str = SYNC,
+            pages_per_process: int = 4,
+            captcha_detect_timeout: int = 5,
+            retries: int = 3,
+            max_restarts: int = 10,
+            solver_kwargs: dict[str, Any] | None = None,
+            on_result: Callable[[FleetResult], None] | None = None,
+            worker_target: WorkerTarget | None = None,
+            **playwright_context_kwargs
+        ) -> None:
+        """Supervise worker processes that visit URLs and solve any captcha on them.
+
+        Args:
+            api_key: SadCaptcha API key
+            processes: number of worker processes. If None, one per CPU core.
+            queue_size: number of URLs waiting for a worker before submit blocks. If None, 4 per process.
+            mode: "sync" to visit one URL at a time per process with PlaywrightSolver,
+                or "async" to visit pages_per_process URLs at a time with AsyncPlaywrightSolver
+            pages_per_process: pages open at once in each process, in async mode
+            captcha_detect_timeout: passed to solve_captcha_if_present
+            retries: passed to solve_captcha_if_present
+            max_restarts: replacements started for each worker before it is given up on
+            solver_kwargs: keyword arguments for each solver
+            on_result: called in the supervisor with every FleetResult
+            worker_target: function run in each worker process. Defaults to run_worker.
+                It should take URLs with take_url, so a URL it holds when it dies still gets a result.
+            **playwright_context_kwargs: keyword args passed to the launcher for every worker.
+                An extension_dir may be given, otherwise the extension cache is used.
+        """
+        if mode not in (SYNC, ASYNC):
+            raise ValueError(f"mode must be {SYNC!r} or {ASYNC!r}")
+        self.processes = processes or os.cpu_count() or 1
+        self.max_restarts = max_restarts
+        self.collector = HistogramCollector()
+        self.restarts = 0
+        self._config = WorkerConfig(
+            api_key=api_key,
+            extension_dir=playwright_context_kwargs.pop("extension_dir", None),
+            mode=mode,
+            pages=pages_per_process if mode == ASYNC else 1,
+            captcha_detect_timeout=captcha_detect_timeout,
+            retries=retries,
+            solver_kwargs=solver_kwargs or {},
+            playwright_context_kwargs=playwright_context_kwargs,
+        )
+        self._on_result = on_result
+        self._worker_target = worker_target or run_worker
+        # playwright does not survive a fork, so workers are always spawned
+        self._mp = multiprocessing.get_context("spawn")
+        self._urls = self._mp.Queue(maxsize=queue_size or self.processes * 4)
+        # written to the pipe before put returns, so a worker that crashes cannot lose what it sent
+        self._metrics = self._mp.SimpleQueue()
+        self._workers: dict[int, SpawnProcess] = {}
+        self._restarts_by_worker: dict[int, int] = {}
+        # worker processes whose exit was already reported to the collector
+        self._exits_reported: set[SpawnProcess] = set()
+        self._exits_lock = threading.Lock()
+        # URLs each worker took and has not sent a result for. Only used by the collector thread.
+        self._held: dict[int, list[str]] = {}
+        self._submitted = 0
+        self._completed = 0
+        self._progress = threading.Condition()
+        self._closing = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Unpack the extension and spawn the workers"""
+        if self._workers:
+            return
+        if self._config.extension_dir is None and self._worker_target is run_worker:
+            # unpack once, instead of once per worker
+            self._config.extension_dir = get_patched_extension_dir(self._config.api_key)
+        for worker_id in range(self.processes):
+            self._spawn(worker_id)
+        self._threads = [
+            threading.Thread(target=self._collect, name="fleet-metrics", daemon=True),
+            threading.Thread(target=self._supervise, name="fleet-supervisor", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        LOGGER.debug("started fleet with %s %s workers", self.processes, self._config.mode)
+
+    def submit(self, url: str, timeout: float | None = None) -> None:
+        """Queue a URL for the next free worker. Blocks while the queue is full.
+
+        Raises:
+            queue.Full: if the queue is still full after timeout seconds
+        """
+        if not self._workers:
+            raise RuntimeError("Fleet is not started")
+        self._urls.put(url, timeout=timeout)
+        with self._progress:
+            self._submitted += 1
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait until every submitted URL has a result. Returns False on timeout."""
+        with self._progress:
+            return self._progress.wait_for(lambda: self._completed >= self._submitted, timeout=timeout)
+
+    def close(self, timeout: float = 30) -> None:
+        """Let the workers finish the queued URLs, then stop them"""
+        if not self._workers:
+            return
+        self._closing.set()
+        deadline = time.monotonic() + timeout
+        try:
+            for _ in range(self.processes * self._config.pages):
+                self._urls.put(None, timeout=max(deadline - time.monotonic(), 0))
+        except queue.Full:
+            LOGGER.warning("fleet workers did not take the queued URLs in time")
+        # replacements are started while waiting, so wait until no worker is alive or about to restart
+        while any(process.is_alive() or self._will_restart(worker_id) for worker_id, process in list(self._workers.items())):
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+        self._stopping.set()
+        for process in list(self._workers.values()):
+            if process.is_alive():
+                LOGGER.warning("terminating fleet worker %s, which did not stop in time", process.name)
+                process.terminate()
+            process.join()
+        for worker_id, process in list(self._workers.items()):
+            self._report_exit(worker_id, process)
+        self._metrics.put(_STOP_COLLECTING)
+        for thread in self._threads:
+            thread.join()
+        self._workers.clear()
+        LOGGER.debug("closed fleet")
+
+    def __enter__(self) -> "Fleet":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def completed(self) -> int:
+        return self._completed
+
+    def _spawn(self, worker_id: int) -> None:
+        process = self._mp.Process(
+            target=self._worker_target,
+            args=(worker_id, self._config, self._urls, self._metrics),
+            name=f"fleet-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = process
+
+    def _supervise(self) -> None:
+        """Report every worker that exited with an error, and start a replacement for it"""
+        while not self._stopping.wait(0.2):
+            for worker_id, process in list(self._workers.items()):
+                if self._stopping.is_set():
+                    continue
+                self._report_exit(worker_id, process)
+                if not self._will_restart(worker_id):
+                    continue
+                LOGGER.warning("fleet worker %s exited with code %s, restarting", worker_id, process.exitcode)
+                self._restarts_by_worker[worker_id] = self._restarts_by_worker.get(worker_id, 0) + 1
+                self.restarts += 1
+                self._spawn(worker_id)
+                if self._closing.is_set():
+                    # the stop markers may have been taken by the lanes of the worker that died.
+                    # every URL is queued before the markers, so extra markers are harmless.
+                    try:
+                        for _ in range(self._config.pages):
+                            self._urls.put(None, timeout=5)
+                    except queue.Full:
+                        pass
+
+    def _report_exit(self, worker_id: int, process: SpawnProcess) -> None:
+        """Tell the collector once that process exited with an error, so the URLs it held get a result.
+        Everything the process sent is already on the metrics queue, which does not buffer."""
+        if process.is_alive() or process.exitcode == 0:
+            return
+        with self._exits_lock:
+            if process in self._exits_reported:
+                return
+            self._exits_reported.add(process)
+        self._metrics.put(_WorkerExited(worker_id, process.exitcode))
+
+    def _will_restart(self, worker_id: int) -> bool:
+        """Whether the worker exited with an error and has restarts left"""
+        process = self._workers[worker_id]
+        if process.is_alive() or process.exitcode == 0:
+            return False
+        return self._restarts_by_worker.get(worker_id, 0) < self.max_restarts
+
+    def _collect(self) -> None:
+        """Aggregate the results sent by the workers"""
+        while True:
+            result = self._metrics.get()
+            if result == _STOP_COLLECTING:
+                return
+            if isinstance(result, _Claim):
+                self._held.setdefault(result.worker_id, []).append(result.url)
+                continue
+            if isinstance(result, _WorkerExited):
+                for url in self._held.pop(result.worker_id, []):
+                    LOGGER.warning("fleet worker %s exited while visiting %s", result.worker_id, url)
+                    self._complete(FleetResult(result.worker_id, url, None, 0, f"worker exited with code {result.exitcode}"))
+                continue
+            held = self._held.get(result.worker_id, [])
+            if result.url in held:
+                held.remove(result.url)
+            self._complete(result)
+
+    def _complete(self, result: FleetResult) -> None:
+        """Aggregate the result of one URL"""
+        if result.record is not None:
+            self.collector.on_solve(result.record)
+        if self._on_result is not None:
+            try:
+                self._on_result(result)
+            except Exception:
+                LOGGER.exception("fleet result callback failed")
+        with self._progress:
+            self._completed += 1
+            self._progress.notify_all()
+
+
+class _RecordKeeper(SolveObserver):
+    """Keeps the record of the last solve, to send it to the supervisor"""
+
+    def __init__(self) -> None:
+        self.record: SolveRecord | None = None
+
+    def on_solve(self, record: SolveRecord) -> None:
+        self.record = record
+
+
+def run_worker(worker_id: int, config: WorkerConfig, urls: Any, metrics: Any) -> None:
+    """Entry point of a worker process. Visits URLs from the queue until it gets None."""
+    try:
+        if config.mode == ASYNC:
+            asyncio.run(_run_async_worker(worker_id, config, urls, metrics))
+        else:
+            _run_sync_worker(worker_id, config, urls, metrics)
+    except TargetClosedError:
+        LOGGER.warning("browser of fleet worker %s closed, exiting for a restart", worker_id)
+        sys.exit(RESTART_EXIT_CODE)
+
+
+def take_url(worker_id: int, urls: Any, metrics: Any, block: bool = True) -> str | None:
+    """Take the next URL from the queue, and tell the supervisor this worker holds it,
+    so it gets an error result if the worker dies before sending one.
+
+    Raises:
+        queue.Empty: if block is False and no URL is queued
+    """
+    url = urls.get(block)
+    if url is not None:
+        metrics.put(_Claim(worker_id, url))
+    return url
+
+
+def _run_sync_worker(worker_id: int, config: WorkerConfig, urls: Any, metrics: Any) -> None:
+    from playwright.sync_api import sync_playwright
+    from .launcher import make_playwright_solver_context
+    from .playwrightsolver import PlaywrightSolver
+
+    with sync_playwright() as p:
+        context = make_playwright_solver_context(
+            p, config.api_key, extension_dir=config.extension_dir, **config.playwright_context_kwargs)
+        try:
+            page = context.new_page()
+            keeper = _RecordKeeper()
+            solver = PlaywrightSolver(page, config.api_key, observer=keeper, **config.solver_kwargs)
+            while (url := take_url(worker_id, urls, metrics)) is not None:
+                keeper.record = None
+                start = time.perf_counter()
+                try:
+                    page.goto(url)
+                    solver.solve_captcha_if_present(config.captcha_detect_timeout, config.retries)
+                except TargetClosedError as e:
+                    metrics.put(_result(worker_id, url, keeper.record, start, _describe(e)))
+                    raise
+                except Exception as e:
+                    metrics.put(_result(worker_id, url, keeper.record, start, _describe(e)))
+                else:
+                    metrics.put(_result(worker_id, url, keeper.record, start, None))
+        finally:
+            try:
+                context.close()
+            except Exception:
+                pass
+
+
+async def _run_async_worker(worker_id: int, config: WorkerConfig, urls: Any, metrics: Any) -> None:
+    from playwright.async_api import async_playwright
+    from .async_api import AsyncApiClient
+    from .asyncplaywrightsolver import AsyncPlaywrightSolver
+    from .launcher import make_async_playwright_solver_context
+
+    # set when a lane fails, so the others stop taking URLs and the worker can exit for a restart
+    stopping = asyncio.Event()
+
+    async def next_url() -> str | None:
+        # polled rather than taken in a thread: a cancelled thread would still take a URL and drop it
+        while not stopping.is_set():
+            try:
+                return take_url(worker_id, urls, metrics, block=False)
+            except queue.Empty:
+                await asyncio.sleep(URL_POLL_INTERVAL)
+        return None
+
+    async def lane(context: Any, client: AsyncApiClient) -> None:
+        try:
+            page = await context.new_page()
+            keeper = _RecordKeeper()
+            solver = AsyncPlaywrightSolver(page, config.api_key, observer=keeper, client=client, **config.solver_kwargs)
+            while (url := await next_url()) is not None:
+                keeper.record = None
+                start = time.perf_counter()
+                try:
+                    await page.goto(url)
+                    await solver.solve_captcha_if_present(config.captcha_detect_timeout, config.retries)
+                except TargetClosedError as e:
+                    metrics.put(_result(worker_id, url, keeper.record, start, _describe(e)))
+                    raise
+                except Exception as e:
+                    metrics.put(_result(worker_id, url, keeper.record, start, _describe(e)))
+                else:
+                    metrics.put(_result(worker_id, url, keeper.record, start, None))
+        except BaseException:
+            stopping.set()
+            raise
+
+    async with async_playwright() as p, AsyncApiClient(config.api_key) as client:
+        context = await make_async_playwright_solver_context(
+            p, config.api_key, extension_dir=config.extension_dir, **config.playwright_context_kwargs)
+        try:
+            # every lane finishes the URL it is visiting and sends its result before the worker exits
+            outcomes = await asyncio.gather(*(lane(context, client) for _ in range(config.pages)), return_exceptions=True)
+            errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+            if errors:
+                # a closed browser takes precedence, so the worker exits for a restart
+                raise next((e for e in errors if isinstance(e, TargetClosedError)), errors[0])
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+
+def _result(worker_id: int, url: str, record: SolveRecord | None, start: float, error: str | None) -> FleetResult:
+    if error is not None and record is not None:
+        record.outcome = ERROR
+    return FleetResult(worker_id, url, record, time.perf_counter() - start, error)
+
+
+def _describe(e: BaseException) -> str:
+    return "".join(traceback.format_exception_only(type(e), e)).strip()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="temu-captcha-fleet",
+        description="Visit URLs in worker processes and solve any Temu captcha on them"
+    )
+    parser.add_argument("api_key", help="SadCaptcha API key")
+    parser.add_argument("urls", nargs="?", type=argparse.FileType("r"), default=sys.stdin,
+                        help="file with one URL per line, read from stdin if omitted")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, one per CPU core by default")
+    parser.add_argument("--mode", choices=[SYNC, ASYNC], default=SYNC)
+    parser.add_argument("--pages-per-process", type=int, default=4, help="pages open at once per process, in async mode")
+    parser.add_argument("--queue-size", type=int, default=None, help="URLs waiting for a worker before reading blocks")
+    parser.add_argument("--headless", action="store_true", help="launch the browsers headless")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    def report(result: FleetResult) -> None:
+        outcome = result.error or (result.record.outcome if result.record else "unknown")
+        LOGGER.info("worker %s %s %s in %.1fs", result.worker_id, result.url, outcome, result.seconds)
+
+    fleet = Fleet(
+        args.api_key,
+        processes=args.processes,
+        queue_size=args.queue_size,
+        mode=args.mode,
+        pages_per_process=args.pages_per_process,
+        on_result=report,
+        headless=args.headless,
+    )
+    with fleet:
+        for line in args.urls:
+            if line.strip():
+                fleet.submit(line.strip())
+        fleet.wait()
+    for phase, stats in fleet.collector.summary().items():
+        print(f"{phase:12s} count={stats['count']:<6.0f} mean={stats['mean']:.2f}s p50<={stats['p50']}s p95<={stats['p95']}s")
+    print(f"outcomes: {dict(fleet.collector.outcomes)}, worker restarts: {fleet.restarts}")
+
+
+if __name__ == "__main__":
+    main()
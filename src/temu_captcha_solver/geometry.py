@@ -1,15 +1,30 @@
 import re
+from array import array
+from collections.abc import Iterable, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, overload
 
-from playwright.async_api import FloatRect
+from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic.json_schema import JsonSchemaValue
+from pydantic_core import core_schema
+
+if TYPE_CHECKING:
+    from playwright.async_api import FloatRect
+    from temu_captcha_solver.models import ArcedSlideTrajectoryElement, ProportionalPoint
+
+# the text between the last "rotate(" and the "deg" after it
+_ROTATE_ANGLE = re.compile(r".*rotate\((.*?)deg")
 
-from temu_captcha_solver.models import ArcedSlideTrajectoryElement, ProportionalPoint
 
 def rotate_angle_from_style(style: str) -> float:
     """Extract the rotate value from the css style attribute"""
-    if not "rotate" in style:
-        return 0
-    rotate_string = re.sub(r".*rotate\(|deg.*", "", style)
-    return float(rotate_string)
+    match = _ROTATE_ANGLE.search(style)
+    return float(match.group(1)) if match else 0
+
+
+def rotate_angles_from_styles(styles: Iterable[str]) -> array:
+    """rotate_angle_from_style for many styles at once"""
+    search = _ROTATE_ANGLE.search
+    return array("d", [float(match.group(1)) if match else 0.0 for match in map(search, styles)])
 
 
 def xy_to_proportional_point(
@@ -17,17 +32,18 @@ def xy_to_proportional_point(
         y_in_container: float,
         container_width: float,
         container_height: float,
-    ) -> ProportionalPoint:
-    """Convert an x, y pair into a propotional point where the 
+    ) -> "ProportionalPoint":
+    """Convert an x, y pair into a propotional point where the
     resulting x and y proportions are the fraction of the width
     and height respectively.
     """
+    from temu_captcha_solver.models import ProportionalPoint
     return ProportionalPoint(
         proportion_x = x_in_container / container_width,
         proportion_y = y_in_container / container_height,
     )
 
-def get_box_center(box: FloatRect) -> tuple[float, float]:
+def get_box_center(box: "FloatRect") -> tuple[float, float]:
     """Get the center of a box from a FloatRect"""
     center_x = box["x"] + (box["width"] / 2)
     center_y = box["y"] + (box["height"] / 2)
@@ -41,10 +57,172 @@ def get_center(left_x: float, top_y: float, width: float, height: float) -> tupl
     return center_x, center_y
 
 
-def piece_is_not_moving(trajectory: list[ArcedSlideTrajectoryElement]) -> bool:
-    """Return True if the last two trajectory elements have the same proportion_x, 
-    indicating that the piece is not moving"""
-    if trajectory[-2].piece_center.proportion_x == trajectory[-1].piece_center.proportion_x:
-        return True
-    else:
-        return False
+def piece_is_not_moving(
+    trajectory: "Sequence[ArcedSlideTrajectoryElement]",
+    tolerance: float = 0.0,
+    angle_tolerance: float = 0.0
+) -> bool:
+    """Return True if the last two trajectory elements are within tolerance of each other,
+    indicating that the piece is not moving.
+    tolerance is a proportion of the container, angle_tolerance is in degrees.
+    See TrajectoryArray.rest_index to check a whole trajectory at once."""
+    previous, latest = trajectory[-2], trajectory[-1]
+    return abs(latest.piece_center.proportion_x - previous.piece_center.proportion_x) <= tolerance \
+        and abs(latest.piece_center.proportion_y - previous.piece_center.proportion_y) <= tolerance \
+        and abs(latest.piece_rotation_angle - previous.piece_rotation_angle) <= angle_tolerance
+
+
+class TrajectoryArray:
+    """An arced slide trajectory held as parallel arrays, one entry per point:
+    the pixels the slider has been dragged from its origin, the piece center as a
+    proportion of the container, and the piece rotation angle in degrees.
+
+    Building a pydantic ArcedSlideTrajectoryElement per sample is the slowest part of turning
+    samples into a trajectory, so the solvers keep trajectories in this form. It is turned
+    into the API's JSON shape only when the request is sent, by encode_request_body or
+    model_dump(). Indexing a point returns an ArcedSlideTrajectoryElement, and slicing
+    returns a TrajectoryArray.
+    """
+
+    __slots__ = ("pixels", "center_x", "center_y", "angles")
+
+    def __init__(
+            self,
+            pixels: Iterable[int] = (),
+            center_x: Iterable[float] = (),
+            center_y: Iterable[float] = (),
+            angles: Iterable[float] = ()
+        ) -> None:
+        self.pixels = array("q", pixels)
+        self.center_x = array("d", center_x)
+        self.center_y = array("d", center_y)
+        self.angles = array("d", angles)
+        if not len(self.pixels) == len(self.center_x) == len(self.center_y) == len(self.angles):
+            raise ValueError("trajectory arrays must have the same length")
+
+    @classmethod
+    def from_rects(
+            cls,
+            pixels: Iterable[int],
+            rects: Iterable[Sequence[float]],
+            styles: Iterable[str],
+            container: Mapping[str, float]
+        ) -> "TrajectoryArray":
+        """Convert the piece's bounding rects, as (left, top, width, height), and its style
+        attributes into a trajectory, relative to the container's bounding rect"""
+        x, y, width, height = container["x"], container["y"], container["width"], container["height"]
+        center_x = array("d")
+        center_y = array("d")
+        for left, top, rect_width, rect_height in rects:
+            center_x.append((left + rect_width / 2 - x) / width)
+            center_y.append((top + rect_height / 2 - y) / height)
+        return cls(pixels, center_x, center_y, rotate_angles_from_styles(styles))
+
+    @classmethod
+    def from_elements(cls, elements: "Iterable[ArcedSlideTrajectoryElement]") -> "TrajectoryArray":
+        trajectory = cls()
+        for element in elements:
+            trajectory.pixels.append(element.pixels_from_slider_origin)
+            trajectory.center_x.append(element.piece_center.proportion_x)
+            trajectory.center_y.append(element.piece_center.proportion_y)
+            trajectory.angles.append(element.piece_rotation_angle)
+        return trajectory
+
+    @classmethod
+    def from_json(cls, elements: Iterable[Mapping[str, Any]]) -> "TrajectoryArray":
+        """Read a trajectory in the shape of the API request, the inverse of to_json"""
+        trajectory = cls()
+        for element in elements:
+            center = element["piece_center"]
+            trajectory.pixels.append(element["pixels_from_slider_origin"])
+            trajectory.center_x.append(center["proportion_x"])
+            trajectory.center_y.append(center["proportion_y"])
+            trajectory.angles.append(element["piece_rotation_angle"])
+        return trajectory
+
+    def __len__(self) -> int:
+        return len(self.pixels)
+
+    @overload
+    def __getitem__(self, index: int) -> "ArcedSlideTrajectoryElement": ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "TrajectoryArray": ...
+
+    def __getitem__(self, index: int | slice) -> "ArcedSlideTrajectoryElement | TrajectoryArray":
+        if isinstance(index, slice):
+            return TrajectoryArray(self.pixels[index], self.center_x[index], self.center_y[index], self.angles[index])
+        from temu_captcha_solver.models import ArcedSlideTrajectoryElement, ProportionalPoint
+        return ArcedSlideTrajectoryElement(
+            pixels_from_slider_origin=self.pixels[index],
+            piece_rotation_angle=self.angles[index],
+            piece_center=ProportionalPoint(proportion_x=self.center_x[index], proportion_y=self.center_y[index])
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TrajectoryArray):
+            return NotImplemented
+        return self.pixels == other.pixels and self.center_x == other.center_x \
+            and self.center_y == other.center_y and self.angles == other.angles
+
+    def __repr__(self) -> str:
+        return f"TrajectoryArray({len(self)} points)"
+
+    def take(self, indices: Iterable[int]) -> "TrajectoryArray":
+        """The points at indices, in that order"""
+        indices = list(indices)
+        return TrajectoryArray(
+            [self.pixels[i] for i in indices],
+            [self.center_x[i] for i in indices],
+            [self.center_y[i] for i in indices],
+            [self.angles[i] for i in indices]
+        )
+
+    def still_steps(self, tolerance: float = 0.0, angle_tolerance: float = 0.0) -> list[bool]:
+        """For each point after the first, whether the piece moved less than tolerance
+        (a proportion of the container) and rotated less than angle_tolerance degrees since the previous point"""
+        x, y, angles = self.center_x, self.center_y, self.angles
+        return [
+            abs(x1 - x0) <= tolerance and abs(y1 - y0) <= tolerance and abs(a1 - a0) <= angle_tolerance
+            for x0, x1, y0, y1, a0, a1 in zip(x, x[1:], y, y[1:], angles, angles[1:])
+        ]
+
+    def rest_index(self, tolerance: float, angle_tolerance: float, min_pixels: int, still_pixels: int) -> int | None:
+        """Index of the first point at which the piece has been still, within tolerance, over
+        still_pixels of slider travel, only counting points from min_pixels on. None if it never rests."""
+        still_since: int | None = None
+        for i, still in enumerate(self.still_steps(tolerance, angle_tolerance), start=1):
+            pixel = self.pixels[i]
+            if pixel < min_pixels:
+                continue
+            if not still:
+                still_since = None
+                continue
+            if still_since is None:
+                still_since = self.pixels[i - 1]
+            if pixel - still_since >= still_pixels:
+                return i
+        return None
+
+    def to_json(self) -> list[dict[str, Any]]:
+        """The trajectory in the shape of the API request"""
+        return [
+            {
+                "pixels_from_slider_origin": pixel,
+                "piece_rotation_angle": angle,
+                "piece_center": {"proportion_x": x, "proportion_y": y},
+            }
+            for pixel, x, y, angle in zip(self.pixels, self.center_x, self.center_y, self.angles)
+        ]
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.is_instance_schema(
+            cls,
+            serialization=core_schema.plain_serializer_function_ser_schema(cls.to_json, when_used="always")
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler) -> JsonSchemaValue:
+        from temu_captcha_solver.models import ArcedSlideTrajectoryElement
+        return handler(core_schema.list_schema(ArcedSlideTrajectoryElement.__pydantic_core_schema__))
@@ -0,0 +1,102 @@
+"""Base64 images that keep a single buffer from the page to the request body.
+
+Taking the base64 part of a data url with url.split(",") copies the whole image, and the
+default request encoding copies it again in model_dump(), json.dumps() and the final encode.
+An ImagePayload encodes the data url to ASCII bytes once, and exposes the base64 part as a
+memoryview into that buffer. encode_request_body writes the memoryview straight into the
+request body, so the image is only copied once more, when the body is joined.
+
+The request models accept an ImagePayload wherever they accept a base64 string, and
+model_dump() turns it into a str, so the default encoding and dump_requests still work.
+"""
+
+import base64
+import re
+from typing import Any
+
+from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic.json_schema import JsonSchemaValue
+from pydantic_core import core_schema
+
+_BASE64 = re.compile(rb"[A-Za-z0-9+/]*={0,2}")
+
+
+class ImagePayload:
+    """A base64 image, held as a view into one ASCII buffer.
+
+    Args:
+        buffer: ASCII bytes containing the base64 image
+        start: index in buffer where the base64 image starts, e.g. after the comma of a data url
+    """
+
+    __slots__ = ("_buffer", "_start")
+
+    def __init__(self, buffer: bytes, start: int = 0) -> None:
+        # matched in place, so the image can be written into the request body without escaping
+        if not _BASE64.fullmatch(memoryview(buffer)[start:]):
+            raise ValueError("image is not base64")
+        self._buffer = buffer
+        self._start = start
+
+    @classmethod
+    def from_data_url(cls, url: str) -> "ImagePayload":
+        """The portion of url after data:image/png;base64,"""
+        comma = url.find(",")
+        if comma < 0 or not url.isascii():
+            raise ValueError("image source is not a base64 data url")
+        return cls(url.encode("ascii"), comma + 1)
+
+    @classmethod
+    def from_b64(cls, image_b64: str) -> "ImagePayload":
+        if not image_b64.isascii():
+            raise ValueError("image is not base64")
+        return cls(image_b64.encode("ascii"))
+
+    @property
+    def b64(self) -> memoryview:
+        """The base64 image, without copying it"""
+        return memoryview(self._buffer)[self._start:]
+
+    def decode(self) -> bytes:
+        """The decoded image bytes"""
+        return base64.b64decode(self.b64)
+
+    def __len__(self) -> int:
+        return len(self._buffer) - self._start
+
+    def __str__(self) -> str:
+        return str(self.b64, "ascii")
+
+    def __repr__(self) -> str:
+        return f"ImagePayload({len(self)} base64 characters)"
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ImagePayload):
+            return self.b64 == other.b64
+        if isinstance(other, str):
+            return other.isascii() and self.b64 == other.encode("ascii")
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.b64)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(str, when_used="always")
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler) -> JsonSchemaValue:
+        return {"type": "string", "contentEncoding": "base64"}
+
+    @classmethod
+    def _validate(cls, value: Any) -> "ImagePayload":
+        if isinstance(value, ImagePayload):
+            return value
+        if isinstance(value, str):
+            return cls.from_b64(value)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return cls(bytes(value))
+        raise ValueError("expected an ImagePayload or a base64 string")
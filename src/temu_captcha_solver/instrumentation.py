@@ -0,0 +1,163 @@
+"""Per-phase timing of captcha solves.
+
+solve_captcha_if_present builds a SolveRecord with the time spent in each phase of the
+solve, the captcha type, the number of retries and the outcome, and passes it to the
+solver's observer when the solve ends. HistogramCollector is an observer that aggregates
+records into latency histograms, to find where time goes across many solves.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Generator
+
+from .captchatype import CaptchaType
+
+LOGGER = logging.getLogger(__name__)
+
+# Phases of a solve
+POPUP = "popup"
+PRESENCE = "presence"
+DETECTION = "detection"
+EXTRACTION = "extraction"
+API = "api"
+INTERACTION = "interaction"
+VALIDATION = "validation"
+
+# Outcomes of a solve
+SOLVED = "solved"
+NOT_PRESENT = "not_present"
+FAILED = "failed"
+ERROR = "error"
+
+
+@dataclass
+class SolveRecord:
+    """Timings and result of one call to solve_captcha_if_present"""
+    captcha_type: CaptchaType = CaptchaType.NONE
+    phases: dict[str, float] = field(default_factory=dict)
+    retries: int = 0
+    outcome: str = FAILED
+    total_seconds: float = 0.0
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Add the time spent in the block to the named phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+class SolveObserver:
+    """Receives a SolveRecord at the end of every solve. Subclass and override on_solve."""
+
+    def on_solve(self, record: SolveRecord) -> None:
+        pass
+
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = [
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 25.0, 60.0, float("inf"),
+]
+
+
+@dataclass
+class Histogram:
+    """Counts of durations falling in each bucket"""
+    buckets: list[float]
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class HistogramCollector(SolveObserver):
+    """Aggregates solve records into per-phase latency histograms.
+    Safe to share between solvers running in several threads.
+
+    Args:
+        buckets: upper bounds of the histogram buckets in seconds, ending with infinity
+    """
+
+    TOTAL = "total"
+
+    def __init__(self, buckets: list[float] | None = None) -> None:
+        self.buckets = buckets or DEFAULT_BUCKETS
+        self.outcomes: Counter[str] = Counter()
+        self.retries: Counter[int] = Counter()
+        self._histograms: dict[tuple[str, CaptchaType | None], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def on_solve(self, record: SolveRecord) -> None:
+        with self._lock:
+            self.outcomes[record.outcome] += 1
+            self.retries[record.retries] += 1
+            for name, seconds in [(self.TOTAL, record.total_seconds), *record.phases.items()]:
+                for captcha_type in (None, record.captcha_type):
+                    self._histogram(name, captcha_type).add(seconds)
+
+    def histogram(self, phase: str = TOTAL, captcha_type: CaptchaType | None = None) -> Histogram:
+        """Histogram of a phase, or of whole solves, optionally for a single captcha type"""
+        with self._lock:
+            return self._histogram(phase, captcha_type)
+
+    def summary(self, captcha_type: CaptchaType | None = None) -> dict[str, dict[str, float]]:
+        """Count, mean, p50 and p95 seconds of every phase"""
+        with self._lock:
+            return {
+                phase: {
+                    "count": histogram.count,
+                    "mean": histogram.mean,
+                    "p50": histogram.percentile(50),
+                    "p95": histogram.percentile(95),
+                }
+                for (phase, histogram_type), histogram in self._histograms.items()
+                if histogram_type == captcha_type
+            }
+
+    def _histogram(self, phase: str, captcha_type: CaptchaType | None) -> Histogram:
+        key = (phase, captcha_type)
+        if key not in self._histograms:
+            self._histograms[key] = Histogram(self.buckets)
+        return self._histograms[key]
+
+
+def report_solve(observer: SolveObserver | None, record: SolveRecord) -> None:
+    """Pass a finished record to the observer. A failing observer does not fail the solve."""
+    if observer is None:
+        return
+    try:
+        observer.on_solve(record)
+    except Exception:
+        LOGGER.exception("solve observer failed")
@@ -1,57 +1,67 @@
 import logging
 import tempfile
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from selenium.webdriver import ChromeOptions
-import undetected_chromedriver as uc
-from .download_crx import download_extension_to_unpacked
+from .extension_cache import get_patched_extension_dir, patch_extension_script_with_key
 
-from playwright import sync_api
-from playwright import async_api
+# Selenium, undetected_chromedriver and Playwright are imported where they are used,
+# so that a worker using one backend does not pay to import the others
+if TYPE_CHECKING:
+    from selenium.webdriver import ChromeOptions
+    import undetected_chromedriver as uc
+    from playwright import sync_api
+    from playwright import async_api
 
 LOGGER = logging.getLogger(__name__)
 
 def make_undetected_chromedriver_solver(
     api_key: str,
-    options: ChromeOptions | None = None,
+    options: "ChromeOptions | None" = None,
+    extension_dir: str | None = None,
     **uc_chrome_kwargs
-) -> uc.Chrome:
+) -> "uc.Chrome":
     """Create an undetected chromedriver patched with SadCaptcha.
     
     Args:
         api_key (str): SadCaptcha API key
         options (ChromeOptions | None): Options to launch uc.Chrome with
+        extension_dir (str | None): Unpacked extension patched with the API key. If None, the extension cache is used.
         uc_chrome_kwargs: keyword arguments for call to uc.Chrome
     """
+    from selenium.webdriver import ChromeOptions
+    import undetected_chromedriver as uc
+
     if options is None:
         options = ChromeOptions()
-    ext_dir = download_extension_to_unpacked()
-    _patch_extension_file_with_key(ext_dir.name, api_key)
-    options.add_argument(f'--load-extension={ext_dir.name}')
+    if extension_dir is None:
+        extension_dir = get_patched_extension_dir(api_key)
+    options.add_argument(f'--load-extension={extension_dir}')
     chrome = uc.Chrome(options=options, **uc_chrome_kwargs)
     LOGGER.debug("created new undetected chromedriver patched with sadcaptcha")
     return chrome
 
 def make_playwright_solver_context(
-    playwright: sync_api.Playwright,
+    playwright: "sync_api.Playwright",
     api_key: str,
     user_data_dir: str | None = None,
+    extension_dir: str | None = None,
     **playwright_context_kwargs
-) -> sync_api.BrowserContext:
+) -> "sync_api.BrowserContext":
     """Create a playwright context patched with SadCaptcha.
     
     Args:
         playwright (playwright.sync_api.playwright) - Playwright instance
         api_key (str): SadCaptcha API key
         user_data_dir (str | None): User data dir that is passed to playwright.chromium.launch_persistent_context. If None, a temporary directory will be used.
+        extension_dir (str | None): Unpacked extension patched with the API key. If None, the extension cache is used.
         **playwright_context_kwargs: Keyword args which will be passed to playwright.chromium.launch_persistent_context()
     """
-    ext_dir = download_extension_to_unpacked()
+    if extension_dir is None:
+        extension_dir = get_patched_extension_dir(api_key)
     if user_data_dir is None:
         user_data_dir_tempdir = tempfile.TemporaryDirectory()
         user_data_dir = user_data_dir_tempdir.name
-    _patch_extension_file_with_key(ext_dir.name, api_key)
-    playwright_context_kwargs = _prepare_pw_context_args(playwright_context_kwargs, ext_dir.name)
+    playwright_context_kwargs = _prepare_pw_context_args(playwright_context_kwargs, extension_dir)
     ctx = playwright.chromium.launch_persistent_context(
         user_data_dir,
         **playwright_context_kwargs
@@ -60,25 +70,27 @@ def make_playwright_solver_context(
     return ctx
 
 async def make_async_playwright_solver_context(
-    async_playwright: async_api.Playwright,
+    async_playwright: "async_api.Playwright",
     api_key: str,
     user_data_dir: str | None = None,
+    extension_dir: str | None = None,
     **playwright_context_kwargs
-) -> async_api.BrowserContext:
+) -> "async_api.BrowserContext":
     """Create a async playwright context patched with SadCaptcha.
     
     Args:
         playwright (playwright.async_api.playwright) - Playwright instance
         api_key (str): SadCaptcha API key
         user_data_dir (str | None): User data dir that is passed to playwright.chromium.launch_persistent_context. If None, a temporary directory will be used.
+        extension_dir (str | None): Unpacked extension patched with the API key. If None, the extension cache is used.
         **playwright_context_kwargs: Keyword args which will be passed to playwright.chromium.launch_persistent_context()
     """
-    ext_dir = download_extension_to_unpacked()
+    if extension_dir is None:
+        extension_dir = get_patched_extension_dir(api_key)
     if user_data_dir is None:
         user_data_dir_tempdir = tempfile.TemporaryDirectory()
         user_data_dir = user_data_dir_tempdir.name
-    _patch_extension_file_with_key(ext_dir.name, api_key)
-    playwright_context_kwargs = _prepare_pw_context_args(playwright_context_kwargs, ext_dir.name)
+    playwright_context_kwargs = _prepare_pw_context_args(playwright_context_kwargs, extension_dir)
     ctx = await async_playwright.chromium.launch_persistent_context(
         user_data_dir,
         **playwright_context_kwargs
@@ -108,16 +120,3 @@ def _prepare_pw_context_args(
     LOGGER.debug("prepared playwright context kwargs")
     return playwright_context_kwargs
 
-
-def _patch_extension_file_with_key(extension_dir: str, api_key: str) -> None:
-    with open(extension_dir + "/script.js") as f:
-        script = f.read()
-    script = patch_extension_script_with_key(script, api_key)
-    with open(extension_dir + "/script.js", "w") as f:
-        _ = f.write(script)
-    LOGGER.debug("patched extension file with api key")
-
-def patch_extension_script_with_key(script: str, api_key: str) -> str:
-    script = script.replace("localStorage.getItem(\"sadCaptchaKey\");", f"\"{api_key}\";")
-    LOGGER.debug("patched extension script with api key")
-    return script
@@ -0,0 +1,101 @@
+"""Logging levels for the solver's subsystems, and a sampled TRACE level for per-step logs.
+
+The package never configures logging itself. Every module logs to its own logger under
+temu_captcha_solver, e.g. temu_captcha_solver.api or temu_captcha_solver.playwrightsolver,
+and messages are %-formatted only when a handler will emit them, so disabled levels cost
+a level check. Levels can be set per subsystem:
+
+    set_log_levels("WARNING,api=DEBUG,trajectory_sampler=TRACE")
+
+or with the TEMU_CAPTCHA_SOLVER_LOG environment variable, in the same format, which is read
+when this module is first imported. The empty or "temu_captcha_solver" name is the whole package.
+
+Per-step logs, like one line for every point of a slide trajectory, use the TRACE level
+through a SampledTrace, which emits only one of every trace_every() calls.
+"""
+
+import logging
+import os
+from collections.abc import Mapping
+from typing import Any
+
+PACKAGE = "temu_captcha_solver"
+LOG_LEVELS_ENV = "TEMU_CAPTCHA_SOLVER_LOG"
+
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+_trace_every = 1
+
+
+def parse_log_levels(spec: str) -> dict[str, str]:
+    """Parse "LEVEL,subsystem=LEVEL,..." into levels by subsystem, "" being the whole package"""
+    levels: dict[str, str] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        subsystem, _, level = item.rpartition("=")
+        levels[subsystem.strip()] = level.strip().upper()
+    return levels
+
+
+def set_log_levels(levels: str | Mapping[str, int | str]) -> None:
+    """Set the level of each subsystem's logger.
+
+    Args:
+        levels: levels by subsystem, e.g. {"": "WARNING", "api": logging.DEBUG}, or a spec like
+            "WARNING,api=DEBUG". Level names may be any logging level name, or TRACE.
+    """
+    if isinstance(levels, str):
+        levels = parse_log_levels(levels)
+    for subsystem, level in levels.items():
+        if isinstance(level, str) and level.isdigit():
+            level = int(level)
+        _logger_for(subsystem).setLevel(level)
+
+
+def set_trace_every(every: int) -> None:
+    """Emit one of every `every` sampled TRACE messages"""
+    global _trace_every
+    if every < 1:
+        raise ValueError("every must be at least 1")
+    _trace_every = every
+
+
+def trace_every() -> int:
+    return _trace_every
+
+
+class SampledTrace:
+    """Logs one of every trace_every() calls at TRACE level.
+    When TRACE is disabled for the logger, a call costs one level check.
+
+    Args:
+        logger: logger to emit the sampled messages on
+    """
+
+    __slots__ = ("logger", "_calls")
+
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+        self._calls = 0
+
+    def __call__(self, msg: str, *args: Any) -> None:
+        if not self.logger.isEnabledFor(TRACE):
+            return
+        self._calls += 1
+        if self._calls % _trace_every == 0:
+            self.logger.log(TRACE, msg, *args, stacklevel=2)
+
+
+def _logger_for(subsystem: str) -> logging.Logger:
+    if subsystem in ("", PACKAGE):
+        return logging.getLogger(PACKAGE)
+    if subsystem.startswith(PACKAGE + "."):
+        return logging.getLogger(subsystem)
+    return logging.getLogger(f"{PACKAGE}.{subsystem}")
+
+
+if os.environ.get(LOG_LEVELS_ENV):
+    set_log_levels(os.environ[LOG_LEVELS_ENV])
@@ -1,19 +1,38 @@
 import json
-from typing import Type
-from pydantic import BaseModel
+from typing import Any, Mapping, Type, TypeVar
+from pydantic import BaseModel, Field
+
+from .geometry import TrajectoryArray
+from .image_payload import ImagePayload
 
 def dump_to_json(obj: BaseModel, filename: str) -> None:
     """Dump a pydantic obj to json file"""
     with open(filename, "w") as f:
         json.dump(obj.model_dump(), f)
 
+M = TypeVar("M", bound=BaseModel)
+
+def load_from_json(model: Type[M], filename: str) -> M:
+    """Load a request dumped with dump_to_json"""
+    with open(filename) as f:
+        return request_from_json(model, json.load(f))
+
+def request_from_json(model: Type[M], data: Mapping[str, Any]) -> M:
+    """Parse a request in the API's JSON shape, such as one dumped with dump_requests=True.
+    The fields are validated as usual, except the arced slide trajectory, which is read
+    straight into a TrajectoryArray rather than a model per point."""
+    trajectory = data.get("slide_piece_trajectory")
+    if isinstance(trajectory, list):
+        data = {**data, "slide_piece_trajectory": TrajectoryArray.from_json(trajectory)}
+    return model(**data)
+
 class SwapTwoRequest(BaseModel):
     """Single image"""
-    image_b64: str
+    image_b64: str | ImagePayload
 
 class SemanticShapesRequest(BaseModel):
     """Single image with a text challenge"""
-    image_b64: str
+    image_b64: str | ImagePayload
     challenge: str
 
 class PuzzleCaptchaResponse(BaseModel):
@@ -58,9 +77,10 @@ class ArcedSlideCaptchaRequest(BaseModel):
     """This object contains data about the arced slide captcha including
     images, the trajectory of the slider, and the position of the 
     slider button."""
-    puzzle_image_b64: str
-    piece_image_b64: str
-    slide_piece_trajectory: list[ArcedSlideTrajectoryElement]
+    puzzle_image_b64: str | ImagePayload
+    piece_image_b64: str | ImagePayload
+    # TrajectoryArray is tried first, so it is kept as is rather than iterated into elements
+    slide_piece_trajectory: TrajectoryArray | list[ArcedSlideTrajectoryElement] = Field(union_mode="left_to_right")
 
 
 class ThreeByThreeCaptchaRequest(BaseModel):
@@ -72,7 +92,7 @@ class ThreeByThreeCaptchaRequest(BaseModel):
     middle, and 6-8 are the bottom row.
     """
     objects_of_interest: list[str]
-    images: list[str]
+    images: list[str | ImagePayload]
 
 class ThreeByThreeCaptchaResponse(BaseModel):
     """The indices of correct inages to click, in the order they must be clicked.
@@ -85,4 +105,4 @@ class ThreeByThreeCaptchaResponse(BaseModel):
 class TwoImageCaptchaRequest(BaseModel):
     """Contains text challenge and first and second images"""
     challenge: str
-    images_b64: list[str]
+    images_b64: list[str | ImagePayload]
@@ -11,5 +11,5 @@ def get_list_of_objects_of_interest(challenge: str) -> list[str]:
         output: ['television', 'strawberry', 'peach']
     """
     objects = re.findall(r"(?<=')[\w\s]+?(?=')", challenge)
-    LOGGER.debug(f"input text: {challenge}\nobjects of interest: {str(objects)}") 
+    LOGGER.debug("input text: %s\nobjects of interest: %s", challenge, objects)
     return objects
@@ -0,0 +1,65 @@
+"""In-page captcha presence checks shared by every solver backend.
+
+The presence indicators are joined into one selector when the module is imported, and a
+single script answers whether any of them is in the document. With a timeout the script
+watches the DOM with a MutationObserver and resolves as soon as presence changes to the
+wanted state, instead of the backend polling the page.
+"""
+
+from typing import Any
+
+from .selectors import CAPTCHA_PRESENCE_INDICATORS
+
+CAPTCHA_PRESENCE_SELECTOR = ", ".join(CAPTCHA_PRESENCE_INDICATORS)
+
+# Longest single watch in seconds. Longer waits are split into several watches, so a
+# navigation or a Selenium script timeout only ends the current watch.
+MAX_WATCH_SECONDS = 5
+
+# Takes {selector: string, present: bool, timeout: ms} and resolves to true as soon as
+# the presence of the selector in the document equals present, or false on timeout.
+WATCH_CAPTCHA_PRESENCE_JS = """
+(args) => new Promise((resolve) => {
+    const matches = () => (document.querySelector(args.selector) !== null) === args.present;
+    if (matches() || !args.timeout || !document.documentElement) {
+        resolve(matches());
+        return;
+    }
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        if (matches()) finish(true);
+    });
+    const finish = (result) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        resolve(result);
+    };
+    observer.observe(document.documentElement, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        attributeFilter: ["id", "class"],
+    });
+    timer = setTimeout(() => finish(matches()), args.timeout);
+})
+"""
+
+# WATCH_CAPTCHA_PRESENCE_JS wrapped for Selenium's execute_async_script, taking the args as arguments[0]
+WATCH_CAPTCHA_PRESENCE_ASYNC_SCRIPT = (
+    "const done = arguments[arguments.length - 1];"
+    f"({WATCH_CAPTCHA_PRESENCE_JS})(arguments[0]).then(done);"
+)
+
+
+def presence_args(present: bool, timeout: float = 0) -> dict[str, Any]:
+    """Arguments for WATCH_CAPTCHA_PRESENCE_JS. A timeout of 0 checks once without waiting.
+
+    Args:
+        present: whether to wait for the captcha to be present, or to be gone
+        timeout: seconds to watch the page, at most MAX_WATCH_SECONDS
+    """
+    return {
+        "selector": CAPTCHA_PRESENCE_SELECTOR,
+        "present": present,
+        "timeout": int(min(timeout, MAX_WATCH_SECONDS) * 1000),
+    }
@@ -0,0 +1,152 @@
+"""Recording of API traffic, for offline regression tests and load tests.
+
+dump_requests=True keeps only the last request of each captcha type. An API client given an
+ApiRecorder instead appends every request, the response, the latency and the outcome to
+gzip compressed JSON lines files, one object per line:
+
+    {"time": 1760000000.0, "endpoint": "temu-two-image", "latency": 0.81,
+     "outcome": "ok", "error": null, "request": {...}, "response": {...}}
+
+outcome is "ok", or the name of the exception the call raised. The license key is never
+recorded: endpoint is the last part of the API url, without the query.
+
+A new file is started once the current one holds max_bytes of uncompressed JSON, and the
+oldest files are deleted beyond max_files. Every process writes its own files, so processes
+of a fleet can share one directory. Each record is flushed as it is written, so the files
+can be read while they are being recorded, or after a crash. See replay.py to replay them.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+from urllib.parse import urlsplit
+
+import pydantic
+
+from .encoding import encode_request_body
+
+LOGGER = logging.getLogger(__name__)
+
+RECORDING_SUFFIX = ".jsonl.gz"
+OK = "ok"
+
+
+def endpoint_from_url(url: str) -> str:
+    """The last part of the path of an API url, e.g. temu-two-image"""
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+class ApiRecorder:
+    """Appends API calls to rotating gzip JSON lines files in directory.
+    Safe to share between clients running in several threads.
+
+    Args:
+        directory: where the recording files are written. Created if missing.
+        max_bytes: uncompressed bytes written to a file before starting the next one
+        max_files: recording files of this process kept before the oldest is deleted
+        prefix: start of the recording file names
+    """
+
+    def __init__(
+            self,
+            directory: str | os.PathLike[str],
+            max_bytes: int = 256 * 1024 * 1024,
+            max_files: int = 20,
+            prefix: str = "api-calls"
+        ) -> None:
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.prefix = prefix
+        self._file: gzip.GzipFile | None = None
+        self._written = 0
+        self._paths: list[str] = []
+        self._files_started = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def record(
+            self,
+            url: str,
+            request: pydantic.BaseModel | dict[str, Any],
+            response: dict[str, Any] | None,
+            latency: float,
+            error: BaseException | None = None
+        ) -> None:
+        """Append one API call"""
+        line = encode_request_body({
+            "time": time.time(),
+            "endpoint": endpoint_from_url(url),
+            "latency": latency,
+            "outcome": OK if error is None else type(error).__name__,
+            "error": None if error is None else str(error),
+            "request": request,
+            "response": response,
+        }) + b"\n"
+        with self._lock:
+            if self._file is None or self._written >= self.max_bytes:
+                self._rotate()
+            assert self._file is not None
+            self._file.write(line)
+            self._file.flush()
+            self._written += len(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "ApiRecorder":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        name = f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._files_started:04d}{RECORDING_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        self._file = gzip.open(path, "ab")
+        self._written = 0
+        self._files_started += 1
+        self._paths.append(path)
+        while len(self._paths) > self.max_files:
+            oldest = self._paths.pop(0)
+            try:
+                os.remove(oldest)
+            except FileNotFoundError:
+                pass
+        LOGGER.debug("recording API calls to %s", path)
+
+
+def recording_paths(directory: str | os.PathLike[str]) -> list[str]:
+    """The recording files in directory, oldest first"""
+    directory = os.fspath(directory)
+    names = [name for name in os.listdir(directory) if name.endswith(RECORDING_SUFFIX)]
+    paths = [os.path.join(directory, name) for name in names]
+    # files rotated within the same mtime tick are ordered by their sequence number
+    return sorted(paths, key=lambda path: (os.path.getmtime(path), path))
+
+
+def read_recordings(paths: Iterable[str | os.PathLike[str]]) -> Iterator[dict[str, Any]]:
+    """The records in the given files, or in the recording files of the given directories.
+    A file cut short, because it is still being written or its process crashed, yields the
+    records that were flushed."""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from read_recordings(recording_paths(path))
+            continue
+        with gzip.open(path, "rb") as f:
+            try:
+                for line in f:
+                    if line.endswith(b"\n"):
+                        yield json.loads(line)
+            except EOFError:
+                LOGGER.debug("recording %s ends early, it is still being written or was not closed", path)
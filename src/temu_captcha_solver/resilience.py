@@ -0,0 +1,269 @@
+"""Retries, circuit breaking and hedging for calls to the SadCaptcha API.
+
+A client given a Resilience retries server errors (5xx) and connection errors with jittered
+exponential backoff. Client errors like a bad request or an exhausted key are not retried.
+
+Every client in the process that talks to the same API host shares one CircuitBreaker.
+After failure_threshold consecutive server or connection failures the breaker opens, and
+every call fails fast with CircuitOpenError instead of waiting on an API that is down.
+After reset_timeout one call is let through as a probe, and its outcome closes or reopens
+the breaker.
+
+If hedge_after is set, a second identical request is sent when the first has not answered
+within hedge_after seconds, and whichever answers first is used. Hedged requests may be
+billed twice, so hedging is off by default.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, TypeVar
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+
+from .api import CircuitOpenError, ServerError
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether error means the API is unavailable, rather than that the request was refused"""
+    return isinstance(error, (
+        ServerError,
+        requests.ConnectionError,
+        requests.Timeout,
+        aiohttp.ClientConnectionError,
+        asyncio.TimeoutError
+    ))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Seconds to wait before retry number attempt (starting at 0), with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Fails calls fast while the API is down. Safe to share between threads.
+
+    Args:
+        failure_threshold: consecutive failures that open the breaker
+        reset_timeout: seconds the breaker stays open before letting a probe call through
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not be made"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                LOGGER.debug("circuit breaker letting a probe call through")
+                return
+            remaining = max(0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(f"The SadCaptcha API is unavailable. Not calling it for another {remaining:.0f} seconds.")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                LOGGER.info("circuit breaker closed, the API is answering again")
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    LOGGER.warning("circuit breaker opened after %s failures", self._failures)
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def record_abandoned(self) -> None:
+        """The call was cancelled or interrupted before the API answered, so it says nothing
+        about the API. If it was the probe, the next call is let through as a probe instead."""
+        with self._lock:
+            self._probing = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker_for(url: str, failure_threshold: int = 5, reset_timeout: float = 30) -> CircuitBreaker:
+    """The breaker shared by every call in this process to the host of url.
+    The thresholds only apply when the breaker is first made."""
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(failure_threshold, reset_timeout)
+        return _breakers[key]
+
+
+class Resilience:
+    """Retry, circuit breaker and hedging policy for the API clients.
+
+    Args:
+        retries: times a call is retried after a server or connection error
+        backoff_base: seconds of the first backoff, doubled on every retry before jitter
+        backoff_cap: most seconds waited between retries
+        failure_threshold: consecutive failures that open the shared circuit breaker
+        reset_timeout: seconds the circuit breaker stays open before probing the API again
+        hedge_after: seconds to wait for an answer before sending a second identical request.
+            None disables hedging.
+    """
+
+    def __init__(
+            self,
+            retries: int = 3,
+            backoff_base: float = 0.5,
+            backoff_cap: float = 8,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30,
+            hedge_after: float | None = None
+        ) -> None:
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_after = hedge_after
+        self._hedge_executor: ThreadPoolExecutor | None = None
+        self._hedge_executor_lock = threading.Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        return circuit_breaker_for(url, self.failure_threshold, self.reset_timeout)
+
+    def call(self, url: str, request: Callable[[], T]) -> T:
+        """Make request to url, retrying, failing fast and hedging according to this policy"""
+        breaker = self.breaker(url)
+        for attempt in range(self.retries + 1):
+            breaker.before_call()
+            try:
+                result = self._hedged(request)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # cancelled, e.g. a pipelined call that was discarded
+                    breaker.record_abandoned()
+                    raise
+                if not is_retryable(e):
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                LOGGER.debug("API call failed with %r, retrying in %.2f seconds", e, delay)
+                time.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+        raise AssertionError("unreachable")
+
+    async def call_async(self, url: str, request: Callable[[], Awaitable[T]]) -> T:
+        """Make request to url, retrying, failing fast and hedging according to this policy"""
+        breaker = self.breaker(url)
+        for attempt in range(self.retries + 1):
+            breaker.before_call()
+            try:
+                result = await self._hedged_async(request)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # cancelled, e.g. a pipelined call that was discarded
+                    breaker.record_abandoned()
+                    raise
+                if not is_retryable(e):
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                LOGGER.debug("API call failed with %r, retrying in %.2f seconds", e, delay)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        """Stop the threads used for hedged requests"""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+
+    def _hedged(self, request: Callable[[], T]) -> T:
+        """Run request, and a second copy of it if the first is slow. The first success wins."""
+        if self.hedge_after is None:
+            return request()
+        executor = self._get_hedge_executor()
+        pending: set[Future[T]] = {executor.submit(request)}
+        done, pending = wait(pending, timeout=self.hedge_after)
+        if not done:
+            LOGGER.debug("no answer after %s seconds, sending a hedged request", self.hedge_after)
+            pending.add(executor.submit(request))
+        error: BaseException | None = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+            if not pending:
+                assert error is not None
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    async def _hedged_async(self, request: Callable[[], Awaitable[T]]) -> T:
+        """Run request, and a second copy of it if the first is slow. The first success wins."""
+        if self.hedge_after is None:
+            return await request()
+        pending: set[asyncio.Future[T]] = {asyncio.ensure_future(request())}
+        done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+        if not done:
+            LOGGER.debug("no answer after %s seconds, sending a hedged request", self.hedge_after)
+            pending.add(asyncio.ensure_future(request()))
+        error: BaseException | None = None
+        try:
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+                if not pending:
+                    assert error is not None
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(thread_name_prefix="captcha-api-hedge")
+            return self._hedge_executor
@@ -0,0 +1,178 @@
+"""Caches of API results for challenges that were already solved.
+
+Temu serves the same challenge images again, so an API client given a result cache looks
+up every semantic shapes, semantic items, 3x3, swap two and two image request before
+sending it, and answers repeats without calling the API. Puzzle and arced slide requests
+are never cached: the piece position and the slide trajectory change on every attempt.
+
+The key of a request is a hash of its endpoint, its decoded images and its challenge text.
+Only successful responses are stored, as the JSON the API returned. When the captcha is still
+present after a cached answer was applied, the solver deletes it, so the retry asks the API.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import pydantic
+from pydantic_core import to_jsonable_python
+
+from .image_payload import ImagePayload
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Stores API results by request key. Subclass and override get, set and delete."""
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """The stored result, or None if it is missing or expired"""
+        return None
+
+    def set(self, key: str, result: dict[str, Any]) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        """Remove the stored result, if there is one"""
+        pass
+
+
+class LruResultCache(ResultCache):
+    """In-memory cache evicting the least recently used result.
+    Safe to share between clients running in several threads.
+
+    Args:
+        max_entries: number of results kept before the least recently used is evicted
+        ttl: seconds a result stays valid
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def set(self, key: str, result: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteResultCache(ResultCache):
+    """On-disk cache in a SQLite database, shared between runs and processes.
+    Evicts the least recently used results once it holds more than max_entries.
+
+    Args:
+        path: path of the database file, created if missing
+        max_entries: number of results kept before the least recently used are evicted
+        ttl: seconds a result stays valid
+    """
+
+    def __init__(self, path: str | os.PathLike[str], max_entries: int = 100_000, ttl: float = 86400) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)")
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result FROM results WHERE key = ? AND stored_at >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, result: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, result, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now)
+            )
+            self._connection.execute("DELETE FROM results WHERE stored_at < ?", (now - self.ttl,))
+            self._connection.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def result_cache_key(url: str, data: pydantic.BaseModel | dict[str, Any]) -> str:
+    """Hash of the endpoint, the decoded images and the other fields of a request.
+    The license key in the url is not part of the key, so clients with different keys share results."""
+    if isinstance(data, pydantic.BaseModel):
+        # read the fields directly, so ImagePayload images are not copied into a str
+        data = {name: getattr(data, name) for name in type(data).model_fields}
+    digest = hashlib.sha256(url.split("?")[0].encode())
+    for name in sorted(data):
+        value = data[name]
+        digest.update(b"\0" + name.encode() + b"\0")
+        if "image" in name and isinstance(value, (str, ImagePayload)):
+            digest.update(_decode_image(value))
+        elif "image" in name and isinstance(value, list):
+            for image in value:
+                digest.update(hashlib.sha256(_decode_image(image)).digest())
+        else:
+            digest.update(json.dumps(to_jsonable_python(value), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _decode_image(image_b64: str | ImagePayload) -> bytes:
+    """Bytes of a base64 image, or of the string itself if it is not valid base64"""
+    if isinstance(image_b64, ImagePayload):
+        return image_b64.decode()
+    try:
+        return base64.b64decode(image_b64)
+    except binascii.Error:
+        return image_b64.encode()
@@ -1,15 +1,20 @@
 """This class handles the captcha solving for selenium users"""
 
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 import logging
 import math
 import random
 import time
-from typing import Any, Generator
+from typing import TYPE_CHECKING, Any, Callable, Generator, TypeVar
 import warnings
-from playwright.sync_api import FloatRect
 
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import (
+    NoSuchFrameException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver import ActionChains, Chrome
 from selenium.webdriver.common.actions.action_builder import ActionBuilder
 from selenium.webdriver.common.actions.interaction import POINTER_MOUSE
@@ -20,15 +25,13 @@ from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.support.ui import WebDriverWait
 
 from temu_captcha_solver.parsers import get_list_of_objects_of_interest
-from temu_captcha_solver.selenium_util import wait_for_element_to_be_stable
 from temu_captcha_solver.solver_commons.two_image import identify_selector_of_image_to_click, two_image_challenge_is_supported
+from temu_captcha_solver.solver_commons.three_by_three import TILE_ELEMENTS_AND_SOURCES_JS, image_payloads_from_sources
 
 from .geometry import(
+    TrajectoryArray,
     get_box_center,
     get_center,
-    piece_is_not_moving,
-    rotate_angle_from_style,
-    xy_to_proportional_point
 ) 
 
 from .selectors import (
@@ -54,12 +57,32 @@ from .selectors import (
     TWO_IMAGE_SECOND_IMAGE,
 ) 
  
-from .models import ArcedSlideCaptchaRequest, ArcedSlideTrajectoryElement, MultiPointResponse, ProportionalPoint, SemanticShapesRequest, SwapTwoRequest, ThreeByThreeCaptchaRequest, TwoImageCaptchaRequest, dump_to_json
-from .api import ApiClient, BadRequest
+from .models import ArcedSlideCaptchaRequest, MultiPointResponse, ProportionalPoint, SemanticShapesRequest, SwapTwoRequest, ThreeByThreeCaptchaRequest, TwoImageCaptchaRequest, dump_to_json
+from .image_payload import ImagePayload
+from .api import ENDPOINTS, ApiClient, BadRequest
 from .syncsolver import SyncSolver
+from .captchatype import CaptchaType
+from .instrumentation import API, EXTRACTION, INTERACTION, VALIDATION, SolveObserver
+from .detection import DETECT_CAPTCHA_TYPE_JS, captcha_type_from_index, detection_args
+from .presence import WATCH_CAPTCHA_PRESENCE_ASYNC_SCRIPT, presence_args
+from .trajectory_sampler import (
+    SIMPLIFY_MAX_GAP_STEPS,
+    START_TRAJECTORY_SAMPLER_JS,
+    STOP_TRAJECTORY_SAMPLER_JS,
+    TRAJECTORY_SAMPLER_IS_STILL_JS,
+    sampler_args,
+    simplify_trajectory,
+    sweep_chunks,
+    trajectory_from_samples
+)
+
+if TYPE_CHECKING:
+    from playwright.sync_api import FloatRect
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class SeleniumSolver(SyncSolver):
 
     client: ApiClient
@@ -72,7 +95,10 @@ class SeleniumSolver(SyncSolver):
             headers: dict[str, Any] | None = None,
             proxy: str | None = None,
             dump_requests: bool = False,
-            mouse_step_size: int = 5
+            mouse_step_size: int = 5,
+            min_dwell: float = 0.5,
+            observer: SolveObserver | None = None,
+            pipelined: bool = False
         ) -> None:
         warnings.warn(
             "SeleniumSolver is deprecated. Please use 'make_undetected_chromedriver_solver()' instead for a more reliable experience.")
@@ -81,58 +107,114 @@ class SeleniumSolver(SyncSolver):
         self.headers = headers
         self.proxy = proxy
         self.mouse_step_size = mouse_step_size
-        super().__init__(dump_requests)
+        self._frame_session_depth = 0
+        self._frame_elements: dict[str, WebElement] = {}
+        self._frame_boxes: "dict[str, FloatRect]" = {}
+        super().__init__(dump_requests, min_dwell, observer, pipelined)
+
+    def close(self) -> None:
+        """Shut down the pipelined API thread and close the API client this solver made"""
+        super().close()
+        self.client.close()
 
     def captcha_is_present(self, timeout: int = 15) -> bool:
-        for _ in range(timeout * 2):
-            if self.any_selector_in_list_present(CAPTCHA_PRESENCE_INDICATORS):
-                LOGGER.debug("Captcha detected")
-                return True
-            time.sleep(0.5)
+        if self._watch_presence(present=True, timeout=timeout):
+            LOGGER.debug("Captcha detected")
+            return True
         LOGGER.debug("Captcha not found")
         return False
 
     def captcha_is_not_present(self, timeout: int = 15) -> bool:
-        captcha_not_present = True
-        for _ in range(timeout * 2):
-            for selector in CAPTCHA_PRESENCE_INDICATORS:
-                if len(self.chromedriver.find_elements(By.CSS_SELECTOR, selector)) != 0:
-                    LOGGER.debug("Captcha not present")
-                    captcha_not_present = False
-            time.sleep(0.5)
-        LOGGER.debug("Captcha not found")
-        return captcha_not_present
+        if self._watch_presence(present=False, timeout=timeout):
+            LOGGER.debug("Captcha not present")
+            return True
+        LOGGER.debug("Captcha still present")
+        return False
+
+    def _watch_presence(self, present: bool, timeout: float) -> bool:
+        """Watch the current frame in-page until the captcha presence equals present, or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if self.chromedriver.execute_async_script(
+                    WATCH_CAPTCHA_PRESENCE_ASYNC_SCRIPT,
+                    presence_args(present, max(remaining, 0))
+                ):
+                    return True
+            except WebDriverException as e:
+                # the page navigated or the frame was removed during the watch
+                LOGGER.debug("could not watch captcha presence: %s", e)
+                time.sleep(0.1)
+            if deadline - time.monotonic() <= 0:
+                return False
+
+    def detect_captcha_type(self, timeout: float = 10) -> CaptchaType:
+        """Probe the page and each iframe once, then watch the page in-page until a captcha appears.
+        Iframes are probed separately because cross-origin frames cannot be searched from the page."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.chromedriver.switch_to.default_content()
+            found = [self._run_detection()]
+            for frame in self.chromedriver.find_elements(By.CSS_SELECTOR, "iframe"):
+                try:
+                    self.chromedriver.switch_to.frame(frame)
+                    found.append(self._run_detection())
+                except WebDriverException as e:
+                    LOGGER.debug("could not run captcha detection in iframe: %s", e)
+                finally:
+                    self.chromedriver.switch_to.default_content()
+            found = [i for i in found if i >= 0]
+            if found:
+                return captcha_type_from_index(min(found))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return CaptchaType.NONE
+            index = self._run_detection(timeout=min(remaining, 1))
+            if index >= 0:
+                return captcha_type_from_index(index)
+
+    def _run_detection(self, timeout: float = 0) -> int:
+        """Run the detection script in the current frame"""
+        return self.chromedriver.execute_async_script(
+            "const done = arguments[arguments.length - 1];"
+            f"({DETECT_CAPTCHA_TYPE_JS})(arguments[0]).then(done);",
+            detection_args(timeout)
+        )
 
     def solve_puzzle(self) -> None:
         """Slide 10 pixels, then grab the puzzle and piece, then make API call and consume the response"""
-        with self._in_iframe_if_present("iframe"):
-            slide_button = self.chromedriver.find_element(By.CSS_SELECTOR, PUZZLE_BUTTON_SELECTOR)
-            slide_button_box = self._get_element_bounding_box(self.chromedriver.find_element(By.CSS_SELECTOR, PUZZLE_BUTTON_SELECTOR))
-            start_x, start_y = get_box_center(slide_button_box)
-            input = PointerInput(POINTER_MOUSE, "default mouse")
-            actions = ActionBuilder(self.chromedriver, duration=5, mouse=input)
-            _ = actions.pointer_action \
-                    .move_to_location(start_x, start_y) \
-                    .pointer_down()
-            start_distance = 10
-            for pixel in range(start_distance):
-                _ = actions.pointer_action.move_to_location(int(start_x + pixel), int(start_y + math.log(1 + pixel))) \
-                        .pause(0.02)
-            actions.perform()
-            LOGGER.debug("dragged 10 pixels")
-            puzzle_image = self.get_b64_img_from_src(PUZZLE_PUZZLE_IMAGE_SELECTOR)
-            piece_image = self.get_b64_img_from_src(PUZZLE_PIECE_IMAGE_SELECTOR)
-            resp = self.client.puzzle(puzzle_image, piece_image)
-            slide_bar_width = self._get_puzzle_slide_bar_width()
-            pixel_distance = int(resp.slide_x_proportion * slide_bar_width)
-            LOGGER.debug(f"will continue to drag {pixel_distance} more pixels")
-            actions = ActionBuilder(self.chromedriver, duration=1, mouse=input)
-            for pixel in range(start_distance, pixel_distance):
-                _ = actions.pointer_action.move_to_location(int(start_x + pixel), int(start_y + math.log(1 + pixel))) \
-                        .pause(0.01)
-            actions.pointer_action.pause(0.5)
-            _ = actions.pointer_action.pointer_up()
-            actions.perform()
+        with self._frame_session():
+            with self._phase(INTERACTION):
+                slide_button_box = self._frame_bounding_box(PUZZLE_BUTTON_SELECTOR)
+                start_x, start_y = get_box_center(slide_button_box)
+                input = PointerInput(POINTER_MOUSE, "default mouse")
+                actions = ActionBuilder(self.chromedriver, duration=5, mouse=input)
+                _ = actions.pointer_action \
+                        .move_to_location(start_x, start_y) \
+                        .pointer_down()
+                start_distance = 10
+                for pixel in range(start_distance):
+                    _ = actions.pointer_action.move_to_location(int(start_x + pixel), int(start_y + math.log(1 + pixel))) \
+                            .pause(0.02)
+                actions.perform()
+                LOGGER.debug("dragged 10 pixels")
+            with self._phase(EXTRACTION):
+                puzzle_image = self.get_image_payload_from_src(PUZZLE_PUZZLE_IMAGE_SELECTOR)
+                piece_image = self.get_image_payload_from_src(PUZZLE_PIECE_IMAGE_SELECTOR)
+            with self._phase(API):
+                resp = self.client.puzzle(puzzle_image, piece_image)
+            with self._phase(INTERACTION):
+                slide_bar_width = self._get_puzzle_slide_bar_width()
+                pixel_distance = int(resp.slide_x_proportion * slide_bar_width)
+                LOGGER.debug("will continue to drag %s more pixels", pixel_distance)
+                actions = ActionBuilder(self.chromedriver, duration=1, mouse=input)
+                for pixel in range(start_distance, pixel_distance):
+                    _ = actions.pointer_action.move_to_location(int(start_x + pixel), int(start_y + math.log(1 + pixel))) \
+                            .pause(0.01)
+                actions.pointer_action.pause(0.5)
+                _ = actions.pointer_action.pointer_up()
+                actions.perform()
             LOGGER.debug("done")
 
     def solve_semantic_shapes(self) -> None:
@@ -140,47 +222,54 @@ class SeleniumSolver(SyncSolver):
         Implements various checks to deal with strange behavior from temu captcha.
         For example, temu shows a loading icon which makes the challenge impossible to click."""
         for _ in range(3):
-            with self._in_iframe_if_present("iframe"):
+            with self._frame_session():
                 try:
-                    for i in range(-3, 0):
-                        LOGGER.debug(f"solving shapes in in {-1 * i}")
-                        time.sleep(1)
-
-                    image_b64 = self.get_b64_img_from_src(SEMANTIC_SHAPES_IMAGE)
-                    challenge = self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT)
+                    with self._phase(EXTRACTION):
+                        if not self.pipelined:
+                            self._wait_for_image_loaded(SEMANTIC_SHAPES_IMAGE)
+                        image_b64 = self.get_image_payload_from_src(SEMANTIC_SHAPES_IMAGE)
+                        challenge = self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT)
                     request = SemanticShapesRequest(image_b64=image_b64, challenge=challenge)
                     
                     if self.dump_requests:
                         dump_to_json(request, "semantic_shapes_request.json")
                     
-                    resp = self.client.semantic_shapes(request)
-                    challenge_current = self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT)
+                    pending = self._start_api_call(self.client.semantic_shapes, request)
+                    with self._phase(EXTRACTION):
+                        if self.pipelined:
+                            # the image finishes loading while the api call is in flight
+                            self._wait_for_image_loaded(SEMANTIC_SHAPES_IMAGE)
+                        challenge_current = self._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT)
                     
                     if challenge != challenge_current:
                         LOGGER.debug("challenge text has changed since making the initial request. refreshing to avoid clicking incorrect location")
-                        self._get_element(SEMANTIC_SHAPES_REFRESH_BUTTON).click()
+                        self._discard_api_call(pending)
+                        with self._phase(INTERACTION):
+                            self._refresh_semantic_shapes()
                         continue
 
-                    self._click_proportional_points(SEMANTIC_SHAPES_IMAGE, resp.proportional_points)
-                    time.sleep(1)
+                    resp = self._api_result(pending)
+
+                    with self._phase(INTERACTION):
+                        self._click_proportional_points(SEMANTIC_SHAPES_IMAGE, resp.proportional_points)
                     LOGGER.debug("clicked answer...")
                     
-                    for i in range(-5, 0):
-                        LOGGER.debug(f"validating answer in {-1 * i}")
-                        time.sleep(1)
-
-                    if self.captcha_is_present(1):
+                    LOGGER.debug("validating answer")
+                    with self._phase(VALIDATION):
+                        solved = self._wait_for_captcha_to_disappear(5)
+                    if not solved:
                         LOGGER.debug("captcha was still present after solving. retrying")
-                        self._get_element(SEMANTIC_SHAPES_REFRESH_BUTTON).click()
+                        with self._phase(INTERACTION):
+                            self._refresh_semantic_shapes()
                         continue
                     
                     LOGGER.debug("solved semantic shapes")
                     return
 
                 except BadRequest as e:
-                    LOGGER.debug("API was unable to solve, retrying. error message: " + str(e))
-                    self._get_element(SEMANTIC_SHAPES_REFRESH_BUTTON).click()
-                    time.sleep(3)
+                    LOGGER.debug("API was unable to solve, retrying. error message: %s", e)
+                    with self._phase(INTERACTION):
+                        self._refresh_semantic_shapes()
 
     def solve_arced_slide(self) -> None:
         """Solves the arced slide puzzle. This challenge is similar to the puzzle
@@ -192,75 +281,95 @@ class SeleniumSolver(SyncSolver):
         bar to determine the piece's trajectory. Then it sends the data to the API
         and consumes the response.
         """ 
-        with self._in_iframe_if_present("iframe"):
-            slide_button_element = self.chromedriver.find_element(By.CSS_SELECTOR, ARCED_SLIDE_BUTTON_SELECTOR)
-            slide_button_bbox = self._get_element_bounding_box(slide_button_element)
-            start_x = slide_button_bbox["x"] + (slide_button_bbox["width"] / 2)
-            actions = ActionChains(self.chromedriver, duration=0)
-
-            # Forward pass
-            _ = actions.click_and_hold(self.chromedriver.find_element(By.CSS_SELECTOR, ARCED_SLIDE_BUTTON_SELECTOR))
-            request = self._gather_arced_slide_request_data(actions)
-            solution = self.client.arced_slide(request)
-            LOGGER.debug("Arced slide solution: " + str(solution.pixels_from_slider_origin))
-
-            # Backward pass
-            slide_button_bbox = self._get_element_bounding_box(slide_button_element)
-            end_x = slide_button_bbox["x"] + (slide_button_bbox["width"] / 2)
-            solution_distance_backwards = int(end_x - start_x - solution.pixels_from_slider_origin)
-            LOGGER.debug(f"Moving mouse backwards by {solution_distance_backwards} pixels")
-            actions.move_to_element(slide_button_element).perform() # Return mouse to button
-            for _ in range(solution_distance_backwards):
-                _ = actions \
-                        .move_by_offset(-1, int(random.gauss(0, 5))) \
-                        .pause(0.01)
-            actions.release().perform()
+        with self._frame_session():
+            with self._phase(EXTRACTION):
+                slide_button_element = self._frame_element(ARCED_SLIDE_BUTTON_SELECTOR)
+                slide_button_bbox = self._get_element_bounding_box(slide_button_element)
+                start_x = slide_button_bbox["x"] + (slide_button_bbox["width"] / 2)
+                actions = ActionChains(self.chromedriver, duration=0)
+
+                # Forward pass
+                _ = actions.click_and_hold(slide_button_element)
+                request = self._gather_arced_slide_request_data(actions)
+            with self._phase(API):
+                solution = self.client.arced_slide(request)
+            LOGGER.debug("Arced slide solution: %s", solution.pixels_from_slider_origin)
+
+            with self._phase(INTERACTION):
+                # Backward pass
+                slide_button_bbox = self._get_element_bounding_box(slide_button_element)
+                end_x = slide_button_bbox["x"] + (slide_button_bbox["width"] / 2)
+                solution_distance_backwards = int(end_x - start_x - solution.pixels_from_slider_origin)
+                LOGGER.debug("Moving mouse backwards by %s pixels", solution_distance_backwards)
+                actions.move_to_element(slide_button_element).perform() # Return mouse to button
+                for _ in range(solution_distance_backwards):
+                    _ = actions \
+                            .move_by_offset(-1, int(random.gauss(0, 5))) \
+                            .pause(0.01)
+                actions.release().perform()
 
     def solve_three_by_three(self) -> None:
-        with self._in_iframe_if_present("iframe"):
-            image_elements = self.chromedriver.find_elements(By.CSS_SELECTOR, THREE_BY_THREE_IMAGE)
-            images_b64: list[str] = []
-            for image_element in image_elements:
-                images_b64.append(self.get_b64_img_from_src(image_element))
-            challenge_text = self._get_element_text(THREE_BY_THREE_TEXT)
+        with self._frame_session():
+            with self._phase(EXTRACTION):
+                tiles = self.chromedriver.execute_script(TILE_ELEMENTS_AND_SOURCES_JS, THREE_BY_THREE_IMAGE)
+                image_elements = [element for element, _ in tiles]
+                images_b64 = image_payloads_from_sources([src for _, src in tiles])
+                challenge_text = self._get_element_text(THREE_BY_THREE_TEXT)
             objects = get_list_of_objects_of_interest(challenge_text)
             request = ThreeByThreeCaptchaRequest(objects_of_interest=objects, images=images_b64)
             if self.dump_requests:
                 dump_to_json(request, "three_by_three_request.json")
-            resp = self.client.three_by_three(request)
-            for i in resp.solution_indices:
-                image_element = self.chromedriver.find_element(By.CSS_SELECTOR, f"img[src*=\"{images_b64[i]}\"]") # Where src matches the desired image
-                image_element.click()
-                time.sleep(1.337)
-            self._click_proportional(self.chromedriver.find_element(By.CSS_SELECTOR, THREE_BY_THREE_CONFIRM_BUTTON), 0.5, 0.5)
+            pending = self._start_api_call(self.client.three_by_three, request)
+            if self.pipelined:
+                with self._phase(EXTRACTION):
+                    challenge_current = self._get_element_text(THREE_BY_THREE_TEXT)
+                if challenge_current != challenge_text:
+                    LOGGER.debug("challenge text has changed since making the initial request. skipping the outdated answer")
+                    self._discard_api_call(pending)
+                    return
+            resp = self._api_result(pending)
+            with self._phase(INTERACTION):
+                for i in resp.solution_indices:
+                    image_elements[i].click()
+                    time.sleep(1.337)
+                self._click_proportional_box(self._frame_bounding_box(THREE_BY_THREE_CONFIRM_BUTTON), 0.5, 0.5)
 
     def solve_swap_two(self) -> None:
         """Click and drag, swap two to restore the image"""
-        with self._in_iframe_if_present("iframe"):
-            image_b64 = self.get_b64_img_from_src(SWAP_TWO_IMAGE)
+        with self._frame_session():
+            with self._phase(EXTRACTION):
+                image_b64 = self.get_image_payload_from_src(SWAP_TWO_IMAGE)
             request = SwapTwoRequest(image_b64=image_b64)
             if self.dump_requests:
                 dump_to_json(request, "swap_two_request.json")
-            resp = self.client.swap_two(request)
-            self._drag_proportional(SWAP_TWO_IMAGE, resp)
+            pending = self._start_api_call(self.client.swap_two, request)
+            if self.pipelined:
+                with self._phase(EXTRACTION):
+                    self._wait_for_image_loaded(SWAP_TWO_IMAGE)
+            resp = self._api_result(pending)
+            with self._phase(INTERACTION):
+                self._drag_proportional(SWAP_TWO_IMAGE, resp)
 
     def solve_two_image(self) -> None:
         for _ in range(3):
             try:
-                for i in range(-3, 0):
-                    LOGGER.debug(f"solving two image in in {-1 * i}")
-                    time.sleep(1)
+                with self._phase(EXTRACTION):
+                    for i in range(-3, 0):
+                        LOGGER.debug("solving two image in in %s", -1 * i)
+                        time.sleep(1)
 
-                with self._in_iframe_if_present("iframe"):
-                    challenge = self._get_element_text(TWO_IMAGE_CHALLENGE_TEXT)
+                with self._frame_session():
+                    with self._phase(EXTRACTION):
+                        challenge = self._get_element_text(TWO_IMAGE_CHALLENGE_TEXT)
 
                     if not two_image_challenge_is_supported(challenge):
                         LOGGER.warning("This text variation of Two Image is not supported yet. Refreshing until we see one that is supported. Please be aware that English Only is supported!!!")
-                        self._get_element(TWO_IMAGE_REFRESH_BUTTON).click()
+                        self._with_element(TWO_IMAGE_REFRESH_BUTTON, WebElement.click)
                         continue
 
-                    first_image = self.get_b64_img_from_src(TWO_IMAGE_FIRST_IMAGE)
-                    second_image = self.get_b64_img_from_src(TWO_IMAGE_SECOND_IMAGE)
+                    with self._phase(EXTRACTION):
+                        first_image = self.get_image_payload_from_src(TWO_IMAGE_FIRST_IMAGE)
+                        second_image = self.get_image_payload_from_src(TWO_IMAGE_SECOND_IMAGE)
                     request = TwoImageCaptchaRequest(
                         images_b64=[first_image, second_image],
                         challenge=challenge
@@ -269,57 +378,59 @@ class SeleniumSolver(SyncSolver):
                     if self.dump_requests:
                         dump_to_json(request, "two_image_request.json")
                     
-                    resp = self.client.two_image(request)
-                    challenge_current = self._get_element_text(TWO_IMAGE_CHALLENGE_TEXT)
+                    with self._phase(API):
+                        resp = self.client.two_image(request)
+                    with self._phase(EXTRACTION):
+                        challenge_current = self._get_element_text(TWO_IMAGE_CHALLENGE_TEXT)
                     
                     if challenge != challenge_current:
                         LOGGER.debug("challenge text has changed since making the initial request. refreshing to avoid clicking incorrect location")
-                        self._get_element(TWO_IMAGE_REFRESH_BUTTON).click()
+                        self._with_element(TWO_IMAGE_REFRESH_BUTTON, WebElement.click)
                         continue
 
                     target_image_selector = identify_selector_of_image_to_click(challenge)
-                    self._click_proportional_points(target_image_selector, resp.proportional_points)
-                    time.sleep(1)
+                    with self._phase(INTERACTION):
+                        self._click_proportional_points(target_image_selector, resp.proportional_points)
+                        time.sleep(1)
                     LOGGER.debug("clicked answer...")
                     
-                    for i in range(-5, 0):
-                        LOGGER.debug(f"validating answer in {-1 * i}")
-                        time.sleep(1)
+                    with self._phase(VALIDATION):
+                        still_present = not self.captcha_is_not_present(6)
 
-                    if self.captcha_is_present(1):
+                    if still_present:
                         LOGGER.debug("captcha was still present after solving. This is normally because it's impossible to click in the region over the solution, and the click was not registered")
-                        self._get_element(TWO_IMAGE_REFRESH_BUTTON).click()
+                        self.client.forget_result(ENDPOINTS["two_image"], request)
+                        self._with_element(TWO_IMAGE_REFRESH_BUTTON, WebElement.click)
                         continue
                     
                     LOGGER.debug("solved two image")
                     return
 
             except BadRequest as e:
-                LOGGER.debug("API was unable to solve, retrying. error message: " + str(e))
+                LOGGER.debug("API was unable to solve, retrying. error message: %s", e)
                 self._get_element(SEMANTIC_SHAPES_REFRESH_BUTTON).click()
                 time.sleep(3)
 
+    def get_image_payload_from_src(self, element: str | WebElement, iframe_selector: str | None = None) -> ImagePayload:
+        """Get the source of b64 image element as an ImagePayload, without copying the base64 portion"""
+        with self._frame_session(iframe_selector) if iframe_selector else nullcontext():
+            url = self._get_src(element)
+        if not url:
+            raise ValueError("Could not get image source for element")
+        return ImagePayload.from_data_url(url)
+
     def get_b64_img_from_src(self, element: str | WebElement, iframe_selector: str | None = None) -> str:
         """Get the source of b64 image element and return the portion after the data:image/png;base64,"""
-        if iframe_selector:
-            with self._in_iframe_if_present(iframe_selector):
-                if isinstance(element, str):
-                    e = self.chromedriver.find_element(By.CSS_SELECTOR, element)
-                else:
-                    e = element
-                url = e.get_attribute("src")
-                if not url:
-                    raise ValueError("Could not get image source for element")
-                return url.split(",")[1]
-        else:
-            if isinstance(element, str):
-                e = self.chromedriver.find_element(By.CSS_SELECTOR, element)
-            else:
-                e = element
-            url = e.get_attribute("src")
-            if not url:
-                raise ValueError("Could not get image source for elemenmt")
-            return url.split(",")[1]
+        with self._frame_session(iframe_selector) if iframe_selector else nullcontext():
+            url = self._get_src(element)
+        if not url:
+            raise ValueError("Could not get image source for element")
+        return url.split(",")[1]
+
+    def _get_src(self, element: str | WebElement) -> str | None:
+        if isinstance(element, str):
+            return self._with_element(element, lambda e: e.get_attribute("src"))
+        return element.get_attribute("src")
 
     def switch_to_new_tab_if_present(self) -> None:
         wait = WebDriverWait(self.chromedriver, 1)
@@ -349,22 +460,22 @@ class SeleniumSolver(SyncSolver):
 
     
     def any_selector_in_list_present(self, selectors: list[str], iframe_locator: str | None = None) -> bool:
-        with self._in_iframe_if_present(
+        with self._frame_session(
             iframe_selector=iframe_locator if iframe_locator else "iframe",
             remain_in_frame=True
         ):
             for selector in selectors:
                 for ele in self.chromedriver.find_elements(By.CSS_SELECTOR, selector):
                     if ele.is_displayed():
-                        LOGGER.debug("Detected selector: " + selector + " from list " + ", ".join(selectors))
+                        LOGGER.debug("Detected selector: %s from list %s", selector, selectors)
                         return True
-            LOGGER.debug("No selector in list found: " + ", ".join(selectors))
+            LOGGER.debug("No selector in list found: %s", selectors)
             return False
 
     def _gather_arced_slide_request_data(self, actions: ActionChains) -> ArcedSlideCaptchaRequest:
         """Get the images and trajectory for arced slide request"""
-        puzzle = self.get_b64_img_from_src(ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
-        piece = self.get_b64_img_from_src(ARCED_SLIDE_PIECE_IMAGE_SELECTOR)
+        puzzle = self.get_image_payload_from_src(ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
+        piece = self.get_image_payload_from_src(ARCED_SLIDE_PIECE_IMAGE_SELECTOR)
         trajectory = self._get_slide_piece_trajectory(actions)
         request = ArcedSlideCaptchaRequest(
             puzzle_image_b64=puzzle,
@@ -375,47 +486,39 @@ class SeleniumSolver(SyncSolver):
             dump_to_json(request, "arced_slide_request.json")
         return request
 
-    def _get_slide_piece_trajectory(self, actions: ActionChains) -> list[ArcedSlideTrajectoryElement]:
-        """Determines slider trajectory by dragging the slider element across the entire box,
-        and computing the ArcedSlideTrajectoryElement at each location."""
-        slide_button = self.chromedriver.find_element(By.CSS_SELECTOR, ARCED_SLIDE_BUTTON_SELECTOR)
-        slider_piece = self.chromedriver.find_element(By.CSS_SELECTOR, ARCED_SLIDE_PIECE_CONTAINER_SELECTOR)
-        puzzle = self.chromedriver.find_element(By.CSS_SELECTOR, ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
-        
+    def _get_slide_piece_trajectory(self, actions: ActionChains) -> TrajectoryArray:
+        """Determines slider trajectory by dragging the slider element across the entire box.
+        The piece is sampled in-page during the drag, which is sent as a few action chains and ends
+        early once the piece comes to rest, and the samples are collected in a single call."""
+        slide_button = self._frame_element(ARCED_SLIDE_BUTTON_SELECTOR)
         slide_bar_width = self._get_arced_slide_bar_width()
-        puzzle_img_bounding_box = self._get_element_bounding_box(puzzle)
-
+        self.chromedriver.execute_script(
+            f"({START_TRAJECTORY_SAMPLER_JS})(arguments[0]);",
+            sampler_args(ARCED_SLIDE_PIECE_CONTAINER_SELECTOR, ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
+        )
         _ = actions.click_and_hold(slide_button)
-        trajectory: list[ArcedSlideTrajectoryElement] = []
-        times_piece_did_not_move = 0
-        for pixel in range(0, int(slide_bar_width), self.mouse_step_size):
-            actions \
-                .move_by_offset(self.mouse_step_size, int(random.gauss(0, 5))) \
-                .perform()
-            wait_for_element_to_be_stable(self.chromedriver, slider_piece)
-            trajectory.append(
-                self._get_arced_slide_trajectory_element(
-                    pixel,
-                    puzzle_img_bounding_box,
-                    slider_piece
-                )
-            )
-            if not len(trajectory) > 100 / self.mouse_step_size:
-                continue
-            if piece_is_not_moving(trajectory):
-                times_piece_did_not_move += 1
-            else:
-                times_piece_did_not_move = 0
-            if times_piece_did_not_move >= 10:
+        chunks = sweep_chunks(len(range(0, int(slide_bar_width), self.mouse_step_size)))
+        for i, steps in enumerate(chunks):
+            for _ in range(steps):
+                _ = actions \
+                    .move_by_offset(self.mouse_step_size, int(random.gauss(0, 5))) \
+                    .pause(0.01)
+            actions.perform()
+            if i < len(chunks) - 1 and self.chromedriver.execute_script(f"return ({TRAJECTORY_SAMPLER_IS_STILL_JS})();"):
+                LOGGER.debug("slide piece came to rest before the end of the bar")
                 break
-        actions.perform()
-        return trajectory
+        result = self.chromedriver.execute_async_script(
+            "const done = arguments[arguments.length - 1];"
+            f"({STOP_TRAJECTORY_SAMPLER_JS})().then(done);"
+        )
+        trajectory = trajectory_from_samples(result, self.mouse_step_size)
+        return simplify_trajectory(trajectory, max_gap=SIMPLIFY_MAX_GAP_STEPS * self.mouse_step_size)
 
     def _get_puzzle_slide_bar_width(self) -> float:
         """Gets the width of the puzzle slide bar from the width of the image. 
         The slide bar is always the same as the image. 
         We do not get the width of the bar element itself, because the css selector varies from region to region."""
-        bg_image_bounding_box = self._get_element_bounding_box(self.chromedriver.find_element(By.CSS_SELECTOR, PUZZLE_PUZZLE_IMAGE_SELECTOR))
+        bg_image_bounding_box = self._frame_bounding_box(PUZZLE_PUZZLE_IMAGE_SELECTOR)
         slide_bar_width = bg_image_bounding_box["width"]
         return slide_bar_width
 
@@ -423,78 +526,98 @@ class SeleniumSolver(SyncSolver):
         """Gets the width of the arced slide bar from the width of the image. 
         The slide bar is always the same as the image. 
         We do not get the width of the bar element itself, because the css selector varies from region to region."""
-        bg_image_bounding_box = self._get_element_bounding_box(self.chromedriver.find_element(By.CSS_SELECTOR, ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR))
+        bg_image_bounding_box = self._frame_bounding_box(ARCED_SLIDE_PUZZLE_IMAGE_SELECTOR)
         slide_bar_width = bg_image_bounding_box["width"]
         return slide_bar_width
 
-    def _get_arced_slide_trajectory_element(
-            self,
-            current_slider_pixel: int,
-            large_img_bounding_box: FloatRect,
-            slider_piece_element: WebElement, 
-        ) -> ArcedSlideTrajectoryElement:
-        """Compute current slider trajectory element by extracting information on the 
-        slide button location, the piece rotation, and the piece location"""
-        slider_piece_bounding_box = self._get_element_bounding_box(slider_piece_element)
-        slider_piece_style = slider_piece_element.get_attribute("style")
-        if not slider_piece_style:
-            raise ValueError("Slider piece style was None")
-        rotate_angle = rotate_angle_from_style(slider_piece_style)
-        piece_top = slider_piece_bounding_box["y"]
-        piece_left = slider_piece_bounding_box["x"]
-        width = slider_piece_bounding_box["width"]
-        height = slider_piece_bounding_box["height"]
-        piece_center_x, piece_center_y = get_center(piece_left, piece_top, width, height)
-        container_x = large_img_bounding_box["x"]
-        container_y = large_img_bounding_box["y"]
-        container_width = large_img_bounding_box["width"]
-        container_height = large_img_bounding_box["height"]
-        x_in_container = piece_center_x - container_x
-        y_in_container = piece_center_y - container_y
-        piece_center = xy_to_proportional_point(x_in_container, y_in_container, container_width, container_height)
-        LOGGER.debug(f"top_corner={piece_left}, {piece_top}, center={piece_center_x}, {piece_center_y}, ctr_in_container={x_in_container}, {y_in_container}  prop_center={piece_center.proportion_x}, {piece_center.proportion_y}, container_size={container_width}, {container_height}")
-        return ArcedSlideTrajectoryElement(
-            pixels_from_slider_origin=current_slider_pixel,
-            piece_rotation_angle=rotate_angle,
-            piece_center=piece_center
-        )
-        
     def _get_element_text(self, selector: str) -> str:
         """Get the text of an element"""
-        e = self._get_element(selector)
-        text_content = e.text
+        text_content = self._with_element(selector, lambda e: e.text)
         if not text_content:
             raise ValueError("element " + selector + " had no text content")
         return text_content
 
     def _get_element(self, selector: str, iframe_selector: str | None = None) -> WebElement:
         if iframe_selector:
-            with self._in_iframe_if_present(iframe_selector):
-                return self.chromedriver.find_element(By.CSS_SELECTOR, selector)
+            with self._frame_session(iframe_selector):
+                return self._frame_element(selector)
         else:
-            return self.chromedriver.find_element(By.CSS_SELECTOR, selector)
+            return self._frame_element(selector)
 
     @contextmanager
     def _in_iframe_if_present(self, iframe_selector: str, remain_in_frame: bool = False) -> Generator[Any, Any, Any]:
         """Context manager to  perform action in iframe
 
         if remain_in_frame is true, it will not switch back to default context"""
-        try:
-            if self.iframe_present():
-                frame = self.chromedriver.find_element(By.CSS_SELECTOR, iframe_selector)
-                self.chromedriver.switch_to.frame(frame)
-                LOGGER.debug(f"iframe {iframe_selector} detected")
-                yield
-            else:
-                LOGGER.debug(f"iframe not detected")
+        with self._frame_session(iframe_selector, remain_in_frame):
+            yield
+
+    @contextmanager
+    def _frame_session(self, iframe_selector: str = "iframe", remain_in_frame: bool = False) -> Generator[None, None, None]:
+        """Enter the captcha iframe, if there is one, for the whole block.
+
+        Elements looked up with _frame_element and their bounding boxes are cached until the
+        session ends, and the driver only switches back to the default content at the end.
+        Sessions started inside a session, for example by _in_iframe_if_present, reuse it.
+        If remain_in_frame is true, it will not switch back to default context"""
+        if self._frame_session_depth:
+            self._frame_session_depth += 1
+            try:
                 yield
+            finally:
+                self._frame_session_depth -= 1
+            return
+        frames = self.chromedriver.find_elements(By.CSS_SELECTOR, iframe_selector)
+        if frames:
+            self.chromedriver.switch_to.frame(frames[0])
+            LOGGER.debug("iframe %s detected", iframe_selector)
+        else:
+            LOGGER.debug("iframe not detected")
+        self._frame_session_depth = 1
+        try:
+            yield
         finally:
+            self._frame_session_depth = 0
+            self._forget_frame_elements()
             if not remain_in_frame:
                 LOGGER.debug("Leaving iframe!")
                 self.chromedriver.switch_to.default_content()
             else:
                 LOGGER.debug("Staying in iframe!")
 
+    def _frame_element(self, selector: str) -> WebElement:
+        """Find an element in the current frame, reusing the element found earlier in the frame session"""
+        element = self._frame_elements.get(selector)
+        if element is None:
+            element = self.chromedriver.find_element(By.CSS_SELECTOR, selector)
+            if self._frame_session_depth:
+                self._frame_elements[selector] = element
+        return element
+
+    def _frame_bounding_box(self, selector: str) -> "FloatRect":
+        """Bounding box of an element in the current frame, reusing the box measured earlier in the frame session"""
+        box = self._frame_boxes.get(selector)
+        if box is None:
+            box = self._with_element(selector, self._get_element_bounding_box)
+            if self._frame_session_depth:
+                self._frame_boxes[selector] = box
+        return box
+
+    def _with_element(self, selector: str, action: Callable[[WebElement], T]) -> T:
+        """Run action on the element, finding it again if the page has replaced the cached one"""
+        try:
+            return action(self._frame_element(selector))
+        except StaleElementReferenceException:
+            LOGGER.debug("cached element %s went stale, finding it again", selector)
+            self._frame_elements.pop(selector, None)
+            self._frame_boxes.pop(selector, None)
+            return action(self._frame_element(selector))
+
+    def _forget_frame_elements(self) -> None:
+        """Drop the cached elements and boxes, after the page has replaced the challenge"""
+        self._frame_elements.clear()
+        self._frame_boxes.clear()
+
     def iframe_present(self) -> bool:
         if len(self.chromedriver.find_elements(By.CSS_SELECTOR, "iframe")) > 0:
             return True
@@ -515,10 +638,15 @@ class SeleniumSolver(SyncSolver):
             proportion_x: float from 0 to 1 defining the proportion x location to click 
             proportion_y: float from 0 to 1 defining the proportion y location to click 
         """
-        x_origin = element.location["x"]
-        y_origin = element.location["y"]
-        x_offset = (proportion_x * element.size["width"])
-        y_offset = (proportion_y * element.size["height"]) 
+        self._click_proportional_box(self._get_element_bounding_box(element), proportion_x, proportion_y)
+
+    def _click_proportional_box(self, box: "FloatRect", proportion_x: float, proportion_y: float) -> None:
+        """Click inside a bounding box at a point defined by the proportions of x and y
+        to the width and height of the box"""
+        x_origin = box["x"]
+        y_origin = box["y"]
+        x_offset = (proportion_x * box["width"])
+        y_offset = (proportion_y * box["height"])
         action = ActionBuilder(self.chromedriver)
         action.pointer_action \
             .move_to_location(x_origin + x_offset, y_origin + y_offset) \
@@ -529,20 +657,20 @@ class SeleniumSolver(SyncSolver):
 
     def _click_proportional_points(self, selector: str, points: list[ProportionalPoint]) -> None:
         for point in points:
+            self._dwell()
             red_dot_count = self._count_eles_inside_challenge()
             for i in range(5):
-                self._click_proportional(
-                    self.chromedriver.find_element(By.CSS_SELECTOR, selector),
+                self._click_proportional_box(
+                    self._frame_bounding_box(selector),
                     point.proportion_x + (i / 50), # each iteration try click a different place if no red dot appears
                     point.proportion_y + (i / 50),
                 )                
-                if red_dot_count == self._count_eles_inside_challenge():
-                    LOGGER.debug("A new red dot did not appear. trying to click again in a slightly different location")
-                    time.sleep(0.5)
-                    continue
-                else:
+                if self._wait_for_red_dot_count_change(red_dot_count):
                     LOGGER.debug("A new red dot appeared")
                     break
+                else:
+                    LOGGER.debug("A new red dot did not appear. trying to click again in a slightly different location")
+                    continue
 
     def _drag_proportional(
             self,
@@ -559,8 +687,8 @@ class SeleniumSolver(SyncSolver):
         if len(points.proportional_points) != 2:
             raise ValueError(
                     f"Expected proportional points in MultiPointResponse to have len == 2. Got len == {len(points.proportional_points)}")
-        with self._in_iframe_if_present("iframe"):
-            bounding_box = self._get_element_bounding_box(selector)
+        with self._frame_session():
+            bounding_box = self._frame_bounding_box(selector)
             start_x = bounding_box["x"] + (points.proportional_points[0].proportion_x * bounding_box["width"]) 
             start_y = bounding_box["y"] + (points.proportional_points[0].proportion_x * bounding_box["height"]) 
             end_x = bounding_box["x"] + (points.proportional_points[1].proportion_x * bounding_box["width"]) 
@@ -573,16 +701,78 @@ class SeleniumSolver(SyncSolver):
                     .move_to_location(end_x, end_y) \
                     .pointer_up() \
                     .perform()
-            LOGGER.debug(f"dragged from ({start_x}, {start_y}) to ({end_x}, {end_y})")
+            LOGGER.debug("dragged from (%s, %s) to (%s, %s)", start_x, start_y, end_x, end_y)
 
-    def _get_element_bounding_box(self, e: WebElement) -> FloatRect:
-        loc = e.location
-        size = e.size
-        return {"x": loc["x"], "y": loc["y"], "width": size["width"], "height": size["height"]}
+    def _get_element_bounding_box(self, e: WebElement) -> "FloatRect":
+        rect = e.rect # one round trip, where location and size are one each
+        return {"x": rect["x"], "y": rect["y"], "width": rect["width"], "height": rect["height"]}
+
+    def _wait_for_image_loaded(self, selector: str, timeout: float = 10) -> None:
+        """Wait until an image in the current frame has finished loading, instead of sleeping a fixed time.
+        Gives up quietly after timeout seconds, like the sleep it replaces."""
+        try:
+            WebDriverWait(self.chromedriver, timeout, poll_frequency=0.1).until(
+                lambda driver: self._with_element(selector, lambda image: driver.execute_script(
+                    "return arguments[0].complete && arguments[0].naturalWidth > 0",
+                    image
+                ))
+            )
+        except TimeoutException:
+            LOGGER.debug("image %s did not load in %s seconds", selector, timeout)
+
+    def _wait_for_red_dot_count_change(self, count: int, timeout: float = 1) -> bool:
+        """Wait for the number of red dots to differ from count, which means a click was registered"""
+        try:
+            WebDriverWait(self.chromedriver, timeout, poll_frequency=0.1).until(
+                lambda _: self._count_eles_inside_challenge() != count
+            )
+            return True
+        except TimeoutException:
+            return False
+
+    def _wait_for_captcha_to_disappear(self, timeout: float = 5) -> bool:
+        """Wait until no captcha presence indicator is displayed in the current frame.
+        Unlike captcha_is_not_present, this returns as soon as the captcha is gone."""
+        def captcha_gone(_: Chrome) -> bool:
+            try:
+                return not self.any_selector_in_list_present(CAPTCHA_PRESENCE_INDICATORS)
+            except (NoSuchFrameException, NoSuchWindowException):
+                # the frame holding the captcha was removed along with it
+                return True
+        try:
+            WebDriverWait(
+                self.chromedriver,
+                timeout,
+                poll_frequency=0.2,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(captcha_gone)
+            return True
+        except TimeoutException:
+            return False
+
+    def _refresh_semantic_shapes(self, timeout: float = 3) -> None:
+        """Click the refresh button and wait for the challenge image in the current frame to be replaced"""
+        images = self.chromedriver.find_elements(By.CSS_SELECTOR, SEMANTIC_SHAPES_IMAGE)
+        src = images[0].get_attribute("src") if images else None
+        self._with_element(SEMANTIC_SHAPES_REFRESH_BUTTON, WebElement.click)
+        self._forget_frame_elements()
+        if src is None:
+            return
+        try:
+            WebDriverWait(
+                self.chromedriver,
+                timeout,
+                poll_frequency=0.1,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(
+                lambda driver: driver.find_element(By.CSS_SELECTOR, SEMANTIC_SHAPES_IMAGE).get_attribute("src") != src
+            )
+        except TimeoutException:
+            LOGGER.debug("challenge image was not replaced within %s seconds of refreshing", timeout)
 
     def _count_eles_inside_challenge(self) -> int:
         """Cound the red dots that appear when solving a shapes captcha"""
         dots = self.chromedriver.find_elements(By.CSS_SELECTOR, SEMANTIC_SHAPES_ELEMENTS_INSIDE_CHALLENGE)
         count = len(dots)
-        LOGGER.debug(f"{count} red dots are present")
+        LOGGER.debug("%s red dots are present", count)
         return count
@@ -0,0 +1,37 @@
+"""Extraction of the 3x3 tiles in a single in-page evaluation.
+
+Reading the tiles one get_attribute call at a time costs a round trip per tile, and clicking
+an answer with an img[src*="<base64>"] selector makes the browser search every image's src
+for a ~20KB string. The tile sources are read in one call instead, and answers are clicked
+by tile index (Playwright) or by the element returned with the tile (Selenium).
+"""
+
+import logging
+
+from ..image_payload import ImagePayload
+
+LOGGER = logging.getLogger(__name__)
+
+# For Playwright's locator.evaluate_all: the src of every matched tile, in document order
+TILE_SOURCES_JS = """
+(images) => images.map((image) => image.getAttribute("src"))
+"""
+
+# For Selenium's execute_script with the tile selector as argument: [element, src] for every tile
+TILE_ELEMENTS_AND_SOURCES_JS = """
+return Array.from(document.querySelectorAll(arguments[0]), (image) => [image, image.getAttribute("src")]);
+"""
+
+
+def image_payloads_from_sources(sources: list[str | None]) -> list[ImagePayload]:
+    """Read the data url src of every tile into an ImagePayload. See image_payload.py."""
+    payloads = []
+    for index, src in enumerate(sources):
+        if not src:
+            raise ValueError(f"3x3 tile {index} had no data url")
+        try:
+            payloads.append(ImagePayload.from_data_url(src))
+        except ValueError as e:
+            raise ValueError(f"3x3 tile {index} had no data url") from e
+    LOGGER.debug("got %s image payloads from 3x3 tiles", len(payloads))
+    return payloads
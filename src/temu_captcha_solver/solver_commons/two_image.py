@@ -8,13 +8,13 @@ LOGGER = logging.getLogger(__name__)
 
 def two_image_challenge_is_supported(challenge_text: str) -> bool:
     if "left to right" in challenge_text.lower():
-        LOGGER.debug(f"challenge \"{challenge_text}\" is supported")
+        LOGGER.debug('challenge "%s" is supported', challenge_text)
         return True
     elif "right to left" in challenge_text.lower():
-        LOGGER.debug(f"challenge \"{challenge_text}\" is supported")
+        LOGGER.debug('challenge "%s" is supported', challenge_text)
         return True
     else:
-        LOGGER.debug(f"challenge \"{challenge_text}\" is not supported")
+        LOGGER.debug('challenge "%s" is not supported', challenge_text)
         return False
 
 def identify_selector_of_image_to_click(challenge_text: str) -> str:
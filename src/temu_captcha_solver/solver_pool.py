@@ -0,0 +1,225 @@
+"""Pool of async Playwright contexts that solve captchas concurrently.
+
+Each worker owns one persistent context made by make_async_playwright_solver_context.
+Pages are opened on the least loaded worker that has a free page slot, and solves run
+concurrently up to a global limit, sharing one AsyncApiClient connection pool.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+from playwright.async_api import BrowserContext, Page, Playwright
+
+from .async_api import AsyncApiClient
+from .asyncplaywrightsolver import AsyncPlaywrightSolver
+from .extension_cache import get_patched_extension_dir
+from .launcher import make_async_playwright_solver_context
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ContextFactory = Callable[..., Awaitable[BrowserContext]]
+SolverFactory = Callable[..., Any]
+
+
+@dataclass
+class WorkerStats:
+    """Throughput of one worker in the pool. solves counts every attempt, failures the ones that raised"""
+    worker_id: int
+    solves: int = 0
+    failures: int = 0
+    solve_seconds: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def solves_per_minute(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.solves * 60 / elapsed
+
+    @property
+    def mean_solve_seconds(self) -> float:
+        if not self.solves:
+            return 0.0
+        return self.solve_seconds / self.solves
+
+
+@dataclass
+class _Worker:
+    worker_id: int
+    context: BrowserContext
+    stats: WorkerStats
+    open_pages: int = 0
+
+
+class SolverPool:
+
+    def __init__(
+            self,
+            playwright: Playwright,
+            api_key: str,
+            workers: int = 4,
+            pages_per_worker: int = 8,
+            max_concurrent_solves: int | None = None,
+            solver_kwargs: dict[str, Any] | None = None,
+            context_factory: ContextFactory | None = None,
+            solver_factory: SolverFactory | None = None,
+            client: AsyncApiClient | None = None,
+            **playwright_context_kwargs
+        ) -> None:
+        """Manage several SadCaptcha patched contexts and solve captchas on them concurrently.
+
+        Args:
+            playwright: async Playwright instance
+            api_key: SadCaptcha API key
+            workers: number of browser contexts to launch
+            pages_per_worker: maximum number of pages open at once in each context
+            max_concurrent_solves: maximum number of solves in progress across the pool.
+                If None, one solve per open page is allowed.
+            solver_kwargs: keyword arguments for each AsyncPlaywrightSolver
+            context_factory: coroutine function called like make_async_playwright_solver_context, which it defaults to
+            solver_factory: called with (page, api_key, client=client, **solver_kwargs) to make the solver of a page.
+                Defaults to AsyncPlaywrightSolver.
+            client: API client shared by every solver. If None, one is created and closed with the pool.
+            **playwright_context_kwargs: keyword args passed to the context factory for every worker
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if pages_per_worker < 1:
+            raise ValueError("pages_per_worker must be at least 1")
+        self.playwright = playwright
+        self.api_key = api_key
+        self.workers = workers
+        self.pages_per_worker = pages_per_worker
+        self.solver_kwargs = solver_kwargs or {}
+        self.playwright_context_kwargs = playwright_context_kwargs
+        self._context_factory = context_factory or make_async_playwright_solver_context
+        self._solver_factory = solver_factory or AsyncPlaywrightSolver
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncApiClient(api_key)
+        if max_concurrent_solves is None:
+            max_concurrent_solves = workers * pages_per_worker
+        self._solve_slots = asyncio.Semaphore(max_concurrent_solves)
+        self._page_slot_freed = asyncio.Condition()
+        self._workers: list[_Worker] = []
+        self._worker_by_context: dict[int, _Worker] = {}
+        # the solver of each page open in page(), made by its first solve
+        self._solvers: dict[int, Any] = {}
+
+    async def start(self) -> None:
+        """Launch the worker contexts"""
+        if self._workers:
+            return
+        extension_dir = self.playwright_context_kwargs.pop("extension_dir", None)
+        if extension_dir is None and self._context_factory is make_async_playwright_solver_context:
+            # unpack once instead of once per worker
+            extension_dir = await asyncio.to_thread(get_patched_extension_dir, self.api_key)
+        if extension_dir is not None:
+            self.playwright_context_kwargs["extension_dir"] = extension_dir
+        results = await asyncio.gather(*(
+            self._context_factory(self.playwright, self.api_key, **self.playwright_context_kwargs)
+            for _ in range(self.workers)
+        ), return_exceptions=True)
+        contexts = [result for result in results if not isinstance(result, BaseException)]
+        if len(contexts) < len(results):
+            # close the contexts that did launch, so a failed start does not leave browsers running
+            await asyncio.gather(*(context.close() for context in contexts), return_exceptions=True)
+            raise next(result for result in results if isinstance(result, BaseException))
+        for worker_id, context in enumerate(contexts):
+            worker = _Worker(worker_id, context, WorkerStats(worker_id))
+            self._workers.append(worker)
+            self._worker_by_context[id(context)] = worker
+        LOGGER.debug("started solver pool with %s workers", self.workers)
+
+    async def close(self) -> None:
+        """Close every worker context, and the API client if the pool created it"""
+        workers, self._workers = self._workers, []
+        self._worker_by_context.clear()
+        await asyncio.gather(*(worker.context.close() for worker in workers), return_exceptions=True)
+        if self._owns_client:
+            await self.client.close()
+        LOGGER.debug("closed solver pool")
+
+    async def __aenter__(self) -> "SolverPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """Open a page on the least loaded worker, waiting for a free slot if every worker is full.
+        The page is closed on exit."""
+        worker = await self._acquire_worker()
+        try:
+            page = await worker.context.new_page()
+            self._solvers[id(page)] = None
+            try:
+                yield page
+            finally:
+                del self._solvers[id(page)]
+                await page.close()
+        finally:
+            await self._release_worker(worker)
+
+    async def run(self, job: Callable[[Page], Awaitable[T]]) -> T:
+        """Run job on a fresh page from the pool and return its result"""
+        async with self.page() as page:
+            return await job(page)
+
+    async def solve(self, page: Page, captcha_detect_timeout: int = 5, retries: int = 3) -> None:
+        """Solve any captcha on a page opened by this pool, under the global concurrency limit.
+        Solves on the same page reuse one solver."""
+        worker = self._worker_by_context.get(id(page.context))
+        solver = self._solvers.get(id(page))
+        if solver is None:
+            solver = self._solver_factory(page, self.api_key, client=self.client, **self.solver_kwargs)
+            if id(page) in self._solvers:
+                self._solvers[id(page)] = solver
+        async with self._solve_slots:
+            start = time.monotonic()
+            try:
+                await solver.solve_captcha_if_present(captcha_detect_timeout=captcha_detect_timeout, retries=retries)
+            except Exception:
+                if worker is not None:
+                    worker.stats.failures += 1
+                raise
+            finally:
+                if worker is not None:
+                    worker.stats.solves += 1
+                    worker.stats.solve_seconds += time.monotonic() - start
+
+    async def visit(self, url: str, captcha_detect_timeout: int = 5, retries: int = 3, **goto_kwargs) -> None:
+        """Open url on a pooled page and solve any captcha that appears"""
+        async def job(page: Page) -> None:
+            await page.goto(url, **goto_kwargs)
+            await self.solve(page, captcha_detect_timeout=captcha_detect_timeout, retries=retries)
+        await self.run(job)
+
+    def stats(self) -> list[WorkerStats]:
+        """Per-worker solve counts and throughput"""
+        return [worker.stats for worker in self._workers]
+
+    async def _acquire_worker(self) -> _Worker:
+        if not self._workers:
+            raise RuntimeError("SolverPool is not started")
+        async with self._page_slot_freed:
+            while True:
+                free = [w for w in self._workers if w.open_pages < self.pages_per_worker]
+                if free:
+                    worker = min(free, key=lambda w: w.open_pages)
+                    worker.open_pages += 1
+                    return worker
+                await self._page_slot_freed.wait()
+
+    async def _release_worker(self, worker: _Worker) -> None:
+        async with self._page_slot_freed:
+            worker.open_pages -= 1
+            self._page_slot_freed.notify()
@@ -0,0 +1,124 @@
+"""Local stand-in for the SadCaptcha API, used by the offline tests, the benchmarks and temu-captcha-replay --stub"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+STUB_RESPONSES: dict[str, dict[str, Any]] = {
+    "/puzzle": {"slideXProportion": 0.5},
+    "/temu-arced-slide": {"pixelsFromSliderOrigin": 120},
+    "/semantic-shapes": {"proportionalPoints": [{"proportionX": 0.25, "proportionY": 0.5}]},
+    "/semantic-items": {"proportionalPoints": [{"proportionX": 0.25, "proportionY": 0.5}]},
+    "/temu-three-by-three": {"solutionIndices": [0, 4, 8]},
+    "/temu-swap-two": {"proportionalPoints": [
+        {"proportionX": 0.1, "proportionY": 0.2},
+        {"proportionX": 0.8, "proportionY": 0.7}
+    ]},
+    "/temu-two-image": {"proportionalPoints": [{"proportionX": 0.3, "proportionY": 0.6}]},
+}
+
+
+class StubApiServer:
+    """Serves canned SadCaptcha responses on localhost.
+
+    Args:
+        latency: seconds to wait before answering each request
+        statuses: status codes to answer with, in order, before answering normally.
+            Useful for simulating an API that is flaky or down.
+        latencies: seconds to wait before answering each request, in order, before waiting latency.
+            Useful for simulating slow outliers.
+    """
+
+    def __init__(self, latency: float = 0, statuses: list[int] | None = None, latencies: list[float] | None = None) -> None:
+        self.latency = latency
+        self.statuses = list(statuses or [])
+        self.latencies = list(latencies or [])
+        self.request_count = 0
+        self.connection_count = 0
+        self.request_bodies: list[bytes] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubApiServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubApiServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def _next_latency(self) -> float:
+        with self._lock:
+            if self.latencies:
+                return self.latencies.pop(0)
+            return self.latency
+
+    def _next_status(self) -> int:
+        with self._lock:
+            self.request_count += 1
+            if self.statuses:
+                return self.statuses.pop(0)
+            return 200
+
+
+def _make_handler(stub: StubApiServer) -> type[BaseHTTPRequestHandler]:
+
+    class Handler(BaseHTTPRequestHandler):
+
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self) -> None:
+            super().setup()
+            with stub._lock:
+                stub.connection_count += 1
+
+        def do_POST(self) -> None:
+            body = self._read_body()
+            with stub._lock:
+                stub.request_bodies.append(body)
+            latency = stub._next_latency()
+            if latency:
+                time.sleep(latency)
+            status = stub._next_status()
+            path = self.path.split("?")[0]
+            if status == 200 and path not in STUB_RESPONSES:
+                status = 404
+            payload = json.dumps(STUB_RESPONSES.get(path, {})).encode() if status == 200 else b"{}"
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().strip(), 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return b"".join(chunks)
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
@@ -1,20 +1,97 @@
 """Abstract base class for temu Captcha Solvers"""
 
 import logging
+import random
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Generator, TypeVar
 
-from playwright.sync_api import Locator
-
+from temu_captcha_solver.api import ENDPOINTS
 from temu_captcha_solver.captchatype import CaptchaType
-from temu_captcha_solver.selectors import ARCED_SLIDE_UNIQUE_IDENTIFIERS, PUZZLE_UNIQUE_IDENTIFIERS, SEMANTIC_SHAPES_UNIQUE_IDENTIFIERS, SWAP_TWO_UNIQUE_IDENTIFIERS, THREE_BY_THREE_UNIQUE_IDENTIFIERS
+from temu_captcha_solver.instrumentation import (
+    API,
+    DETECTION,
+    ERROR,
+    FAILED,
+    NOT_PRESENT,
+    POPUP,
+    PRESENCE,
+    SOLVED,
+    VALIDATION,
+    SolveObserver,
+    SolveRecord,
+    report_solve,
+)
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Locator
 
 LOGGER = logging.getLogger(__name__)
 
+Request = TypeVar("Request")
+Response = TypeVar("Response")
+
 class SyncSolver(ABC):
 
-    def __init__(self, dump_requests: bool = False):
+    def __init__(
+            self,
+            dump_requests: bool = False,
+            min_dwell: float = 0.5,
+            observer: SolveObserver | None = None,
+            pipelined: bool = False
+        ):
         self.dump_requests = dump_requests
+        self.min_dwell = min_dwell
+        self.observer = observer
+        self.pipelined = pipelined
+        self._record: SolveRecord | None = None
+        self._api_executor: ThreadPoolExecutor | None = None
+        self._last_api_call: tuple[Callable[..., Any], Any] | None = None
+
+    def close(self) -> None:
+        """Shut down the thread that runs pipelined API calls. It is started again by the next pipelined solve."""
+        if self._api_executor is not None:
+            self._api_executor.shutdown(cancel_futures=True)
+            self._api_executor = None
+
+    def __enter__(self) -> "SyncSolver":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _dwell(self) -> None:
+        """Pause for a human-like moment between interactions, at least min_dwell seconds"""
+        if self.min_dwell > 0:
+            time.sleep(random.uniform(self.min_dwell, self.min_dwell * 1.5))
+
+    def _start_api_call(self, call: Callable[[Request], Response], request: Request) -> "Future[Response]":
+        """Start an API call. When pipelined, the call runs on a background thread while the
+        solver keeps reading the page, otherwise it has finished when this returns."""
+        self._last_api_call = (call, request)
+        if self.pipelined:
+            if self._api_executor is None:
+                self._api_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="captcha-api")
+            return self._api_executor.submit(call, request)
+        pending: Future[Response] = Future()
+        with self._phase(API):
+            pending.set_result(call(request))
+        return pending
+
+    def _api_result(self, pending: "Future[Response]") -> Response:
+        """Wait for an API call started with _start_api_call"""
+        with self._phase(API):
+            return pending.result()
+
+    def _discard_api_call(self, pending: "Future[Response]") -> None:
+        """Drop an API call whose challenge changed while it was in flight"""
+        self._last_api_call = None
+        if pending.cancel():
+            LOGGER.debug("cancelled api call for outdated challenge")
+        else:
+            LOGGER.debug("discarding api result for outdated challenge")
 
     def solve_captcha_if_present(self, captcha_detect_timeout: int = 5, retries: int = 3) -> None:
         """Solves any captcha that is present, if one is detected
@@ -23,63 +100,94 @@ class SyncSolver(ABC):
             captcha_detect_timeout: return if no captcha is detected in this many seconds
             retries: number of times to retry captcha
         """
-        self.switch_to_new_tab_if_present()
-        for _ in range(retries):
-            if not self.captcha_is_present(captcha_detect_timeout):
+        record = SolveRecord()
+        self._record = record
+        start = time.perf_counter()
+        try:
+            record.outcome = self._solve_captcha_if_present(record, captcha_detect_timeout, retries)
+        except Exception:
+            record.outcome = ERROR
+            raise
+        finally:
+            record.total_seconds = time.perf_counter() - start
+            self._record = None
+            report_solve(self.observer, record)
+
+    def _solve_captcha_if_present(self, record: SolveRecord, captcha_detect_timeout: int, retries: int) -> str:
+        """Run the solve, recording its phases, and return the outcome"""
+        with self._phase(POPUP):
+            self.switch_to_new_tab_if_present()
+        for attempt in range(retries):
+            record.retries = attempt
+            self._last_api_call = None
+            with self._phase(PRESENCE):
+                present = self.captcha_is_present(captcha_detect_timeout)
+            if not present:
                 LOGGER.debug("Captcha is not present")
-                return
-            else:
-                match self.identify_captcha():
-                    case CaptchaType.ARCED_SLIDE:
-                        self.solve_arced_slide()
-                    case CaptchaType.PUZZLE:
-                        self.solve_puzzle()
-                    case CaptchaType.SEMANTIC_SHAPES:
-                        self.solve_semantic_shapes()
-                    case CaptchaType.THREE_BY_THREE:
-                        self.solve_three_by_three()
-                    case CaptchaType.SWAP_TWO:
-                        self.solve_swap_two()
-                    case CaptchaType.TWO_IMAGE:
-                        self.solve_two_image()
-                    case CaptchaType.NONE:
-                        LOGGER.warning("captcha was present (i think), but could not identify")
-            if self.captcha_is_not_present(timeout=5):
-                return
-            else:
-                continue
-
-    def identify_captcha(self) -> CaptchaType:
-        for _ in range(50):
-            iframe_selector = "iframe" if self.iframe_present() else None
-            if self.any_selector_in_list_present(PUZZLE_UNIQUE_IDENTIFIERS,
-                                                 iframe_locator=iframe_selector):
-                LOGGER.debug("detected puzzle")
-                return CaptchaType.PUZZLE
-            elif self.any_selector_in_list_present(ARCED_SLIDE_UNIQUE_IDENTIFIERS,
-                                                   iframe_locator=iframe_selector):
-                LOGGER.debug("detected arced slide")
-                return CaptchaType.ARCED_SLIDE
-            elif self.any_selector_in_list_present(SEMANTIC_SHAPES_UNIQUE_IDENTIFIERS,
-                                                   iframe_locator=iframe_selector):
-                LOGGER.debug("detected semantic shapes")
-                return CaptchaType.SEMANTIC_SHAPES
-            elif self.any_selector_in_list_present(THREE_BY_THREE_UNIQUE_IDENTIFIERS,
-                                                   iframe_locator=iframe_selector):
-                LOGGER.debug("detected three by three")
-                return CaptchaType.THREE_BY_THREE
-            elif self.any_selector_in_list_present(SWAP_TWO_UNIQUE_IDENTIFIERS,
-                                                   iframe_locator=iframe_selector):
-                LOGGER.debug("detected swap two")
-                return CaptchaType.SWAP_TWO
-            else:
-                time.sleep(0.2)
-        return CaptchaType.NONE
+                return SOLVED if attempt else NOT_PRESENT
+            with self._phase(DETECTION):
+                captcha_type = self.identify_captcha()
+            record.captcha_type = captcha_type
+            match captcha_type:
+                case CaptchaType.ARCED_SLIDE:
+                    self.solve_arced_slide()
+                case CaptchaType.PUZZLE:
+                    self.solve_puzzle()
+                case CaptchaType.SEMANTIC_SHAPES:
+                    self.solve_semantic_shapes()
+                case CaptchaType.THREE_BY_THREE:
+                    self.solve_three_by_three()
+                case CaptchaType.SWAP_TWO:
+                    self.solve_swap_two()
+                case CaptchaType.TWO_IMAGE:
+                    self.solve_two_image()
+                case CaptchaType.NONE:
+                    LOGGER.warning("captcha was present (i think), but could not identify")
+            with self._phase(VALIDATION):
+                gone = self.captcha_is_not_present(timeout=5)
+            if gone:
+                return SOLVED
+            self._forget_last_answer()
+        return FAILED
+
+    def _forget_last_answer(self) -> None:
+        """Remove the cached result of the last API call, as its answer did not solve the captcha,
+        so the retry asks the API instead of applying the same answer again"""
+        if self._last_api_call is None:
+            return
+        call, request = self._last_api_call
+        self._last_api_call = None
+        client = getattr(call, "__self__", None)
+        endpoint = ENDPOINTS.get(getattr(call, "__name__", ""))
+        if endpoint is not None and hasattr(client, "forget_result"):
+            client.forget_result(endpoint, request)
+
+    @contextmanager
+    def _phase(self, name: str) -> Generator[None, None, None]:
+        """Time the block as a phase of the current solve. Does nothing outside solve_captcha_if_present."""
+        if self._record is None:
+            yield
+        else:
+            with self._record.phase(name):
+                yield
+
+    def identify_captcha(self, timeout: float = 10) -> CaptchaType:
+        """Identify the captcha on the page, waiting up to timeout seconds for it to appear"""
+        captcha_type = self.detect_captcha_type(timeout)
+        if captcha_type != CaptchaType.NONE:
+            LOGGER.debug("detected %s", captcha_type.name.lower().replace("_", " "))
+        return captcha_type
 
     @abstractmethod
     def switch_to_new_tab_if_present(self) -> None:
         pass
 
+    @abstractmethod
+    def detect_captcha_type(self, timeout: float) -> CaptchaType:
+        """Watch the page, including its iframes, for up to timeout seconds and
+        return the type of the first captcha that appears"""
+        pass
+
     @abstractmethod
     def captcha_is_present(self, timeout: int = 15) -> bool:
         pass
@@ -113,7 +221,7 @@ class SyncSolver(ABC):
         pass
 
     @abstractmethod
-    def get_b64_img_from_src(self, element: str | Locator) -> str:
+    def get_b64_img_from_src(self, element: "str | Locator") -> str:
         pass
 
     @abstractmethod
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from ..api import ApiClient, ApiException, BadRequest
+from ..async_api import AsyncApiClient
+from ..models import MultiPointResponse, SemanticShapesRequest, ThreeByThreeCaptchaResponse
+from ..result_cache import LruResultCache
+from ..stub_api import StubApiServer
+
+
+def test_session_reuses_connection():
+    with StubApiServer() as stub, ApiClient("key", base_url=stub.base_url) as client:
+        for _ in range(5):
+            res = client.semantic_shapes(SemanticShapesRequest(image_b64="aGVsbG8=", challenge="click the circle"))
+            assert isinstance(res, MultiPointResponse)
+        assert stub.request_count == 5
+        assert stub.connection_count == 1
+
+
+def test_no_keep_alive_opens_connection_per_request():
+    with StubApiServer() as stub, ApiClient("key", base_url=stub.base_url, keep_alive=False) as client:
+        for _ in range(3):
+            client.three_by_three({"objects_of_interest": ["cat"], "images": ["aGVsbG8="] * 9})
+        assert stub.connection_count == 3
+
+
+def test_sends_request_body():
+    with StubApiServer() as stub, ApiClient("key", base_url=stub.base_url) as client:
+        res = client.three_by_three({"objects_of_interest": ["cat"], "images": ["aGVsbG8="] * 9})
+        assert isinstance(res, ThreeByThreeCaptchaResponse)
+        assert json.loads(stub.request_bodies[0])["objects_of_interest"] == ["cat"]
+
+
+def test_bad_request_raises():
+    with StubApiServer(statuses=[400]) as stub, ApiClient("key", base_url=stub.base_url) as client:
+        with pytest.raises(BadRequest):
+            client.swap_two({"image_b64": "aGVsbG8="})
+
+
+def test_unauthorized_raises():
+    with StubApiServer(statuses=[401]) as stub, ApiClient("key", base_url=stub.base_url) as client:
+        with pytest.raises(ApiException):
+            client.puzzle("aGVsbG8=", "aGVsbG8=")
+
+
+@pytest.mark.asyncio
+async def test_async_client_solves_concurrently():
+    with StubApiServer(latency=0.2) as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url) as client:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                client.semantic_items({"image_b64": "aGVsbG8=", "challenge": "click the circle"})
+                for _ in range(50)
+            ])
+            elapsed = time.perf_counter() - start
+    assert all(isinstance(res, MultiPointResponse) for res in results)
+    assert stub.request_count == 50
+    assert elapsed < 50 * 0.2 / 4
+
+
+@pytest.mark.asyncio
+async def test_async_client_reuses_connection():
+    with StubApiServer() as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url) as client:
+            for _ in range(5):
+                res = await client.arced_slide({"puzzle_image_b64": "", "piece_image_b64": "", "slide_piece_trajectory": []})
+                assert res.pixels_from_slider_origin == 120
+        assert stub.connection_count == 1
+
+
+@pytest.mark.asyncio
+async def test_async_bad_request_raises():
+    with StubApiServer(statuses=[400]) as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url) as client:
+            with pytest.raises(BadRequest):
+                await client.two_image({"images_b64": ["aGVsbG8="], "challenge": "figure 1"})
+
+
+def test_compact_requests_send_same_document():
+    request = SemanticShapesRequest(image_b64="aGVsbG8=", challenge="click the \"circle\"")
+    with StubApiServer() as stub, ApiClient("key", base_url=stub.base_url, compact_requests=True) as client:
+        client.semantic_shapes(request)
+    assert json.loads(stub.request_bodies[0]) == request.model_dump()
+
+
+@pytest.mark.asyncio
+async def test_async_compact_requests_send_same_document():
+    request = SemanticShapesRequest(image_b64="aGVsbG8=", challenge="click the circle")
+    with StubApiServer() as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url, compact_requests=True) as client:
+            await client.semantic_shapes(request)
+    assert json.loads(stub.request_bodies[0]) == request.model_dump()
+
+
+def test_post_skips_result_cache():
+    request = {"image_b64": "aGVsbG8=", "challenge": "click the circle"}
+    with StubApiServer() as stub, ApiClient("key", base_url=stub.base_url, result_cache=LruResultCache()) as client:
+        first = client.post("semantic-shapes", request)
+        assert client.post("semantic-shapes", request) == first
+        assert stub.request_count == 2
+        with pytest.raises(KeyError):
+            client.post("not-an-endpoint", request)
+
+
+@pytest.mark.asyncio
+async def test_async_post_skips_result_cache():
+    request = {"image_b64": "aGVsbG8=", "challenge": "click the circle"}
+    with StubApiServer() as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url, result_cache=LruResultCache()) as client:
+            first = await client.post("semantic-shapes", request)
+            assert await client.post("semantic-shapes", request) == first
+        assert stub.request_count == 2
@@ -0,0 +1,73 @@
+import time
+
+from ..seleniumsolver import SeleniumSolver
+from ..selectors import SEMANTIC_SHAPES_ELEMENTS_INSIDE_CHALLENGE, SEMANTIC_SHAPES_IMAGE
+
+
+class FakeImage:
+
+    def __init__(self, src: str) -> None:
+        self.src = src
+
+    def get_attribute(self, name: str) -> str:
+        return self.src
+
+
+class FakeDriver:
+    """Answers the queries made by the condition waits, with the page changing after a delay"""
+
+    def __init__(self, change_after: float) -> None:
+        self.change_at = time.monotonic() + change_after
+
+    def changed(self) -> bool:
+        return time.monotonic() >= self.change_at
+
+    def find_elements(self, by: str, selector: str) -> list:
+        if selector == SEMANTIC_SHAPES_ELEMENTS_INSIDE_CHALLENGE:
+            return [object()] * (2 if self.changed() else 1)
+        if selector == SEMANTIC_SHAPES_IMAGE:
+            return [self.find_element(by, selector)]
+        return []
+
+    def find_element(self, by: str, selector: str) -> FakeImage:
+        return FakeImage("new" if self.changed() else "old")
+
+    def execute_script(self, script: str, *args) -> bool:
+        return self.changed()
+
+
+def make_solver(driver: FakeDriver, min_dwell: float = 0.5) -> SeleniumSolver:
+    return SeleniumSolver(driver, "key", min_dwell=min_dwell)  # type: ignore
+
+
+def test_red_dot_wait_returns_when_count_changes():
+    solver = make_solver(FakeDriver(change_after=0.2))
+    start = time.monotonic()
+    assert solver._wait_for_red_dot_count_change(1, timeout=5)
+    assert time.monotonic() - start < 1
+
+
+def test_red_dot_wait_times_out():
+    solver = make_solver(FakeDriver(change_after=60))
+    assert not solver._wait_for_red_dot_count_change(1, timeout=0.3)
+
+
+def test_image_wait_returns_when_loaded():
+    solver = make_solver(FakeDriver(change_after=0.2))
+    start = time.monotonic()
+    solver._wait_for_image_loaded(SEMANTIC_SHAPES_IMAGE, timeout=5)
+    assert time.monotonic() - start < 1
+
+
+def test_dwell_is_at_least_min_dwell():
+    solver = make_solver(FakeDriver(change_after=0), min_dwell=0.1)
+    start = time.monotonic()
+    solver._dwell()
+    assert 0.1 <= time.monotonic() - start < 0.3
+
+
+def test_dwell_can_be_disabled():
+    solver = make_solver(FakeDriver(change_after=0), min_dwell=0)
+    start = time.monotonic()
+    solver._dwell()
+    assert time.monotonic() - start < 0.05
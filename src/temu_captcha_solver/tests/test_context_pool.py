@@ -0,0 +1,157 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from ..context_pool import AsyncContextPool, ContextPool, PooledContext, RecyclePolicy, context_memory_mb
+
+
+class FakeContext:
+
+    def __init__(self, user_data_dir: str) -> None:
+        self.user_data_dir = user_data_dir
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeAsyncContext(FakeContext):
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def launch(playwright, api_key: str, user_data_dir: str, **kwargs) -> FakeContext:
+    assert os.path.isdir(user_data_dir)
+    return FakeContext(user_data_dir)
+
+
+async def launch_async(playwright, api_key: str, user_data_dir: str, **kwargs) -> FakeAsyncContext:
+    await asyncio.sleep(0.01)
+    return FakeAsyncContext(user_data_dir)
+
+
+def test_hands_out_warm_contexts_and_recycles_after_max_solves():
+    with ContextPool(None, "key", size=2, max_solves=2, context_factory=launch) as pool:  # type: ignore
+        assert pool.launches == 2
+        pooled = pool.acquire()
+        first_dir = pooled.user_data_dir
+        pooled.record_solve()
+        pool.release(pooled)
+        assert pool.launches == 2
+        with pool.context() as pooled:
+            pooled.record_solve()
+            pooled.record_solve()
+            recycled = pooled
+        assert recycled.context.closed
+        assert not os.path.exists(recycled.user_data_dir)
+        assert pool.launches == 3
+        assert os.path.isdir(first_dir)
+    assert not os.path.exists(first_dir)
+
+
+def test_launches_extra_context_when_all_are_in_use():
+    with ContextPool(None, "key", size=1, context_factory=launch) as pool:  # type: ignore
+        first = pool.acquire()
+        extra = pool.acquire()
+        pool.release(first)
+        pool.release(extra)
+        assert first.context.closed
+        assert not os.path.exists(first.user_data_dir)
+        assert pool.acquire() is extra
+
+
+def test_policy_recycles_by_age_and_memory():
+    old = PooledContext(None, "/nonexistent", created_at=time.monotonic() - 120)
+    assert RecyclePolicy(max_age=60).recycle_reason(old) is not None
+    assert RecyclePolicy(max_age=None).recycle_reason(old) is None
+    assert context_memory_mb("/nonexistent") is None
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="memory is read from /proc")
+def test_measures_memory_of_browser_processes(tmp_path):
+    browser = subprocess.Popen([
+        sys.executable, "-c", "import time; time.sleep(10)", f"--user-data-dir={tmp_path}"
+    ])
+    try:
+        time.sleep(0.2)
+        assert context_memory_mb(str(tmp_path)) > 1
+    finally:
+        browser.kill()
+        browser.wait()
+
+
+@pytest.mark.asyncio
+async def test_async_pool_replaces_recycled_contexts_in_background():
+    async with AsyncContextPool(None, "key", size=2, max_solves=1, context_factory=launch_async) as pool:  # type: ignore
+        async with pool.context() as pooled:
+            pooled.record_solve()
+        assert pooled.context.closed is False  # closed by the background replacement
+        await asyncio.sleep(0.1)
+        assert pooled.context.closed
+        assert not os.path.exists(pooled.user_data_dir)
+        assert pool.launches == 3
+        contexts = [await pool.acquire(), await pool.acquire()]
+        assert pooled not in contexts
+        for c in contexts:
+            await pool.release(c)
+    assert all(c.context.closed and not os.path.exists(c.user_data_dir) for c in contexts)
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_waits_for_a_free_context():
+    async with AsyncContextPool(None, "key", size=1, context_factory=launch_async) as pool:  # type: ignore
+        pooled = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await pool.release(pooled)
+        assert await waiter is pooled
+        await pool.release(pooled)
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_raises_when_replacement_cannot_launch():
+    launches = 0
+
+    async def flaky_launch(playwright, api_key: str, user_data_dir: str, **kwargs) -> FakeAsyncContext:
+        nonlocal launches
+        launches += 1
+        if launches in (2, 3):
+            raise RuntimeError("browser did not start")
+        return FakeAsyncContext(user_data_dir)
+
+    pool = AsyncContextPool(None, "key", size=1, max_solves=1, context_factory=flaky_launch, launch_retries=1, launch_backoff=0.01)  # type: ignore
+    async with pool:
+        async with pool.context() as pooled:
+            pooled.record_solve()
+        with pytest.raises(RuntimeError, match="browser did not start"):
+            await asyncio.wait_for(pool.acquire(), timeout=5)
+        replacement = await asyncio.wait_for(pool.acquire(), timeout=5)
+        assert replacement is not pooled and launches == 4
+        await pool.release(replacement)
+
+
+class ThreadRecordingPolicy(RecyclePolicy):
+
+    def __init__(self) -> None:
+        super().__init__(max_memory_mb=1024)
+        self.threads: set[int] = set()
+
+    def recycle_reason(self, pooled: PooledContext) -> str | None:
+        self.threads.add(threading.get_ident())
+        return super().recycle_reason(pooled)
+
+
+@pytest.mark.asyncio
+async def test_async_pool_checks_recycling_off_the_event_loop():
+    async with AsyncContextPool(None, "key", size=1, context_factory=launch_async) as pool:  # type: ignore
+        pool.policy = policy = ThreadRecordingPolicy()
+        async with pool.context():
+            pass
+    assert policy.threads and threading.get_ident() not in policy.threads
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import shutil
+import subprocess
+import time
+import warnings
+
+import pytest
+from playwright.sync_api import Error
+from selenium.common.exceptions import WebDriverException
+
+from ..asyncplaywrightsolver import AsyncPlaywrightSolver
+from ..captchatype import CaptchaType
+from ..detection import CAPTCHA_TYPE_IDENTIFIERS, DETECT_CAPTCHA_TYPE_JS, captcha_type_from_index, detection_args
+from ..playwrightsolver import PlaywrightSolver
+from ..seleniumsolver import SeleniumSolver
+from ..selectors import ARCED_SLIDE_UNIQUE_IDENTIFIERS, PUZZLE_UNIQUE_IDENTIFIERS, SWAP_TWO_UNIQUE_IDENTIFIERS
+
+
+def test_detection_args_keeps_priority_order():
+    args = detection_args(1.5)
+    assert args["timeout"] == 1500
+    assert args["identifiers"][0] == PUZZLE_UNIQUE_IDENTIFIERS
+    assert len(args["identifiers"]) == len(CAPTCHA_TYPE_IDENTIFIERS)
+
+
+def test_detection_args_without_timeout_checks_once():
+    assert detection_args()["timeout"] == 0
+
+
+def test_captcha_type_from_index():
+    assert captcha_type_from_index(0) == CaptchaType.PUZZLE
+    index = detection_args()["identifiers"].index(SWAP_TWO_UNIQUE_IDENTIFIERS)
+    assert captcha_type_from_index(index) == CaptchaType.SWAP_TWO
+
+
+def test_captcha_type_from_index_not_found():
+    assert captcha_type_from_index(-1) == CaptchaType.NONE
+
+
+class FakeFrame:
+    """Runs the detector against a frame where a captcha with the given index appears
+    after appears_after seconds. index -1 never shows a captcha, and error is raised instead if given."""
+
+    def __init__(self, index: int = -1, appears_after: float = 0, error: Exception | None = None) -> None:
+        self.index = index
+        self.appears_at = time.monotonic() + appears_after
+        self.error = error
+        self.timeouts: list[int] = []
+
+    def detect(self, script: str, args: dict) -> int:
+        assert DETECT_CAPTCHA_TYPE_JS in script
+        assert args["identifiers"] == detection_args()["identifiers"]
+        self.timeouts.append(args["timeout"])
+        if self.error is not None:
+            raise self.error
+        end = time.monotonic() + args["timeout"] / 1000
+        while self.index < 0 or time.monotonic() < self.appears_at:
+            if time.monotonic() >= end:
+                return -1
+            time.sleep(0.01)
+        return self.index
+
+    def evaluate(self, script: str, args: dict) -> int:
+        return self.detect(script, args)
+
+
+class FakeAsyncFrame(FakeFrame):
+
+    async def evaluate(self, script: str, args: dict) -> int:  # type: ignore[override]
+        return await asyncio.to_thread(self.detect, script, args)
+
+
+class FakePage:
+
+    def __init__(self, *frames: FakeFrame) -> None:
+        self.frames = list(frames)
+        self.main_frame = frames[0]
+
+
+class FakeSwitchTo:
+
+    def __init__(self, driver: "FakeDriver") -> None:
+        self.driver = driver
+
+    def default_content(self) -> None:
+        self.driver.current = self.driver.page
+
+    def frame(self, frame: FakeFrame) -> None:
+        self.driver.current = frame
+
+
+class FakeDriver:
+    """A page whose iframes are the given frames. Scripts run in the frame switched to."""
+
+    def __init__(self, page: FakeFrame, *iframes: FakeFrame) -> None:
+        self.page = self.current = page
+        self.iframes = list(iframes)
+        self.switch_to = FakeSwitchTo(self)
+
+    def find_elements(self, by: str, selector: str) -> list[FakeFrame]:
+        assert self.current is self.page and selector == "iframe"
+        return self.iframes
+
+    def execute_async_script(self, script: str, args: dict) -> int:
+        return self.current.detect(script, args)
+
+
+@pytest.fixture(autouse=True)
+def no_deprecation_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def test_playwright_probes_every_frame_and_picks_the_first_type():
+    page = FakePage(FakeFrame(), FakeFrame(error=Error("frame was detached")), FakeFrame(4), FakeFrame(1))
+    assert PlaywrightSolver(page, "key").detect_captcha_type(timeout=5) == CaptchaType.ARCED_SLIDE  # type: ignore
+    assert all(frame.timeouts == [0] for frame in page.frames)
+
+
+def test_playwright_watches_main_frame_until_captcha_appears():
+    page = FakePage(FakeFrame(2, appears_after=0.3), FakeFrame())
+    start = time.monotonic()
+    assert PlaywrightSolver(page, "key").detect_captcha_type(timeout=5) == CaptchaType.SEMANTIC_SHAPES  # type: ignore
+    assert time.monotonic() - start < 1
+    assert page.main_frame.timeouts[0] == 0 and page.main_frame.timeouts[1] > 0
+
+
+def test_playwright_returns_none_after_timeout():
+    page = FakePage(FakeFrame(), FakeFrame())
+    start = time.monotonic()
+    assert PlaywrightSolver(page, "key").detect_captcha_type(timeout=0.3) == CaptchaType.NONE  # type: ignore
+    assert 0.3 <= time.monotonic() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_async_playwright_probes_frames_then_watches():
+    page = FakePage(FakeAsyncFrame(), FakeAsyncFrame(error=Error("frame was detached")), FakeAsyncFrame(4))
+    assert await AsyncPlaywrightSolver(page, "key").detect_captcha_type(timeout=5) == CaptchaType.SWAP_TWO  # type: ignore
+    page = FakePage(FakeAsyncFrame(0, appears_after=0.3))
+    assert await AsyncPlaywrightSolver(page, "key").detect_captcha_type(timeout=5) == CaptchaType.PUZZLE  # type: ignore
+    assert page.main_frame.timeouts[1] > 0
+
+
+def test_selenium_probes_iframes_and_returns_to_the_page():
+    driver = FakeDriver(FakeFrame(), FakeFrame(error=WebDriverException("frame was detached")), FakeFrame(3))
+    assert SeleniumSolver(driver, "key").detect_captcha_type(timeout=5) == CaptchaType.THREE_BY_THREE  # type: ignore
+    assert driver.current is driver.page
+    driver = FakeDriver(FakeFrame(1, appears_after=0.3))
+    assert SeleniumSolver(driver, "key").detect_captcha_type(timeout=5) == CaptchaType.ARCED_SLIDE  # type: ignore
+    assert driver.page.timeouts[1] > 0
+
+
+# Runs DETECT_CAPTCHA_TYPE_JS against a fake document. Each step of the plan shows an element
+# matching selector after some milliseconds, or before the detector runs if 0, and notifies the MutationObserver.
+DETECTOR_HARNESS = """
+const elements = {};
+const element = (visible) => ({
+    getBoundingClientRect: () => ({width: visible ? 10 : 0, height: 10}),
+    ownerDocument: {defaultView: {getComputedStyle: () => ({visibility: "visible", display: "block"})}},
+});
+let notify = () => {};
+global.MutationObserver = class {
+    constructor(callback) { notify = callback; }
+    observe() {}
+    disconnect() {}
+};
+global.document = {documentElement: {}, querySelectorAll: (selector) => elements[selector] || []};
+const [args, plan] = JSON.parse(process.argv[1]);
+const show = (step) => { elements[step.selector] = [element(step.visible)]; notify([]); };
+for (const step of plan) {
+    if (step.after) setTimeout(() => show(step), step.after);
+    else show(step);
+}
+(%s)(args).then((index) => { console.log(index); process.exit(0); });
+"""
+
+
+def run_detector(timeout: float, plan: list[dict]) -> int:
+    script = DETECTOR_HARNESS % DETECT_CAPTCHA_TYPE_JS
+    output = subprocess.run(
+        ["node", "-e", script, json.dumps([detection_args(timeout), plan])],
+        capture_output=True, text=True, timeout=10, check=True
+    ).stdout
+    return int(output)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="the detector script is run with node")
+def test_detector_script():
+    puzzle, arced, swap = PUZZLE_UNIQUE_IDENTIFIERS[0], ARCED_SLIDE_UNIQUE_IDENTIFIERS[0], SWAP_TWO_UNIQUE_IDENTIFIERS[0]
+    # visible captchas are found at once, in priority order, and hidden ones are ignored
+    assert run_detector(0, [{"after": 0, "selector": swap, "visible": True}, {"after": 0, "selector": arced, "visible": True}]) == 1
+    assert run_detector(0, [{"after": 0, "selector": puzzle, "visible": False}, {"after": 0, "selector": swap, "visible": True}]) == 4
+    # without a timeout the document is checked once
+    assert run_detector(0, [{"after": 50, "selector": arced, "visible": True}]) == -1
+    # with a timeout the captcha is found as soon as it appears
+    start = time.monotonic()
+    assert run_detector(5, [{"after": 100, "selector": arced, "visible": True}]) == 1
+    assert time.monotonic() - start < 3
+    assert run_detector(0.2, [{"after": 0, "selector": puzzle, "visible": False}]) == -1
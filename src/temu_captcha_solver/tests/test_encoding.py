@@ -0,0 +1,34 @@
+import json
+
+from ..encoding import encode_request_body
+from ..models import ArcedSlideCaptchaRequest, ArcedSlideTrajectoryElement, ProportionalPoint, ThreeByThreeCaptchaRequest, TwoImageCaptchaRequest
+
+
+def test_model_encodes_like_model_dump():
+    request = ArcedSlideCaptchaRequest(
+        puzzle_image_b64="aGVsbG8+d29ybGQ/",
+        piece_image_b64="cGllY2U=",
+        slide_piece_trajectory=[
+            ArcedSlideTrajectoryElement(
+                pixels_from_slider_origin=5,
+                piece_rotation_angle=-1.25,
+                piece_center=ProportionalPoint(proportion_x=0.1, proportion_y=0.7)
+            )
+        ]
+    )
+    assert json.loads(encode_request_body(request)) == request.model_dump()
+
+
+def test_dict_encodes_like_json_dumps():
+    request = {"objects_of_interest": ["cat", "car"], "images": ["aGVsbG8="] * 9}
+    assert json.loads(encode_request_body(request)) == request
+
+
+def test_escapes_text_that_needs_it():
+    request = TwoImageCaptchaRequest(challenge="click \"figure 1\"\n\\ café", images_b64=["aGVsbG8="])
+    assert json.loads(encode_request_body(request)) == request.model_dump()
+
+
+def test_is_smaller_than_default_json():
+    request = ThreeByThreeCaptchaRequest(objects_of_interest=["cat"], images=["aGVsbG8="] * 9)
+    assert len(encode_request_body(request)) < len(json.dumps(request.model_dump()).encode())
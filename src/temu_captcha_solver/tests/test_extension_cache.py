@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+
+from .. import extension_cache
+from ..extension_cache import get_patched_extension_dir
+
+
+class FakeDownloads:
+    """Stands in for download_extension_to_tempfile and counts downloads"""
+
+    def __init__(self, version: str = "1.0.0") -> None:
+        self.version = version
+        self.count = 0
+
+    @contextmanager
+    def __call__(self):
+        self.count += 1
+        tf = tempfile.NamedTemporaryFile("wb", suffix=".crx", delete=False)
+        with zipfile.ZipFile(tf, "w") as zip_file:
+            zip_file.writestr("manifest.json", json.dumps({"version": self.version}))
+            zip_file.writestr("script.js", "const key = localStorage.getItem(\"sadCaptchaKey\");")
+        try:
+            yield tf
+        finally:
+            tf.close()
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    fake = FakeDownloads()
+    monkeypatch.setattr(extension_cache, "download_extension_to_tempfile", fake)
+    return fake
+
+
+def read_script(extension_dir: str) -> str:
+    with open(os.path.join(extension_dir, "script.js")) as f:
+        return f.read()
+
+
+def test_downloads_once_and_patches_key(tmp_path, downloads):
+    first = get_patched_extension_dir("key-one", cache_dir=str(tmp_path))
+    second = get_patched_extension_dir("key-one", cache_dir=str(tmp_path))
+    assert first == second
+    assert downloads.count == 1
+    assert read_script(first) == "const key = \"key-one\";"
+    assert "key-one" not in first
+
+
+def test_new_key_does_not_download(tmp_path, downloads):
+    first = get_patched_extension_dir("key-one", cache_dir=str(tmp_path))
+    second = get_patched_extension_dir("key-two", cache_dir=str(tmp_path))
+    assert first != second
+    assert downloads.count == 1
+    assert read_script(second) == "const key = \"key-two\";"
+
+
+def test_expired_ttl_picks_up_new_version(tmp_path, downloads):
+    first = get_patched_extension_dir("key", cache_dir=str(tmp_path))
+    downloads.version = "2.0.0"
+    second = get_patched_extension_dir("key", cache_dir=str(tmp_path), ttl=0)
+    assert downloads.count == 2
+    assert os.path.basename(first).startswith("1.0.0-")
+    assert os.path.basename(second).startswith("2.0.0-")
+
+
+def test_offline_uses_cache(tmp_path, downloads):
+    first = get_patched_extension_dir("key", cache_dir=str(tmp_path))
+    second = get_patched_extension_dir("key", cache_dir=str(tmp_path), ttl=0, offline=True)
+    assert first == second
+    assert downloads.count == 1
+
+
+def test_offline_without_cache_raises(tmp_path, downloads):
+    with pytest.raises(FileNotFoundError):
+        get_patched_extension_dir("key", cache_dir=str(tmp_path), offline=True)
+    assert downloads.count == 0
+
+
+def test_failed_download_falls_back_to_cache(tmp_path, downloads, monkeypatch):
+    first = get_patched_extension_dir("key", cache_dir=str(tmp_path))
+
+    @contextmanager
+    def failing_download():
+        raise ConnectionError("no network")
+        yield
+
+    monkeypatch.setattr(extension_cache, "download_extension_to_tempfile", failing_download)
+    assert get_patched_extension_dir("key", cache_dir=str(tmp_path), ttl=0) == first
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".staging-")]
+
+
+def test_new_version_prunes_all_but_the_previous_one(tmp_path, downloads):
+    first = get_patched_extension_dir("key", cache_dir=str(tmp_path))
+    downloads.version = "2.0.0"
+    second = get_patched_extension_dir("key", cache_dir=str(tmp_path), ttl=0)
+    assert os.path.isdir(first)
+    downloads.version = "3.0.0"
+    third = get_patched_extension_dir("key", cache_dir=str(tmp_path), ttl=0)
+    assert not os.path.exists(first) and not os.path.isdir(tmp_path / "1.0.0")
+    assert os.path.isdir(second) and os.path.isdir(third)
+
+
+def test_concurrent_launches_share_one_directory(tmp_path, downloads):
+    get_patched_extension_dir("warm", cache_dir=str(tmp_path))
+    with ThreadPoolExecutor(8) as pool:
+        dirs = set(pool.map(lambda _: get_patched_extension_dir("key", cache_dir=str(tmp_path)), range(16)))
+    assert len(dirs) == 1
+    assert read_script(dirs.pop()) == "const key = \"key\";"
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".staging-")]
@@ -0,0 +1,72 @@
+import os
+import queue
+import sys
+import time
+
+import pytest
+
+from ..fleet import RESTART_EXIT_CODE, Fleet, FleetResult, WorkerConfig, take_url
+from ..instrumentation import SOLVED, SolveRecord
+
+
+def fake_worker(worker_id: int, config: WorkerConfig, urls, metrics) -> None:
+    """Solves every URL instantly. A URL of "crash" kills the worker like a closed browser does."""
+    while (url := urls.get()) is not None:
+        if url == "crash":
+            metrics.put(FleetResult(worker_id, url, None, 0, "TargetClosedError: Target closed"))
+            sys.exit(RESTART_EXIT_CODE)
+        metrics.put(FleetResult(worker_id, url, SolveRecord(outcome=SOLVED, total_seconds=0.01), 0.01))
+
+
+def slow_worker(worker_id: int, config: WorkerConfig, urls, metrics) -> None:
+    time.sleep(2)
+    fake_worker(worker_id, config, urls, metrics)
+
+
+def dying_worker(worker_id: int, config: WorkerConfig, urls, metrics) -> None:
+    """Dies without sending a result when it takes the URL "die" """
+    while (url := take_url(worker_id, urls, metrics)) is not None:
+        if url == "die":
+            os._exit(1)
+        metrics.put(FleetResult(worker_id, url, SolveRecord(outcome=SOLVED, total_seconds=0.01), 0.01))
+
+
+def test_fleet_visits_every_url_and_restarts_crashed_workers():
+    results: list[FleetResult] = []
+    with Fleet("key", processes=2, worker_target=fake_worker, on_result=results.append) as fleet:
+        for i in range(10):
+            fleet.submit(f"https://example.com/{i}")
+        fleet.submit("crash")
+        for i in range(10, 20):
+            fleet.submit(f"https://example.com/{i}")
+        assert fleet.wait(timeout=60)
+    assert fleet.collector.outcomes[SOLVED] == 20
+    assert fleet.restarts == 1
+    assert sorted(r.url for r in results if r.error is None) == sorted(f"https://example.com/{i}" for i in range(20))
+
+
+def test_submit_blocks_when_queue_is_full():
+    fleet = Fleet("key", processes=1, queue_size=1, worker_target=slow_worker)
+    fleet.start()
+    try:
+        fleet.submit("https://example.com/0")
+        with pytest.raises(queue.Full):
+            fleet.submit("https://example.com/1", timeout=0.2)
+        assert fleet.wait(timeout=60)
+        assert fleet.completed == 1
+    finally:
+        fleet.close()
+
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        Fleet("key", mode="threads")
+
+
+def test_urls_held_by_a_dead_worker_get_an_error_result():
+    results: list[FleetResult] = []
+    with Fleet("key", processes=1, max_restarts=0, worker_target=dying_worker, on_result=results.append) as fleet:
+        fleet.submit("https://example.com/0")
+        fleet.submit("die")
+        assert fleet.wait(timeout=60)
+    assert [(r.url, r.error) for r in results] == [("https://example.com/0", None), ("die", "worker exited with code 1")]
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from ..api import request_json
+from ..encoding import encode_request_body
+from ..image_payload import ImagePayload
+from ..models import SemanticShapesRequest, ThreeByThreeCaptchaRequest
+from ..result_cache import result_cache_key
+from ..solver_commons.three_by_three import image_payloads_from_sources
+
+DATA_URL = "data:image/png;base64,aGVsbG8+d29ybGQ/"
+
+
+def test_payload_is_a_view_after_the_comma():
+    payload = ImagePayload.from_data_url(DATA_URL)
+    assert payload.b64.obj is payload._buffer
+    assert bytes(payload.b64) == b"aGVsbG8+d29ybGQ/"
+    assert str(payload) == "aGVsbG8+d29ybGQ/"
+    assert payload.decode() == b"hello>world?"
+    assert payload == "aGVsbG8+d29ybGQ/"
+    assert payload == ImagePayload.from_b64("aGVsbG8+d29ybGQ/")
+
+
+@pytest.mark.parametrize("url", ["no comma", "data:image/png;base64,\"}", "data:image/png;base64,a\\b", "data:image/png;base64,a\nb", "data:image/png;base64,café"])
+def test_rejects_sources_that_are_not_base64_data_urls(url):
+    with pytest.raises(ValueError):
+        ImagePayload.from_data_url(url)
+
+
+def test_buffers_are_checked_against_the_base64_alphabet():
+    assert ImagePayload(b"data:,aGVsbG8=", 6) == "aGVsbG8="
+    with pytest.raises(ValueError):
+        ImagePayload(b"not base64!")
+
+
+def test_models_keep_payloads_and_dump_them_as_strings():
+    payload = ImagePayload.from_data_url(DATA_URL)
+    request = SemanticShapesRequest(image_b64=payload, challenge="click the circle")
+    assert request.image_b64 is payload
+    assert request.model_dump() == {"image_b64": "aGVsbG8+d29ybGQ/", "challenge": "click the circle"}
+    assert json.loads(encode_request_body(request)) == request.model_dump()
+
+
+def test_payloads_are_cached_like_strings():
+    tiles = image_payloads_from_sources([DATA_URL] * 9)
+    with_payloads = ThreeByThreeCaptchaRequest(objects_of_interest=["cat"], images=tiles)
+    with_strings = ThreeByThreeCaptchaRequest(objects_of_interest=["cat"], images=["aGVsbG8+d29ybGQ/"] * 9)
+    assert result_cache_key("https://api/temu-three-by-three", with_payloads) == \
+        result_cache_key("https://api/temu-three-by-three", with_strings)
+    assert encode_request_body(with_payloads) == encode_request_body(with_strings)
+
+
+def test_dict_requests_with_payloads_are_plain_json():
+    payload = ImagePayload.from_data_url(DATA_URL)
+    assert request_json({"puzzleImageB64": payload, "images": [payload]}) == \
+        {"puzzleImageB64": "aGVsbG8+d29ybGQ/", "images": ["aGVsbG8+d29ybGQ/"]}
+
+
+def test_tile_without_data_url_raises():
+    with pytest.raises(ValueError):
+        image_payloads_from_sources([DATA_URL, "https://example.com/tile.png"])
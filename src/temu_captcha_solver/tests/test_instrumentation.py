@@ -0,0 +1,134 @@
+import pytest
+
+from ..captchatype import CaptchaType
+from ..instrumentation import (
+    API,
+    DETECTION,
+    ERROR,
+    FAILED,
+    NOT_PRESENT,
+    PRESENCE,
+    SOLVED,
+    VALIDATION,
+    HistogramCollector,
+    SolveObserver,
+    SolveRecord,
+)
+from ..syncsolver import SyncSolver
+
+
+class RecordingObserver(SolveObserver):
+
+    def __init__(self) -> None:
+        self.records: list[SolveRecord] = []
+
+    def on_solve(self, record: SolveRecord) -> None:
+        self.records.append(record)
+
+
+class FakeSolver(SyncSolver):
+    """Puzzle captcha that is solved after a number of attempts"""
+
+    def __init__(self, observer: SolveObserver, present: bool = True, attempts_to_solve: int = 1, fail: bool = False) -> None:
+        super().__init__(min_dwell=0, observer=observer)
+        self.present = present
+        self.attempts_to_solve = attempts_to_solve
+        self.fail = fail
+        self.attempts = 0
+
+    def switch_to_new_tab_if_present(self) -> None:
+        pass
+
+    def detect_captcha_type(self, timeout: float) -> CaptchaType:
+        return CaptchaType.PUZZLE
+
+    def captcha_is_present(self, timeout: int = 15) -> bool:
+        return self.present
+
+    def captcha_is_not_present(self, timeout: int = 15) -> bool:
+        return self.attempts >= self.attempts_to_solve
+
+    def solve_puzzle(self) -> None:
+        self.attempts += 1
+        with self._phase(API):
+            if self.fail:
+                raise RuntimeError("api down")
+
+    def solve_arced_slide(self) -> None: pass
+    def solve_semantic_shapes(self) -> None: pass
+    def solve_swap_two(self) -> None: pass
+    def solve_two_image(self) -> None: pass
+    def solve_three_by_three(self) -> None: pass
+    def get_b64_img_from_src(self, element) -> str: return ""
+    def any_selector_in_list_present(self, selectors, iframe_locator=None) -> bool: return False
+    def iframe_present(self) -> bool: return False
+
+
+def test_records_phases_of_solve():
+    observer = RecordingObserver()
+    FakeSolver(observer).solve_captcha_if_present()
+    record, = observer.records
+    assert record.outcome == SOLVED
+    assert record.captcha_type == CaptchaType.PUZZLE
+    assert record.retries == 0
+    assert {PRESENCE, DETECTION, API, VALIDATION} <= set(record.phases)
+    assert record.total_seconds >= sum(record.phases.values())
+
+
+def test_records_retries():
+    observer = RecordingObserver()
+    FakeSolver(observer, attempts_to_solve=2).solve_captcha_if_present(retries=3)
+    assert observer.records[0].outcome == SOLVED
+    assert observer.records[0].retries == 1
+
+
+def test_records_failure_and_not_present():
+    observer = RecordingObserver()
+    FakeSolver(observer, attempts_to_solve=5).solve_captcha_if_present(retries=2)
+    FakeSolver(observer, present=False).solve_captcha_if_present()
+    assert [r.outcome for r in observer.records] == [FAILED, NOT_PRESENT]
+    assert observer.records[1].captcha_type == CaptchaType.NONE
+
+
+def test_records_error_and_reraises():
+    observer = RecordingObserver()
+    with pytest.raises(RuntimeError):
+        FakeSolver(observer, fail=True).solve_captcha_if_present()
+    assert observer.records[0].outcome == ERROR
+    assert API in observer.records[0].phases
+
+
+def test_failing_observer_does_not_fail_solve():
+    class BrokenObserver(SolveObserver):
+        def on_solve(self, record: SolveRecord) -> None:
+            raise ValueError("broken")
+
+    FakeSolver(BrokenObserver()).solve_captcha_if_present()
+
+
+def test_phase_outside_solve_is_not_recorded():
+    observer = RecordingObserver()
+    solver = FakeSolver(observer)
+    solver.solve_puzzle()
+    assert observer.records == []
+
+
+def test_histogram_collector():
+    collector = HistogramCollector()
+    for seconds in [0.004, 0.02, 0.3, 0.3, 2.0]:
+        collector.on_solve(SolveRecord(
+            captcha_type=CaptchaType.PUZZLE,
+            phases={API: seconds},
+            outcome=SOLVED,
+            total_seconds=seconds * 2,
+        ))
+    api = collector.histogram(API)
+    assert api.count == 5
+    assert api.percentile(50) == 0.5
+    assert api.percentile(95) == 2.5
+    assert collector.histogram(API, CaptchaType.PUZZLE).count == 5
+    assert collector.histogram(API, CaptchaType.ARCED_SLIDE).count == 0
+    assert collector.outcomes[SOLVED] == 5
+    summary = collector.summary()
+    assert summary[API]["count"] == 5
+    assert summary[HistogramCollector.TOTAL]["mean"] == pytest.approx(2 * sum([0.004, 0.02, 0.3, 0.3, 2.0]) / 5)
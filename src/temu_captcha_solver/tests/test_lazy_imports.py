@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import temu_captcha_solver
+
+PROBE = """
+import sys, json
+import temu_captcha_solver
+{access}
+print(json.dumps([name for name in ("playwright", "selenium", "undetected_chromedriver") if name in sys.modules]))
+"""
+
+
+def backends_loaded(access: str = "") -> list[str]:
+    output = subprocess.run([sys.executable, "-c", PROBE.format(access=access)], capture_output=True, check=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_package_import_loads_no_backend():
+    assert backends_loaded() == []
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("ApiClient", []),
+    ("AsyncPlaywrightSolver", ["playwright"]),
+    ("SolverPool", ["playwright"]),
+    ("SeleniumSolver", ["selenium"]),
+])
+def test_names_load_only_their_backend(name, expected):
+    assert backends_loaded(f"temu_captcha_solver.{name}") == expected
+
+
+def test_every_public_name_resolves():
+    for name in temu_captcha_solver.__all__:
+        assert getattr(temu_captcha_solver, name).__name__ == name
+    assert set(temu_captcha_solver.__all__) <= set(dir(temu_captcha_solver))
+    with pytest.raises(AttributeError):
+        temu_captcha_solver.NotAName  # type: ignore
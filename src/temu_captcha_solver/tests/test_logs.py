@@ -0,0 +1,49 @@
+import logging
+import subprocess
+import sys
+
+import pytest
+
+from ..logs import TRACE, SampledTrace, parse_log_levels, set_log_levels, set_trace_every
+
+
+@pytest.fixture
+def restore_levels():
+    names = ["temu_captcha_solver", "temu_captcha_solver.api", "temu_captcha_solver.trajectory_sampler"]
+    levels = {name: logging.getLogger(name).level for name in names}
+    yield
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    set_trace_every(1)
+
+
+def test_parses_level_spec():
+    assert parse_log_levels("warning, api=DEBUG,trajectory_sampler=TRACE,") == \
+        {"": "WARNING", "api": "DEBUG", "trajectory_sampler": "TRACE"}
+
+
+def test_sets_levels_per_subsystem(restore_levels):
+    set_log_levels("WARNING,api=DEBUG,temu_captcha_solver.trajectory_sampler=TRACE")
+    assert logging.getLogger("temu_captcha_solver").level == logging.WARNING
+    assert logging.getLogger("temu_captcha_solver.api").level == logging.DEBUG
+    assert logging.getLogger("temu_captcha_solver.trajectory_sampler").level == TRACE
+    assert logging.getLogger("temu_captcha_solver.playwrightsolver").getEffectiveLevel() == logging.WARNING
+
+
+def test_sampled_trace_emits_one_in_every(restore_levels, caplog):
+    logger = logging.getLogger("temu_captcha_solver.trajectory_sampler")
+    trace = SampledTrace(logger)
+    trace("not enabled %s", 0)
+    set_log_levels({"trajectory_sampler": TRACE})
+    set_trace_every(4)
+    with caplog.at_level(TRACE, logger=logger.name):
+        for i in range(10):
+            trace("step %s", i)
+    assert [record.getMessage() for record in caplog.records] == ["step 3", "step 7"]
+    assert caplog.records[0].levelname == "TRACE"
+
+
+def test_importing_a_solver_does_not_configure_logging():
+    probe = "import logging; from temu_captcha_solver import PlaywrightSolver; print(len(logging.getLogger().handlers))"
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, check=True, text=True).stdout
+    assert output.strip() == "0"
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ..asyncsolver import AsyncSolver
+from ..instrumentation import API, SolveRecord
+from ..syncsolver import SyncSolver
+
+# The pipelining helpers do not touch the page, so the abstract methods are left out
+ConcreteSyncSolver = type("ConcreteSyncSolver", (SyncSolver,), dict.fromkeys(SyncSolver.__abstractmethods__))
+ConcreteAsyncSolver = type("ConcreteAsyncSolver", (AsyncSolver,), dict.fromkeys(AsyncSolver.__abstractmethods__))
+
+
+def slow_call(request: str) -> str:
+    time.sleep(0.2)
+    return request.upper()
+
+
+async def slow_async_call(request: str) -> str:
+    await asyncio.sleep(0.2)
+    return request.upper()
+
+
+def test_pipelined_call_runs_while_page_is_read():
+    solver = ConcreteSyncSolver(pipelined=True)
+    solver._record = SolveRecord()
+    start = time.monotonic()
+    pending = solver._start_api_call(slow_call, "a")
+    assert time.monotonic() - start < 0.1
+    time.sleep(0.2)  # reading the page
+    assert solver._api_result(pending) == "A"
+    assert time.monotonic() - start < 0.35
+    assert solver._record.phases[API] < 0.1
+
+
+def test_call_finishes_before_returning_when_not_pipelined():
+    solver = ConcreteSyncSolver()
+    solver._record = SolveRecord()
+    pending = solver._start_api_call(slow_call, "a")
+    assert pending.done()
+    assert solver._api_result(pending) == "A"
+    assert solver._record.phases[API] >= 0.2
+
+
+def test_discarded_call_is_cancelled_if_not_started():
+    solver = ConcreteSyncSolver(pipelined=True)
+    running = solver._start_api_call(slow_call, "a")
+    queued = solver._start_api_call(slow_call, "b")
+    solver._discard_api_call(queued)
+    assert queued.cancelled()
+    assert solver._api_result(running) == "A"
+
+
+def test_close_shuts_down_the_api_thread():
+    with ConcreteSyncSolver(pipelined=True) as solver:
+        assert solver._api_result(solver._start_api_call(slow_call, "a")) == "A"
+        thread_names = {thread.name for thread in threading.enumerate()}
+        assert any(name.startswith("captcha-api") for name in thread_names)
+    assert not any(thread.name.startswith("captcha-api") for thread in threading.enumerate())
+    # a solve after close starts a new thread
+    assert solver._api_result(solver._start_api_call(slow_call, "b")) == "B"
+    solver.close()
+
+
+@pytest.mark.asyncio
+async def test_async_pipelined_call_runs_while_page_is_read():
+    solver = ConcreteAsyncSolver(pipelined=True)
+    start = time.monotonic()
+    pending = await solver._start_api_call(slow_async_call, "a")
+    await asyncio.sleep(0.2)  # reading the page
+    assert await solver._api_result(pending) == "A"
+    assert time.monotonic() - start < 0.35
+
+
+@pytest.mark.asyncio
+async def test_async_discarded_call_is_cancelled():
+    solver = ConcreteAsyncSolver(pipelined=True)
+    pending = await solver._start_api_call(slow_async_call, "a")
+    solver._discard_api_call(pending)
+    await asyncio.sleep(0)
+    assert pending.cancelled()
+
+    not_pipelined = ConcreteAsyncSolver()
+    done = await not_pipelined._start_api_call(slow_async_call, "b")
+    not_pipelined._discard_api_call(done)
+    assert await not_pipelined._api_result(done) == "B"
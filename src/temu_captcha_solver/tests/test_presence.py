@@ -0,0 +1,54 @@
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from ..presence import CAPTCHA_PRESENCE_SELECTOR, MAX_WATCH_SECONDS, WATCH_CAPTCHA_PRESENCE_ASYNC_SCRIPT, presence_args
+from ..selectors import CAPTCHA_PRESENCE_INDICATORS
+from ..seleniumsolver import SeleniumSolver
+
+
+class FakeDriver:
+    """Runs the presence watch against a captcha that is present until gone_after seconds pass.
+    The first watch fails, as it does when the page navigates during the watch."""
+
+    def __init__(self, gone_after: float) -> None:
+        self.gone_at = time.monotonic() + gone_after
+        self.scripts: list[str] = []
+
+    def execute_async_script(self, script: str, args: dict) -> bool:
+        self.scripts.append(script)
+        if len(self.scripts) == 1:
+            raise WebDriverException("javascript error: execution context was destroyed")
+        end = time.monotonic() + args["timeout"] / 1000
+        while True:
+            present = time.monotonic() < self.gone_at
+            if present == args["present"]:
+                return True
+            if time.monotonic() >= end:
+                return False
+            time.sleep(0.01)
+
+
+def test_presence_selector_combines_indicators():
+    assert CAPTCHA_PRESENCE_SELECTOR.split(", ") == CAPTCHA_PRESENCE_INDICATORS
+
+
+def test_presence_args_split_long_watches():
+    assert presence_args(True, 0)["timeout"] == 0
+    assert presence_args(False, 1.5) == {"selector": CAPTCHA_PRESENCE_SELECTOR, "present": False, "timeout": 1500}
+    assert presence_args(True, 60)["timeout"] == MAX_WATCH_SECONDS * 1000
+
+
+def test_not_present_returns_when_captcha_goes():
+    driver = FakeDriver(gone_after=0.3)
+    solver = SeleniumSolver(driver, "key")  # type: ignore
+    start = time.monotonic()
+    assert solver.captcha_is_not_present(5)
+    assert time.monotonic() - start < 1
+    assert driver.scripts == [WATCH_CAPTCHA_PRESENCE_ASYNC_SCRIPT] * 2
+
+
+def test_present_and_not_present_time_out():
+    solver = SeleniumSolver(FakeDriver(gone_after=60), "key")  # type: ignore
+    assert solver.captcha_is_present(1)
+    assert not solver.captcha_is_not_present(0.3)  # type: ignore
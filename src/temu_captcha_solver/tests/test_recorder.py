@@ -0,0 +1,108 @@
+import asyncio
+import gzip
+import threading
+
+import pytest
+
+from ..api import ApiClient, BadRequest
+from ..async_api import AsyncApiClient
+from ..models import SemanticShapesRequest
+from ..recorder import ApiRecorder, read_recordings, recording_paths
+from ..replay import replay
+from ..stub_api import StubApiServer
+
+REQUEST = SemanticShapesRequest(image_b64="aGVsbG8=", challenge="click the circle")
+
+
+def test_records_calls_without_the_license_key(tmp_path):
+    with StubApiServer(statuses=[400]) as stub, ApiRecorder(tmp_path) as recorder, \
+            ApiClient("secret", base_url=stub.base_url, recorder=recorder) as client:
+        with pytest.raises(BadRequest):
+            client.semantic_shapes(REQUEST)
+        client.semantic_shapes(REQUEST)
+    failed, ok = read_recordings([tmp_path])
+    assert failed["outcome"] == "BadRequest" and failed["response"] is None
+    assert ok["outcome"] == "ok" and ok["error"] is None
+    assert ok["endpoint"] == "semantic-shapes"
+    assert ok["request"] == REQUEST.model_dump()
+    assert ok["response"] == {"proportionalPoints": [{"proportionX": 0.25, "proportionY": 0.5}]}
+    assert ok["latency"] > 0
+    assert b"secret" not in gzip.open(recording_paths(tmp_path)[0]).read()
+
+
+class ThreadRecordingRecorder(ApiRecorder):
+
+    def record(self, *args, **kwargs) -> None:
+        self.thread = threading.get_ident()
+        super().record(*args, **kwargs)
+
+
+def test_async_client_records_calls_off_the_event_loop(tmp_path):
+    async def solve() -> int:
+        async with AsyncApiClient("key", base_url=stub.base_url, recorder=recorder) as client:
+            await client.semantic_shapes(REQUEST)
+        return threading.get_ident()
+
+    with StubApiServer() as stub, ThreadRecordingRecorder(tmp_path) as recorder:
+        loop_thread = asyncio.run(solve())
+    [record] = read_recordings([tmp_path])
+    assert record["outcome"] == "ok" and record["endpoint"] == "semantic-shapes"
+    assert recorder.thread != loop_thread
+
+
+def test_rotates_and_deletes_oldest_files(tmp_path):
+    with ApiRecorder(tmp_path, max_bytes=1, max_files=2) as recorder:
+        for i in range(4):
+            recorder.record("https://api/puzzle?licenseKey=key", {"i": i}, {}, 0.1)
+    assert len(recording_paths(tmp_path)) == 2
+    assert [record["request"]["i"] for record in read_recordings([tmp_path])] == [2, 3]
+
+
+def test_reads_recording_that_is_still_being_written(tmp_path):
+    recorder = ApiRecorder(tmp_path)
+    for i in range(3):
+        recorder.record("https://api/puzzle?licenseKey=key", {"i": i}, {}, 0.1)
+    [path] = recording_paths(tmp_path)
+    assert len(list(read_recordings([path]))) == 3
+    recorder.close()
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-12])
+    assert len(list(read_recordings([path]))) >= 2
+
+
+def test_replay_reports_outcome_and_response_changes(tmp_path):
+    with StubApiServer() as stub, ApiRecorder(tmp_path) as recorder, \
+            ApiClient("key", base_url=stub.base_url, recorder=recorder) as client:
+        for _ in range(6):
+            client.semantic_shapes(REQUEST)
+        client.three_by_three({"objects_of_interest": ["cat"], "images": ["aGVsbG8="] * 9})
+    records = list(read_recordings([tmp_path]))
+    records[1]["response"] = {"proportionalPoints": []}
+    records.append(dict(records[1], endpoint="not-an-endpoint"))
+
+    with StubApiServer(statuses=[400]) as stub, ApiClient("key", base_url=stub.base_url) as client:
+        report = replay(records, client)
+        assert stub.request_count == 7
+    assert report.calls == 7 and report.skipped == 1
+    assert report.outcomes == {"ok": 6, "BadRequest": 1}
+    assert report.outcome_changes == 1
+    assert report.response_changes == 1
+    assert report.latency.count == 7
+    assert report.throughput > 0
+
+
+def test_replay_reads_records_as_calls_finish():
+    record = {"endpoint": "semantic-shapes", "request": REQUEST.model_dump(), "response": None, "outcome": "ok"}
+    ahead = []
+
+    with StubApiServer(latency=0.01) as stub, ApiClient("key", base_url=stub.base_url) as client:
+        def records():
+            for i in range(40):
+                ahead.append(i - stub.request_count)
+                yield record
+
+        report = replay(records(), client, concurrency=2)
+    assert report.calls == 40
+    assert max(ahead) <= 2 * 2 + 1
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from ..api import ApiClient, BadRequest, CircuitOpenError, ServerError
+from ..async_api import AsyncApiClient
+from ..resilience import OPEN, CircuitBreaker, Resilience, backoff_delay, circuit_breaker_for
+from ..stub_api import StubApiServer
+
+SHAPES = {"image_b64": "aGVsbG8=", "challenge": "click the circle"}
+
+
+def fast_resilience(**kwargs) -> Resilience:
+    return Resilience(backoff_base=0.01, backoff_cap=0.05, **kwargs)
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(attempt, 0.5, 2) for attempt in range(6) for _ in range(20)]
+    assert all(0 <= delay <= 2 for delay in delays)
+    assert len(set(delays)) > 1
+    assert all(backoff_delay(0, 0.5, 2) <= 0.5 for _ in range(20))
+
+
+def test_retries_server_errors_until_success():
+    with StubApiServer(statuses=[502, 503]) as stub, ApiClient("key", base_url=stub.base_url, resilience=fast_resilience()) as client:
+        assert client.semantic_shapes(SHAPES).proportional_points[0].proportion_x == 0.25
+        assert stub.request_count == 3
+
+
+def test_gives_up_after_retries_and_does_not_retry_bad_requests():
+    with StubApiServer(statuses=[502] * 3 + [400]) as stub, ApiClient("key", base_url=stub.base_url, resilience=fast_resilience(retries=2)) as client:
+        with pytest.raises(ServerError):
+            client.semantic_shapes(SHAPES)
+        assert stub.request_count == 3
+        with pytest.raises(BadRequest):
+            client.semantic_shapes(SHAPES)
+        assert stub.request_count == 4
+
+
+def test_retries_connection_errors():
+    with StubApiServer() as stub:
+        base_url = stub.base_url
+    with ApiClient("key", base_url=base_url, connect_timeout=0.5, resilience=fast_resilience(retries=1)) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.semantic_shapes(SHAPES)
+
+
+def test_open_circuit_fails_fast_for_every_client_in_the_process():
+    policy = fast_resilience(retries=0, failure_threshold=2, reset_timeout=0.3)
+    with StubApiServer(statuses=[502, 502]) as stub:
+        with ApiClient("key", base_url=stub.base_url, resilience=policy) as client:
+            for _ in range(2):
+                with pytest.raises(ServerError):
+                    client.semantic_shapes(SHAPES)
+        with ApiClient("other key", base_url=stub.base_url, resilience=fast_resilience()) as other:
+            with pytest.raises(CircuitOpenError):
+                other.semantic_shapes(SHAPES)
+            assert stub.request_count == 2
+            assert circuit_breaker_for(stub.base_url).state == OPEN
+            time.sleep(0.35)
+            other.semantic_shapes(SHAPES)
+            other.semantic_shapes(SHAPES)
+            assert stub.request_count == 4
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_lets_the_next_call_probe():
+    policy = fast_resilience(failure_threshold=1, reset_timeout=0)
+    url = "https://cancelled-probe.invalid/api"
+    policy.breaker(url).record_failure()
+    probe_started = asyncio.Event()
+
+    async def hang() -> str:
+        probe_started.set()
+        await asyncio.sleep(10)
+        return "late"
+
+    async def answer() -> str:
+        return "answer"
+
+    probe = asyncio.create_task(policy.call_async(url, hang))
+    await probe_started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert await policy.call_async(url, answer) == "answer"
+    assert policy.breaker(url).state == "closed"
+
+
+def test_hedged_request_beats_slow_outlier():
+    policy = fast_resilience(hedge_after=0.1)
+    with StubApiServer(latencies=[2]) as stub, ApiClient("key", base_url=stub.base_url, resilience=policy) as client:
+        start = time.monotonic()
+        client.semantic_shapes(SHAPES)
+        assert time.monotonic() - start < 1
+        assert stub.request_count == 1
+    policy.close()
+
+
+@pytest.mark.asyncio
+async def test_async_client_retries_and_hedges():
+    with StubApiServer(statuses=[500], latencies=[0, 2]) as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url, resilience=fast_resilience(hedge_after=0.1)) as client:
+            start = time.monotonic()
+            res = await client.three_by_three({"objects_of_interest": ["cat"], "images": ["aGVsbG8="] * 9})
+            assert res.solution_indices == [0, 4, 8]
+            assert time.monotonic() - start < 1
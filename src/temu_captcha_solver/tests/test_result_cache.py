@@ -0,0 +1,172 @@
+import threading
+import time
+
+import pytest
+
+from ..api import ApiClient, BadRequest
+from ..async_api import AsyncApiClient
+from ..asyncsolver import AsyncSolver
+from ..captchatype import CaptchaType
+from ..models import MultiPointResponse, SemanticShapesRequest
+from ..result_cache import LruResultCache, SqliteResultCache, result_cache_key
+from ..stub_api import StubApiServer
+from ..syncsolver import SyncSolver
+
+SHAPES = SemanticShapesRequest(image_b64="aGVsbG8=", challenge="click the circle")
+
+
+def test_key_depends_on_images_challenge_and_endpoint():
+    key = result_cache_key("https://api/semantic-shapes?licenseKey=a", SHAPES)
+    assert key == result_cache_key("https://api/semantic-shapes?licenseKey=b", SHAPES.model_dump())
+    assert key != result_cache_key("https://api/semantic-items?licenseKey=a", SHAPES)
+    assert key != result_cache_key("https://api/semantic-shapes", SHAPES.model_copy(update={"challenge": "click the star"}))
+    assert key != result_cache_key("https://api/semantic-shapes", SHAPES.model_copy(update={"image_b64": "d29ybGQ="}))
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LruResultCache(max_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    cache.get("a")
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert len(cache) == 2
+    cache.delete("a")
+    cache.delete("a")
+    assert cache.get("a") is None
+
+
+def test_lru_expires():
+    cache = LruResultCache(ttl=0.05)
+    cache.set("a", {"n": 1})
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_sqlite_persists_evicts_and_expires(tmp_path):
+    path = tmp_path / "results.db"
+    cache = SqliteResultCache(path, max_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    cache.close()
+    cache = SqliteResultCache(path, max_entries=2)
+    assert cache.get("a") == {"n": 1}
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    cache.delete("c")
+    assert cache.get("c") is None
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get("a") is None
+    cache.close()
+
+
+def test_client_answers_repeats_from_cache():
+    with StubApiServer() as stub, ApiClient("key", base_url=stub.base_url, result_cache=LruResultCache()) as client:
+        first = client.semantic_shapes(SHAPES)
+        second = client.semantic_shapes(SHAPES)
+        client.semantic_shapes(SHAPES.model_copy(update={"challenge": "click the star"}))
+        assert isinstance(second, MultiPointResponse)
+        assert first == second
+        assert stub.request_count == 2
+
+
+def test_client_does_not_cache_failures_or_slides():
+    with StubApiServer(statuses=[400]) as stub, ApiClient("key", base_url=stub.base_url, result_cache=LruResultCache()) as client:
+        with pytest.raises(BadRequest):
+            client.swap_two({"image_b64": "aGVsbG8="})
+        client.swap_two({"image_b64": "aGVsbG8="})
+        client.puzzle("aGVsbG8=", "aGVsbG8=")
+        client.puzzle("aGVsbG8=", "aGVsbG8=")
+        assert stub.request_count == 4
+
+
+@pytest.mark.asyncio
+async def test_async_client_answers_repeats_from_cache(tmp_path):
+    cache = SqliteResultCache(tmp_path / "results.db")
+    with StubApiServer() as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url, result_cache=cache) as client:
+            for _ in range(3):
+                res = await client.three_by_three({"objects_of_interest": ["cat"], "images": ["aGVsbG8="] * 9})
+                assert res.solution_indices == [0, 4, 8]
+    assert stub.request_count == 1
+    cache.close()
+
+
+class ThreadRecordingCache(LruResultCache):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads: set[int] = set()
+
+    def get(self, key: str):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key: str, result) -> None:
+        self.threads.add(threading.get_ident())
+        super().set(key, result)
+
+
+@pytest.mark.asyncio
+async def test_async_client_does_not_call_the_cache_on_the_event_loop():
+    cache = ThreadRecordingCache()
+    with StubApiServer() as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url, result_cache=cache) as client:
+            await client.semantic_shapes(SHAPES)
+            await client.semantic_shapes(SHAPES)
+    assert stub.request_count == 1
+    assert cache.threads and threading.get_ident() not in cache.threads
+
+
+# Semantic shapes captchas that stay on the page whatever answer is clicked
+class UnsolvedShapesSolver(type("ConcreteSyncSolver", (SyncSolver,), dict.fromkeys(SyncSolver.__abstractmethods__))):
+
+    def __init__(self, client: ApiClient) -> None:
+        super().__init__(min_dwell=0)
+        self.client = client
+
+    def switch_to_new_tab_if_present(self) -> None: pass
+    def detect_captcha_type(self, timeout: float) -> CaptchaType: return CaptchaType.SEMANTIC_SHAPES
+    def captcha_is_present(self, timeout: int = 15) -> bool: return True
+    def captcha_is_not_present(self, timeout: int = 15) -> bool: return False
+
+    def solve_semantic_shapes(self) -> None:
+        self._api_result(self._start_api_call(self.client.semantic_shapes, SHAPES))
+
+
+class AsyncUnsolvedShapesSolver(type("ConcreteAsyncSolver", (AsyncSolver,), dict.fromkeys(AsyncSolver.__abstractmethods__))):
+
+    def __init__(self, client: AsyncApiClient) -> None:
+        super().__init__(min_dwell=0)
+        self.client = client
+
+    async def switch_to_popup_if_present(self) -> None: pass
+    async def detect_captcha_type(self, timeout: float) -> CaptchaType: return CaptchaType.SEMANTIC_SHAPES
+    async def captcha_is_present(self, timeout: int = 15) -> bool: return True
+    async def captcha_is_not_present(self, timeout: int = 15) -> bool: return False
+
+    async def solve_semantic_shapes(self) -> None:
+        await self._api_result(await self._start_api_call(self.client.semantic_shapes, SHAPES))
+
+
+def test_solver_retry_asks_the_api_when_the_cached_answer_failed():
+    cache = LruResultCache()
+    with StubApiServer() as stub, ApiClient("key", base_url=stub.base_url, result_cache=cache) as client:
+        solver = UnsolvedShapesSolver(client)
+        solver.solve_captcha_if_present(retries=3)
+        assert stub.request_count == 3
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_solver_retry_asks_the_api_when_the_cached_answer_failed(tmp_path):
+    cache = SqliteResultCache(tmp_path / "results.db")
+    with StubApiServer() as stub:
+        async with AsyncApiClient("key", base_url=stub.base_url, result_cache=cache) as client:
+            await AsyncUnsolvedShapesSolver(client).solve_captcha_if_present(retries=3)
+    assert stub.request_count == 3
+    assert len(cache) == 0
+    cache.close()
@@ -0,0 +1,126 @@
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.remote.command import Command
+
+from ..models import ProportionalPoint
+from ..selectors import SEMANTIC_SHAPES_CHALLENGE_TEXT, SEMANTIC_SHAPES_ELEMENTS_INSIDE_CHALLENGE, SEMANTIC_SHAPES_IMAGE
+from ..seleniumsolver import SeleniumSolver
+
+
+class FakeElement:
+
+    def __init__(self, driver: "FakeDriver", selector: str) -> None:
+        self.driver = driver
+        self.selector = selector
+        self.stale = False
+
+    def _call(self, name: str):
+        self.driver.calls.append(name)
+        if self.stale:
+            raise StaleElementReferenceException(self.selector)
+
+    @property
+    def rect(self) -> dict:
+        self._call("rect")
+        return {"x": 10, "y": 20, "width": 300, "height": 200}
+
+    @property
+    def text(self) -> str:
+        self._call("text")
+        return "click the circle"
+
+    def get_attribute(self, name: str) -> str:
+        self._call("get_attribute")
+        return "data:image/png;base64,aGVsbG8="
+
+
+class FakeSwitchTo:
+
+    def __init__(self, driver: "FakeDriver") -> None:
+        self.driver = driver
+
+    def frame(self, frame) -> None:
+        self.driver.calls.append("switch_to.frame")
+        self.driver.in_frame = True
+
+    def default_content(self) -> None:
+        self.driver.calls.append("switch_to.default_content")
+        self.driver.in_frame = False
+
+
+class FakeDriver:
+    """Records every WebDriver round trip. Every mouse action adds a red dot."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.in_frame = False
+        self.red_dots = 0
+        self.switch_to = FakeSwitchTo(self)
+
+    def find_element(self, by: str, selector: str) -> FakeElement:
+        self.calls.append("find_element")
+        return FakeElement(self, selector)
+
+    def find_elements(self, by: str, selector: str) -> list[FakeElement]:
+        self.calls.append("find_elements")
+        if selector == "iframe":
+            return [] if self.in_frame else [FakeElement(self, selector)]
+        if selector == SEMANTIC_SHAPES_ELEMENTS_INSIDE_CHALLENGE:
+            return [FakeElement(self, selector)] * self.red_dots
+        return []
+
+    def execute(self, command: str, params: dict | None = None) -> dict:
+        self.calls.append(command)
+        if command == Command.W3C_ACTIONS:
+            self.red_dots += 1
+        return {"value": None}
+
+
+def make_solver() -> tuple[SeleniumSolver, FakeDriver]:
+    driver = FakeDriver()
+    return SeleniumSolver(driver, "key", min_dwell=0), driver  # type: ignore
+
+
+def test_nested_frame_scopes_stay_in_the_frame():
+    solver, driver = make_solver()
+    with solver._frame_session():
+        with solver._in_iframe_if_present("iframe"):
+            assert driver.in_frame
+        with solver._in_iframe_if_present("iframe"):
+            solver.get_image_payload_from_src(SEMANTIC_SHAPES_IMAGE, iframe_selector="iframe")
+        assert driver.in_frame
+    assert not driver.in_frame
+    assert driver.calls.count("switch_to.frame") == 1
+    assert driver.calls.count("switch_to.default_content") == 1
+
+
+def test_elements_are_found_once_per_session():
+    solver, driver = make_solver()
+    with solver._frame_session():
+        for _ in range(3):
+            solver._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT)
+            solver.get_image_payload_from_src(SEMANTIC_SHAPES_IMAGE)
+    assert driver.calls.count("find_element") == 2
+    with solver._frame_session():
+        solver._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT)
+    assert driver.calls.count("find_element") == 3
+
+
+def test_stale_elements_are_found_again():
+    solver, driver = make_solver()
+    with solver._frame_session():
+        solver._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT)
+        solver._frame_elements[SEMANTIC_SHAPES_CHALLENGE_TEXT].stale = True
+        assert solver._get_element_text(SEMANTIC_SHAPES_CHALLENGE_TEXT) == "click the circle"
+    assert driver.calls.count("find_element") == 2
+
+
+def test_clicking_points_measures_the_image_once():
+    solver, driver = make_solver()
+    points = [ProportionalPoint(proportion_x=0.1 * i, proportion_y=0.5) for i in range(3)]
+    with solver._frame_session():
+        solver._click_proportional_points(SEMANTIC_SHAPES_IMAGE, points)
+    assert driver.red_dots == 3
+    assert driver.calls.count("find_element") == 1
+    assert driver.calls.count("rect") == 1
+    # frame in and out, one image lookup and measurement, then per point a dot count, a click and a dot count
+    assert len(driver.calls) == 3 + 2 + 3 * 3
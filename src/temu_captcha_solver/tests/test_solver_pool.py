@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+from ..async_api import AsyncApiClient
+from ..asyncplaywrightsolver import AsyncPlaywrightSolver
+from ..solver_pool import SolverPool
+
+
+class FakePage:
+
+    def __init__(self, context: "FakeContext") -> None:
+        self.context = context
+        self.url = None
+        self.closed = False
+
+    async def goto(self, url: str, **kwargs) -> None:
+        self.url = url
+
+    async def close(self) -> None:
+        self.closed = True
+        self.context.open_pages -= 1
+
+
+class FakeContext:
+
+    def __init__(self) -> None:
+        self.open_pages = 0
+        self.max_open_pages = 0
+        self.closed = False
+
+    async def new_page(self) -> FakePage:
+        self.open_pages += 1
+        self.max_open_pages = max(self.max_open_pages, self.open_pages)
+        return FakePage(self)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeSolver:
+    active = 0
+    max_active = 0
+    made = 0
+
+    def __init__(self, page: FakePage, api_key: str, client=None, fail: bool = False) -> None:
+        FakeSolver.made += 1
+        self.page = page
+        self.fail = fail
+
+    async def solve_captcha_if_present(self, captcha_detect_timeout: int = 5, retries: int = 3) -> None:
+        FakeSolver.active += 1
+        FakeSolver.max_active = max(FakeSolver.max_active, FakeSolver.active)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail:
+                raise RuntimeError("solve failed")
+        finally:
+            FakeSolver.active -= 1
+
+
+def make_pool(**kwargs) -> tuple[SolverPool, list[FakeContext]]:
+    contexts: list[FakeContext] = []
+
+    async def context_factory(playwright, api_key, **context_kwargs) -> FakeContext:
+        context = FakeContext()
+        contexts.append(context)
+        return context
+
+    FakeSolver.active = 0
+    FakeSolver.max_active = 0
+    FakeSolver.made = 0
+    pool = SolverPool(None, "key", context_factory=context_factory, solver_factory=FakeSolver, **kwargs)
+    return pool, contexts
+
+
+@pytest.mark.asyncio
+async def test_pool_spreads_pages_across_workers():
+    pool, contexts = make_pool(workers=3, pages_per_worker=2)
+    async with pool:
+        await asyncio.gather(*[pool.visit(f"https://example.com/{i}") for i in range(12)])
+        assert len(contexts) == 3
+        assert all(context.max_open_pages == 2 for context in contexts)
+        assert all(context.open_pages == 0 for context in contexts)
+        assert sum(stats.solves for stats in pool.stats()) == 12
+        assert all(stats.solves_per_minute > 0 for stats in pool.stats())
+    assert all(context.closed for context in contexts)
+
+
+@pytest.mark.asyncio
+async def test_pool_limits_concurrent_solves():
+    pool, _ = make_pool(workers=4, pages_per_worker=4, max_concurrent_solves=3)
+    async with pool:
+        await asyncio.gather(*[pool.visit("https://example.com") for _ in range(16)])
+    assert FakeSolver.max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_failures():
+    pool, _ = make_pool(workers=1, solver_kwargs={"fail": True})
+    async with pool:
+        with pytest.raises(RuntimeError):
+            await pool.visit("https://example.com")
+        stats = pool.stats()[0]
+        assert stats.solves == 1
+        assert stats.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_run_returns_job_result():
+    pool, _ = make_pool(workers=2)
+    async with pool:
+        async def job(page: FakePage) -> str:
+            await page.goto("https://example.com")
+            return page.url
+        assert await pool.run(job) == "https://example.com"
+
+
+@pytest.mark.asyncio
+async def test_solves_on_a_page_reuse_its_solver():
+    pool, _ = make_pool(workers=2)
+    async with pool:
+        async def job(page: FakePage) -> None:
+            for _ in range(3):
+                await pool.solve(page)
+        await asyncio.gather(pool.run(job), pool.run(job))
+        assert FakeSolver.made == 2
+        assert pool._solvers == {}
+
+
+@pytest.mark.asyncio
+async def test_pool_must_be_started():
+    pool, _ = make_pool()
+    with pytest.raises(RuntimeError):
+        await pool.visit("https://example.com")
+
+
+@pytest.mark.asyncio
+async def test_failed_start_closes_the_contexts_that_launched():
+    contexts: list[FakeContext] = []
+
+    async def context_factory(playwright, api_key, **context_kwargs) -> FakeContext:
+        if len(contexts) == 2:
+            raise RuntimeError("browser failed to launch")
+        context = FakeContext()
+        contexts.append(context)
+        return context
+
+    pool = SolverPool(None, "key", workers=3, context_factory=context_factory, solver_factory=FakeSolver)
+    with pytest.raises(RuntimeError, match="failed to launch"):
+        await pool.start()
+    assert len(contexts) == 2
+    assert all(context.closed for context in contexts)
+    assert pool.stats() == []
+    await pool.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:AsyncPlaywrightSolver is deprecated")
+async def test_solver_closes_only_the_client_it_made():
+    async with AsyncPlaywrightSolver(None, "key") as solver:  # type: ignore
+        session = solver.client._get_session()
+    assert session.closed
+    async with AsyncApiClient("key") as client:
+        async with AsyncPlaywrightSolver(None, "key", client=client):  # type: ignore
+            session = client._get_session()
+        assert not session.closed
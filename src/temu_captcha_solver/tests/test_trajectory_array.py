@@ -0,0 +1,92 @@
+import json
+import os
+import re
+
+import pytest
+
+from ..encoding import encode_request_body
+from ..geometry import TrajectoryArray, get_center, rotate_angle_from_style, rotate_angles_from_styles, xy_to_proportional_point
+from ..api import multi_point_response_from_json
+from ..models import ArcedSlideCaptchaRequest, ArcedSlideTrajectoryElement, MultiPointResponse, ProportionalPoint, load_from_json, request_from_json
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "arced_slide_request.json")
+CONTAINER = {"x": 100, "y": 50, "width": 400, "height": 200}
+STYLES = [
+    "transform: rotate(-1.5deg); left: 3px;",
+    "left: 3px;",
+    "transform: translate(2px) rotate(12deg)",
+    "transform: skew(2deg) rotate(0.25deg);",
+]
+
+
+def old_rotate_angle_from_style(style: str) -> float:
+    if not "rotate" in style:
+        return 0
+    return float(re.sub(r".*rotate\(|deg.*", "", style))
+
+
+def test_angles_match_the_style_parser():
+    assert list(rotate_angles_from_styles(STYLES)) == [old_rotate_angle_from_style(style) for style in STYLES]
+    assert [rotate_angle_from_style(style) for style in STYLES] == [old_rotate_angle_from_style(style) for style in STYLES]
+
+
+def test_from_rects_matches_per_point_conversion():
+    rects = [(100, 50, 40, 40), (120, 70, 40, 40)]
+    trajectory = TrajectoryArray.from_rects([0, 5], rects, STYLES[:2], CONTAINER)
+    for i, (left, top, width, height) in enumerate(rects):
+        x, y = get_center(left, top, width, height)
+        assert trajectory[i] == ArcedSlideTrajectoryElement(
+            pixels_from_slider_origin=[0, 5][i],
+            piece_rotation_angle=rotate_angle_from_style(STYLES[i]),
+            piece_center=xy_to_proportional_point(x - CONTAINER["x"], y - CONTAINER["y"], CONTAINER["width"], CONTAINER["height"])
+        )
+
+
+def test_rest_index():
+    trajectory = TrajectoryArray(range(0, 50, 5), [0.1 * min(i, 4) for i in range(10)], [0.5] * 10, [0.0] * 10)
+    assert trajectory.still_steps() == [False] * 4 + [True] * 5
+    assert trajectory.rest_index(0.0, 0.0, min_pixels=0, still_pixels=10) == 6
+    assert trajectory.rest_index(0.0, 0.0, min_pixels=35, still_pixels=10) == 8
+    assert trajectory.rest_index(0.0, 0.0, min_pixels=0, still_pixels=100) is None
+
+
+def test_slices_and_takes_points():
+    trajectory = TrajectoryArray(range(0, 50, 5), [0.1] * 10, [0.5] * 10, range(10))
+    assert list(trajectory[:3].pixels) == [0, 5, 10]
+    assert list(trajectory.take([0, 9]).angles) == [0.0, 9.0]
+    assert trajectory[-1].pixels_from_slider_origin == 45
+    assert [element.pixels_from_slider_origin for element in trajectory[8:]] == [40, 45]
+    with pytest.raises(ValueError):
+        TrajectoryArray([0], [0.1], [0.5], [])
+
+
+def test_serializes_to_the_api_shape_at_send_time():
+    with open(FIXTURE) as f:
+        fixture = json.load(f)
+    elements = ArcedSlideCaptchaRequest(**fixture).slide_piece_trajectory
+    trajectory = TrajectoryArray.from_elements(elements)
+    request = ArcedSlideCaptchaRequest(
+        puzzle_image_b64=fixture["puzzle_image_b64"],
+        piece_image_b64=fixture["piece_image_b64"],
+        slide_piece_trajectory=trajectory
+    )
+    assert request.slide_piece_trajectory is trajectory
+    assert request.model_dump() == fixture
+    assert json.loads(encode_request_body(request)) == fixture
+    assert encode_request_body(request) == encode_request_body(ArcedSlideCaptchaRequest(**fixture))
+
+
+def test_parses_the_api_shape_without_a_model_per_point():
+    with open(FIXTURE) as f:
+        fixture = json.load(f)
+    request = request_from_json(ArcedSlideCaptchaRequest, fixture)
+    assert isinstance(request.slide_piece_trajectory, TrajectoryArray)
+    assert request.slide_piece_trajectory.to_json() == fixture["slide_piece_trajectory"]
+    assert request.model_dump() == ArcedSlideCaptchaRequest(**fixture).model_dump()
+    assert load_from_json(ArcedSlideCaptchaRequest, FIXTURE).model_dump() == fixture
+
+
+def test_parses_points_response_in_one_validation():
+    response = multi_point_response_from_json({"proportionalPoints": [{"proportionX": 0.25, "proportionY": 1}]})
+    assert response == MultiPointResponse(proportional_points=[ProportionalPoint(proportion_x=0.25, proportion_y=1.0)])
+    assert isinstance(response.proportional_points[0].proportion_y, float)
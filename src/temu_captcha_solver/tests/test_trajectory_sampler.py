@@ -0,0 +1,88 @@
+import pytest
+
+from ..trajectory_sampler import sampler_args, simplify_trajectory, sweep_chunks, trajectory_from_samples
+
+CONTAINER = {"x": 100, "y": 50, "width": 400, "height": 200}
+
+
+def sample(pixel: float, left: float, top: float, angle: float = 0) -> list:
+    return [pixel, left, top, 40, 40, f"transform: rotate({angle}deg); left: {left}px;"]
+
+
+def test_converts_samples_to_proportional_trajectory():
+    result = {"container": CONTAINER, "samples": [sample(0, 100, 50), sample(5, 120, 70, -1.5)]}
+    trajectory = trajectory_from_samples(result, mouse_step_size=5)
+    assert [e.pixels_from_slider_origin for e in trajectory] == [0, 5]
+    assert trajectory[1].piece_rotation_angle == -1.5
+    assert trajectory[1].piece_center.proportion_x == pytest.approx(40 / 400)
+    assert trajectory[1].piece_center.proportion_y == pytest.approx(40 / 200)
+
+
+def test_latest_sample_for_an_offset_wins():
+    result = {"container": CONTAINER, "samples": [sample(4.8, 100, 50), sample(5.1, 130, 50)]}
+    trajectory = trajectory_from_samples(result, mouse_step_size=5)
+    assert len(trajectory) == 1
+    assert trajectory[0].pixels_from_slider_origin == 5
+    assert trajectory[0].piece_center.proportion_x == pytest.approx(50 / 400)
+
+
+def test_stops_once_piece_stops_moving():
+    moving = [sample(pixel, 100 + pixel, 50) for pixel in range(0, 200, 5)]
+    still = [sample(pixel, 300, 50) for pixel in range(200, 400, 5)]
+    trajectory = trajectory_from_samples({"container": CONTAINER, "samples": moving + still}, mouse_step_size=5)
+    assert trajectory[-1].pixels_from_slider_origin == 250
+
+
+def test_ignores_samples_before_origin():
+    result = {"container": CONTAINER, "samples": [sample(-10, 100, 50), sample(0, 100, 50)]}
+    assert len(trajectory_from_samples(result)) == 1
+
+
+def test_stops_despite_sub_pixel_jitter():
+    moving = [sample(pixel, 100 + pixel, 50) for pixel in range(0, 200, 5)]
+    jittering = [sample(pixel, 300 + (0.3 if pixel % 10 else -0.3), 50, 0.1) for pixel in range(200, 400, 5)]
+    trajectory = trajectory_from_samples({"container": CONTAINER, "samples": moving + jittering}, mouse_step_size=5)
+    assert trajectory[-1].pixels_from_slider_origin == 250
+
+
+def test_simplify_drops_straight_stretches_and_keeps_curves():
+    straight = [sample(pixel, 100 + pixel, 50) for pixel in range(0, 100, 5)]
+    curve = [sample(pixel, 200 + (pixel - 100) * 0.5, 50 + (pixel - 100) ** 2 / 50, (pixel - 100) / 10) for pixel in range(100, 200, 5)]
+    trajectory = trajectory_from_samples({"container": CONTAINER, "samples": straight + curve}, mouse_step_size=5)
+    simplified = simplify_trajectory(trajectory)
+    assert len(simplified) < len(trajectory) / 2
+    assert simplified[0] == trajectory[0] and simplified[-1] == trajectory[-1]
+    kept = [e.pixels_from_slider_origin for e in simplified]
+    assert sum(1 for pixel in kept if pixel < 100) < sum(1 for pixel in kept if pixel >= 100)
+    by_pixel = {e.pixels_from_slider_origin: e for e in simplified}
+    for element in trajectory:
+        before = max(pixel for pixel in kept if pixel <= element.pixels_from_slider_origin)
+        after = min(pixel for pixel in kept if pixel >= element.pixels_from_slider_origin)
+        if before == after:
+            continue
+        t = (element.pixels_from_slider_origin - before) / (after - before)
+        x = by_pixel[before].piece_center.proportion_x * (1 - t) + by_pixel[after].piece_center.proportion_x * t
+        assert element.piece_center.proportion_x == pytest.approx(x, abs=0.0025)
+
+
+def test_simplify_respects_max_gap():
+    straight = [sample(pixel, 100 + pixel, 50) for pixel in range(0, 100, 5)]
+    trajectory = trajectory_from_samples({"container": CONTAINER, "samples": straight}, mouse_step_size=5)
+    assert [e.pixels_from_slider_origin for e in simplify_trajectory(trajectory)] == [0, 95]
+    kept = [e.pixels_from_slider_origin for e in simplify_trajectory(trajectory, max_gap=15)]
+    assert all(b - a <= 15 for a, b in zip(kept, kept[1:]))
+    assert kept[0] == 0 and kept[-1] == 95
+
+
+def test_sweep_chunks():
+    assert sweep_chunks(70) == [17, 18, 17, 18]
+    assert sum(sweep_chunks(83)) == 83
+    assert sweep_chunks(2) == [1, 1]
+
+
+def test_sampler_args():
+    args = sampler_args("#piece", "#container")
+    assert args["piece"] == "#piece"
+    assert args["container"] == "#container"
+    assert args["originX"] is None
+    assert args["minSweep"] > 0 and args["stillPixels"] > 0
@@ -0,0 +1,208 @@
+"""In-page sampler for the arced slide piece trajectory.
+
+Sweeping the slider one step at a time and asking the browser for the piece's bounding box
+and style after every step costs several round trips per step. Instead, the sampler script is
+installed before the drag and records the pointer offset, the piece's bounding rect and its
+style on every mouse move and every animation frame. The drag is performed in a few chunks,
+and between chunks the sampler is asked whether the piece has come to rest, so the sweep can
+end early instead of always covering the full bar. The samples are collected in a single call
+when it is done.
+
+The piece only curves and rotates over part of its track, so the trajectory is simplified
+before it is sent: points that lie on the line between their neighbours, within tolerance,
+are dropped, and points near curvature or rotation changes are kept.
+"""
+
+import logging
+from typing import Any
+
+from . import logs
+from .geometry import TrajectoryArray
+from .logs import SampledTrace
+from .models import ArcedSlideTrajectoryElement
+
+LOGGER = logging.getLogger(__name__)
+TRACE = SampledTrace(LOGGER)
+
+# The piece is considered still once it has moved less than STILL_TOLERANCE_PX and rotated less
+# than STILL_ANGLE_TOLERANCE degrees between samples over STILL_PIXELS of pointer travel,
+# and only after the pointer has covered MIN_SWEEP_PIXELS.
+STILL_TOLERANCE_PX = 1.0
+STILL_ANGLE_TOLERANCE = 0.5
+STILL_PIXELS = 50
+MIN_SWEEP_PIXELS = 100
+
+# The drag is split into this many moves, with a stillness check between each
+SWEEP_CHUNKS = 4
+
+# Points are dropped when linear interpolation between the kept points reproduces them within
+# SIMPLIFY_TOLERANCE (a proportion of the container) and SIMPLIFY_ANGLE_TOLERANCE degrees.
+# Kept points are never more than SIMPLIFY_MAX_GAP_STEPS mouse steps apart.
+SIMPLIFY_TOLERANCE = 0.0025
+SIMPLIFY_ANGLE_TOLERANCE = 0.5
+SIMPLIFY_MAX_GAP_STEPS = 3
+
+# Takes {piece: selector, container: selector, originX: number | null,
+#        tolerance: number, angleTolerance: number, stillPixels: number, minSweep: number}.
+# If originX is null, the pointer position of the first mouse move is used as the origin.
+START_TRAJECTORY_SAMPLER_JS = """
+(args) => {
+    const piece = document.querySelector(args.piece);
+    const container = document.querySelector(args.container);
+    if (!piece || !container) throw new Error("arced slide piece or container not found");
+    const state = {samples: [], originX: args.originX, pointerX: null, running: true, stillSince: null};
+    const angleOf = (style) => {
+        const match = style.match(/rotate\\((-?[\\d.]+)deg\\)/);
+        return match ? parseFloat(match[1]) : 0;
+    };
+    const sample = () => {
+        if (state.pointerX === null) return;
+        const rect = piece.getBoundingClientRect();
+        const style = piece.getAttribute("style") || "";
+        const offset = state.pointerX - state.originX;
+        const last = state.samples[state.samples.length - 1];
+        if (last) {
+            const still = Math.abs(rect.x - last[1]) <= args.tolerance
+                && Math.abs(rect.y - last[2]) <= args.tolerance
+                && Math.abs(angleOf(style) - angleOf(last[5])) <= args.angleTolerance;
+            if (!still) state.stillSince = null;
+            else if (state.stillSince === null) state.stillSince = last[0];
+        }
+        state.samples.push([offset, rect.x, rect.y, rect.width, rect.height, style]);
+    };
+    const onMove = (e) => {
+        if (state.originX === null) state.originX = e.clientX;
+        state.pointerX = e.clientX;
+        sample();
+    };
+    const onFrame = () => {
+        if (!state.running) return;
+        sample();
+        requestAnimationFrame(onFrame);
+    };
+    window.addEventListener("mousemove", onMove);
+    requestAnimationFrame(onFrame);
+    window.__sadcaptchaTrajectorySampler = {
+        isStill: () => {
+            const offset = state.pointerX === null ? 0 : state.pointerX - state.originX;
+            return offset >= args.minSweep
+                && state.stillSince !== null
+                && offset - state.stillSince >= args.stillPixels;
+        },
+        stop: () => new Promise((resolve) => {
+            // let the page render the final position before the last sample
+            requestAnimationFrame(() => requestAnimationFrame(() => {
+                state.running = false;
+                sample();
+                window.removeEventListener("mousemove", onMove);
+                delete window.__sadcaptchaTrajectorySampler;
+                const rect = container.getBoundingClientRect();
+                resolve({
+                    samples: state.samples,
+                    container: {x: rect.x, y: rect.y, width: rect.width, height: rect.height}
+                });
+            }));
+        })
+    };
+}
+"""
+
+TRAJECTORY_SAMPLER_IS_STILL_JS = """
+() => window.__sadcaptchaTrajectorySampler.isStill()
+"""
+
+STOP_TRAJECTORY_SAMPLER_JS = """
+() => window.__sadcaptchaTrajectorySampler.stop()
+"""
+
+
+def sampler_args(piece_selector: str, container_selector: str, origin_x: float | None = None) -> dict[str, Any]:
+    """Arguments for START_TRAJECTORY_SAMPLER_JS"""
+    return {
+        "piece": piece_selector,
+        "container": container_selector,
+        "originX": origin_x,
+        "tolerance": STILL_TOLERANCE_PX,
+        "angleTolerance": STILL_ANGLE_TOLERANCE,
+        "stillPixels": STILL_PIXELS,
+        "minSweep": MIN_SWEEP_PIXELS,
+    }
+
+
+def sweep_chunks(total_steps: int) -> list[int]:
+    """Split the steps of a sweep into SWEEP_CHUNKS moves, as evenly as possible"""
+    chunks = min(SWEEP_CHUNKS, max(1, total_steps))
+    return [total_steps * (i + 1) // chunks - total_steps * i // chunks for i in range(chunks)]
+
+
+def trajectory_from_samples(result: dict[str, Any], mouse_step_size: int = 1) -> TrajectoryArray:
+    """Convert the result of STOP_TRAJECTORY_SAMPLER_JS into a trajectory.
+
+    Samples are keyed by the pixel offset of the pointer, the latest sample for each
+    offset wins because it reflects the piece after the page has handled the move.
+    Offsets are rounded to the nearest multiple of mouse_step_size, and the trajectory ends
+    once the piece has been still, within tolerance, for STILL_PIXELS of pointer travel.
+    """
+    container = result["container"]
+    tolerance = STILL_TOLERANCE_PX / max(container["width"], container["height"])
+    by_pixel: dict[int, list[Any]] = {}
+    for sample in result["samples"]:
+        pixel = int(round(sample[0] / mouse_step_size)) * mouse_step_size
+        if pixel >= 0:
+            by_pixel[pixel] = sample
+    pixels = sorted(by_pixel)
+    samples = [by_pixel[pixel] for pixel in pixels]
+    trajectory = TrajectoryArray.from_rects(
+        pixels,
+        (sample[1:5] for sample in samples),
+        (sample[5] for sample in samples),
+        container
+    )
+    rest = trajectory.rest_index(tolerance, STILL_ANGLE_TOLERANCE, MIN_SWEEP_PIXELS, STILL_PIXELS)
+    if rest is not None:
+        trajectory = trajectory[:rest + 1]
+    if LOGGER.isEnabledFor(logs.TRACE):
+        for point in zip(trajectory.pixels, trajectory.center_x, trajectory.center_y, trajectory.angles):
+            TRACE("trajectory point at %s pixels: center (%s, %s), angle %s", *point)
+    return trajectory
+
+
+def _deviates(trajectory: TrajectoryArray, start: int, end: int, tolerance: float, angle_tolerance: float) -> bool:
+    """Whether any point between start and end is further than tolerance from the linear
+    interpolation between them"""
+    pixels, x, y, angles = trajectory.pixels, trajectory.center_x, trajectory.center_y, trajectory.angles
+    span = pixels[end] - pixels[start]
+    for point in range(start + 1, end):
+        t = (pixels[point] - pixels[start]) / span
+        if abs(x[point] - (x[start] + t * (x[end] - x[start]))) > tolerance \
+                or abs(y[point] - (y[start] + t * (y[end] - y[start]))) > tolerance \
+                or abs(angles[point] - (angles[start] + t * (angles[end] - angles[start]))) > angle_tolerance:
+            return True
+    return False
+
+
+def simplify_trajectory(
+    trajectory: TrajectoryArray | list[ArcedSlideTrajectoryElement],
+    tolerance: float = SIMPLIFY_TOLERANCE,
+    angle_tolerance: float = SIMPLIFY_ANGLE_TOLERANCE,
+    max_gap: int | None = None
+) -> TrajectoryArray:
+    """Drop the points of a trajectory that linear interpolation between the kept points
+    reproduces within tolerance, so straight stretches are sent coarsely and curves and
+    rotation changes finely. The first and last points are always kept, and if max_gap is
+    given, kept points are never more than max_gap pixels apart."""
+    if not isinstance(trajectory, TrajectoryArray):
+        trajectory = TrajectoryArray.from_elements(trajectory)
+    if len(trajectory) <= 2:
+        return trajectory[:]
+    pixels = trajectory.pixels
+    kept = [0]
+    anchor = 0
+    for end in range(2, len(trajectory)):
+        too_far = max_gap is not None and pixels[end] - pixels[anchor] > max_gap
+        if too_far or _deviates(trajectory, anchor, end, tolerance, angle_tolerance):
+            anchor = end - 1
+            kept.append(anchor)
+    kept.append(len(trajectory) - 1)
+    LOGGER.debug("simplified trajectory from %s to %s points", len(trajectory), len(kept))
+    return trajectory.take(kept)